@@ -1,18 +1,20 @@
 #!/usr/bin/env python3
-from pathlib import Path
+# archive.write() checks new downloads as they are stored; this is the
+# audit for what is already in data/ (plain or compressed, src/archive.py)
+from src import archive
 
 # Folder containing your files
-data_folder = Path("data")
+data_folder = "data"
 
 bad_files = []
 
-for file in sorted(data_folder.glob("*")):
+for file in archive.find(data_folder, "*"):
     print(f"Running {file}...")
     if not file.is_file():
         continue
     try:
-        file.read_text(encoding="utf-8")
-    except UnicodeDecodeError as e:
+        archive.read_bytes(file).decode("utf-8")
+    except (UnicodeDecodeError, OSError, EOFError) as e:
         bad_files.append((file.name, str(e)))
 
 if bad_files:
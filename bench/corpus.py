@@ -0,0 +1,230 @@
+"""Synthetic Ogimet-format METAR/TAF corpus generator.
+
+Writes one file per station-month, named like ogimet_scraper.py output
+({ICAO}_{YYYY}-{MM}.txt), with the '#' header lines extract_meta reads and
+one report per line terminated by '='.
+
+    python bench/corpus.py --out /tmp/bench/data --stations 4 --years 2023
+
+Knobs: TEMPO / PROB / BECMG density, NIL / CNL TAF rates and a malformed
+line rate (busted "TEMPO=" TAFs, issue days outside the parser's window,
+reports with no issue time, stray garbage lines). Same seed, same corpus.
+"""
+
+import argparse
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# real northern stations first, then made-up ones for bigger runs
+STATIONS = ["CYYQ", "CYTH", "CYQD", "CYYL", "CYGX", "CYNE", "CYRT", "CYBK"]
+
+VIS = ["P6SM"] * 6 + ["5SM", "3SM", "2SM", "11/2SM", "1SM", "3/4SM", "1/2SM", "1/4SM"]
+SIGWX = [""] * 6 + ["-SN", "BR", "-SN BR", "FG", "-RA", "BLSN", "FZDZ", "+SN", "VCSH"]
+CLOUDS = ["SKC", "FEW020", "SCT030", "SCT030 BKN050", "FEW010 BKN025", "OVC040"]
+
+
+@dataclass
+class CorpusConfig:
+    stations: list
+    years: list
+    months: list = None
+    tempo: float = 0.3          # per change group
+    prob: float = 0.15
+    becmg: float = 0.1
+    nil_rate: float = 0.02      # per TAF
+    cnl_rate: float = 0.02
+    malformed_rate: float = 0.005  # per line
+    seed: int = 1
+
+
+def station_codes(n: int) -> list:
+    codes = list(STATIONS[:n])
+    i = 0
+    while len(codes) < n:
+        code = "CZ" + chr(ord("A") + i // 26) + chr(ord("A") + i % 26)
+        if code not in codes:
+            codes.append(code)
+        i += 1
+    return codes
+
+
+def ddhh(dt: datetime) -> str:
+    return dt.strftime("%d%H")
+
+
+def ddhh_end(dt: datetime) -> str:
+    #TAFs write midnight at the end of a period as dd24 of the previous day
+    if dt.hour == 0:
+        return (dt - timedelta(days=1)).strftime("%d") + "24"
+    return ddhh(dt)
+
+
+def wind(r: random.Random) -> str:
+    k = r.random()
+    if k < 0.1:
+        return f"VRB{r.randrange(1, 6):02d}KT"
+    if k < 0.15:
+        return "00000KT"
+    direction = r.randrange(10, 361, 10)
+    speed = r.randrange(3, 30)
+    if k < 0.3:
+        return f"{direction:03d}{speed:02d}G{speed + r.randrange(10, 20):02d}KT"
+    return f"{direction:03d}{speed:02d}KT"
+
+
+def clouds(r: random.Random) -> str:
+    k = r.random()
+    if k < 0.25:
+        return f"BKN{r.randrange(2, 40):03d}"
+    if k < 0.4:
+        return f"OVC{r.randrange(1, 25):03d}"
+    if k < 0.43:
+        return f"VV{r.randrange(1, 5):03d}"
+    return r.choice(CLOUDS)
+
+
+def weather(r: random.Random) -> str:
+    return " ".join(x for x in (r.choice(VIS), r.choice(SIGWX), clouds(r)) if x)
+
+
+def make_taf(r: random.Random, cfg: CorpusConfig, station: str, issued: datetime, amd: bool) -> str:
+    kind = "TAF AMD" if amd else "TAF"
+    head = f"{kind} {station} {issued:%d%H%M}Z"
+
+    k = r.random()
+    if k < cfg.nil_rate:
+        return f"{head} NIL"
+
+    valid_from = issued.replace(minute=0) + timedelta(hours=1)
+    valid_to = valid_from + timedelta(hours=r.choice([24, 24, 30]))
+    period = f"{ddhh(valid_from)}/{ddhh_end(valid_to)}"
+
+    if k < cfg.nil_rate + cfg.cnl_rate:
+        return f"{head} {period} CNL"
+
+    parts = [f"{head} {period} {wind(r)} {weather(r)}"]
+    t = valid_from
+    while (t := t + timedelta(hours=r.randrange(2, 8))) < valid_to:
+        end = min(t + timedelta(hours=r.randrange(2, 6)), valid_to)
+        g = r.random()
+        if g < cfg.tempo:
+            parts.append(f"TEMPO {ddhh(t)}/{ddhh_end(end)} {weather(r)}")
+        elif g < cfg.tempo + cfg.prob:
+            parts.append(f"PROB{r.choice([30, 40])} {ddhh(t)}/{ddhh_end(end)} {weather(r)}")
+        elif g < cfg.tempo + cfg.prob + cfg.becmg:
+            end = min(t + timedelta(hours=2), valid_to)
+            parts.append(f"BECMG {ddhh(t)}/{ddhh_end(end)} {wind(r)} {clouds(r)}")
+        else:
+            parts.append(f"FM{t:%d%H}00 {wind(r)} {weather(r)}")
+
+    nxt = issued.replace(minute=0) + timedelta(hours=6)
+    return " ".join(parts) + f" RMK NXT FCST BY {nxt:%d%H}00Z"
+
+
+def make_metar(r: random.Random, station: str, t: datetime, kind: str = "METAR") -> str:
+    temp = r.randrange(-30, 25)
+    dew = temp - r.randrange(0, 6)
+    fmt = lambda x: f"M{-x:02d}" if x < 0 else f"{x:02d}"
+    return (
+        f"{kind} {station} {t:%d%H%M}Z {wind(r)} {weather(r)} "
+        f"{fmt(temp)}/{fmt(dew)} A{r.randrange(2900, 3080)} RMK SC{r.randrange(1, 8)}"
+    )
+
+
+def malformed(r: random.Random, station: str, t: datetime) -> str:
+    k = r.randrange(4)
+    if k == 0:
+        #busted TAF ending in a bare TEMPO (see catch_errors.py)
+        return f"{t:%Y%m%d%H%M} TAF {station} {t:%d%H%M}Z {ddhh(t)}/{ddhh_end(t + timedelta(hours=24))} {wind(r)} P6SM SKC TEMPO="
+    if k == 1:
+        #issue day well outside parse_issued_time's +/-3 day window
+        bad = t - timedelta(days=9)
+        return f"{t:%Y%m%d%H%M} {make_metar(r, station, bad)}="
+    if k == 2:
+        return f"{t:%Y%m%d%H%M} METAR {station} NIL="
+    return "garbage " + "".join(r.choice("ABCXYZ0123 /") for _ in range(30))
+
+
+def month_lines(r: random.Random, cfg: CorpusConfig, station: str, year: int, month: int) -> list:
+    start = datetime(year, month, 1)
+    end = (start + timedelta(days=32)).replace(day=1)
+    lines = [
+        f"# {station}, Synthetic (Canada)",
+        f"# Latitude {r.randrange(45, 70)}-{r.randrange(60):02d}-00N. "
+        f"Longitude {r.randrange(60, 130):03d}-{r.randrange(60):02d}-00W. Altitude {r.randrange(0, 600)} m.",
+        "# Query made at 01/01/2026 00:00:00 UTC",
+        f"# Time interval: from {start:%d/%m/%Y %H:%M} to {end:%d/%m/%Y %H:%M} UTC",
+        "",
+    ]
+
+    t = start
+    while t < end:
+        lines.append(f"{t:%Y%m%d%H%M} {make_metar(r, station, t)}=")
+        if r.random() < 0.08:
+            s = t + timedelta(minutes=r.randrange(5, 55))
+            lines.append(f"{s:%Y%m%d%H%M} {make_metar(r, station, s, 'SPECI')}=")
+        if t.hour % 6 == 5:
+            issued = t - timedelta(minutes=20)
+            lines.append(f"{t:%Y%m%d%H%M} {make_taf(r, cfg, station, issued, amd=False)}=")
+        elif r.random() < 0.03:
+            lines.append(f"{t:%Y%m%d%H%M} {make_taf(r, cfg, station, t, amd=True)}=")
+        if r.random() < cfg.malformed_rate:
+            lines.append(malformed(r, station, t))
+        t += timedelta(hours=1)
+    return lines
+
+
+def generate(cfg: CorpusConfig, out_dir) -> int:
+    """Write the corpus; returns number of files written."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    months = cfg.months or list(range(1, 13))
+
+    n = 0
+    for station in cfg.stations:
+        for year in cfg.years:
+            for month in months:
+                #one rng per file so subsets of a corpus are identical
+                r = random.Random(f"{cfg.seed}-{station}-{year}-{month}")
+                lines = month_lines(r, cfg, station, year, month)
+                path = out_dir / f"{station}_{year}-{month:02d}.txt"
+                path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+                n += 1
+    return n
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--out", required=True)
+    ap.add_argument("--stations", type=int, default=4)
+    ap.add_argument("--years", type=int, nargs="+", default=[2023])
+    ap.add_argument("--months", type=int, nargs="+", default=None)
+    ap.add_argument("--tempo", type=float, default=0.3)
+    ap.add_argument("--prob", type=float, default=0.15)
+    ap.add_argument("--becmg", type=float, default=0.1)
+    ap.add_argument("--nil-rate", type=float, default=0.02)
+    ap.add_argument("--cnl-rate", type=float, default=0.02)
+    ap.add_argument("--malformed-rate", type=float, default=0.005)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args(argv)
+
+    cfg = CorpusConfig(
+        stations=station_codes(args.stations),
+        years=args.years,
+        months=args.months,
+        tempo=args.tempo,
+        prob=args.prob,
+        becmg=args.becmg,
+        nil_rate=args.nil_rate,
+        cnl_rate=args.cnl_rate,
+        malformed_rate=args.malformed_rate,
+        seed=args.seed,
+    )
+    n = generate(cfg, args.out)
+    print(f"Wrote {n} files to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
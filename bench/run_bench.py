@@ -0,0 +1,201 @@
+"""End-to-end pipeline benchmark on a synthetic corpus.
+
+For each scale: generate a corpus (bench/corpus.py) into a scratch directory,
+then run the pipeline scripts there in order, each in its own process, and
+record wall time, peak RSS and throughput (reports/s) per stage.
+
+    python bench/run_bench.py                       # small + medium
+    python bench/run_bench.py --scales large
+    python bench/run_bench.py --save-baseline       # write bench/baseline.json
+
+Results are compared against bench/baseline.json when it exists; a stage
+slower than baseline by more than --tolerance is reported as a regression
+and the exit code is 1.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO = BENCH_DIR.parent
+sys.path.insert(0, str(REPO))
+
+from bench.corpus import CorpusConfig, generate, station_codes  # noqa: E402
+
+BASELINE = BENCH_DIR / "baseline.json"
+
+# (stations, years, months)
+SCALES = {
+    "tiny": (1, [2023], [1]),
+    "small": (2, [2023], [1, 2, 3]),
+    "medium": (4, [2023], list(range(1, 13))),
+    "large": (8, [2023, 2024], list(range(1, 13))),
+}
+
+# pipeline order; build_dev_file.py narrows to the analysis window, the
+# synthetic years sit inside it
+STAGES = [
+    "parse_metar_taf",
+    "build_dev_file",
+    "build_metars",
+    "build_obs_grid",
+    "build_taf",
+    "catch_errors_2",
+    "process_hourly",
+]
+
+# run report name (src/pipeline.py stage) written by each script
+REPORT_NAMES = {
+    "parse_metar_taf": "parse",
+    "build_dev_file": "dev",
+    "build_metars": "metars",
+    "build_obs_grid": "grid",
+    "build_taf": "tafs",
+    "catch_errors_2": "clean",
+    "process_hourly": "hourly",
+}
+
+
+def run_stage(stage: str, workdir: Path) -> dict:
+    """Run one script in its own process; wall seconds and peak RSS (MB)."""
+    env = dict(os.environ, PYTHONPATH=str(REPO))
+    log = (workdir / f"{stage}.log").open("w")
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, str(REPO / f"{stage}.py")],
+        cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+    _, status, usage = os.wait4(proc.pid, 0)
+    wall = time.perf_counter() - t0
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    log.close()
+
+    if proc.returncode != 0:
+        raise RuntimeError(f"{stage} failed (exit {proc.returncode}), see {workdir / (stage + '.log')}")
+
+    #ru_maxrss is KB on Linux, bytes on macOS
+    rss_kb = usage.ru_maxrss / 1024 if sys.platform == "darwin" else usage.ru_maxrss
+    return {"seconds": round(wall, 3), "peak_rss_mb": round(rss_kb / 1024, 1)}
+
+
+def count_reports(workdir: Path) -> dict:
+    """Input sizes per stage, read back from the intermediate files."""
+    counts = {}
+
+    def n_reports(name):
+        with (workdir / name).open(encoding="utf-8") as f:
+            data = json.load(f)
+        metars = sum(len(e.get("metars", [])) for e in data)
+        tafs = sum(len(e.get("tafs", [])) for e in data)
+        return metars, tafs
+
+    metars, tafs = n_reports("parsed_reports.json")
+    counts["parse_metar_taf"] = metars + tafs
+    counts["build_dev_file"] = metars + tafs
+
+    metars, tafs = n_reports("parsed_reports_dev.json")
+    counts["build_metars"] = metars
+    counts["build_obs_grid"] = metars
+    counts["build_taf"] = tafs
+
+    with (workdir / "nested_tafs.json").open() as f:
+        counts["catch_errors_2"] = len(json.load(f))
+    with (workdir / "nested_tafs_clean.json").open() as f:
+        counts["process_hourly"] = len(json.load(f))
+    return counts
+
+
+def bench_scale(scale: str, keep: bool = False) -> dict:
+    n_stations, years, months = SCALES[scale]
+    workdir = Path(tempfile.mkdtemp(prefix=f"altwx_bench_{scale}_"))
+
+    cfg = CorpusConfig(stations=station_codes(n_stations), years=years, months=months)
+    n_files = generate(cfg, workdir / "data")
+    print(f"[{scale}] {n_files} files in {workdir}")
+
+    stages = {}
+    for stage in STAGES:
+        stages[stage] = run_stage(stage, workdir)
+        print(f"[{scale}] {stage:<16} {stages[stage]['seconds']:>8.2f}s  {stages[stage]['peak_rss_mb']:>8.1f} MB")
+
+    for stage, n in count_reports(workdir).items():
+        stages[stage]["reports"] = n
+        secs = stages[stage]["seconds"]
+        stages[stage]["reports_per_s"] = round(n / secs, 1) if secs else None
+
+    #per-stage run reports from src/metrics.py (counters, drops, hot helpers)
+    for stage in STAGES:
+        report = workdir / "run_reports" / f"{REPORT_NAMES[stage]}.json"
+        if report.exists():
+            stages[stage]["run_report"] = json.loads(report.read_text())
+
+    if not keep:
+        for p in sorted(workdir.rglob("*"), reverse=True):
+            p.unlink() if p.is_file() else p.rmdir()
+        workdir.rmdir()
+
+    return {"files": n_files, "stages": stages}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """List of (scale, stage, baseline_s, now_s) slower than tolerance allows."""
+    regressions = []
+    for scale, res in results.items():
+        base = baseline.get("scales", {}).get(scale)
+        if not base:
+            continue
+        for stage, now in res["stages"].items():
+            was = base["stages"].get(stage)
+            if was and now["seconds"] > was["seconds"] * (1 + tolerance):
+                regressions.append((scale, stage, was["seconds"], now["seconds"]))
+    return regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--scales", default="small,medium", help=f"comma list of {', '.join(SCALES)}")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs baseline (0.25 = 25%%)")
+    ap.add_argument("--save-baseline", action="store_true")
+    ap.add_argument("--output", help="write results JSON here as well")
+    ap.add_argument("--keep", action="store_true", help="keep scratch directories")
+    args = ap.parse_args(argv)
+
+    results = {}
+    for scale in args.scales.split(","):
+        results[scale] = bench_scale(scale.strip(), keep=args.keep)
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "scales": results,
+    }
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+    status = 0
+    if BASELINE.exists() and not args.save_baseline:
+        regressions = compare(results, json.loads(BASELINE.read_text()), args.tolerance)
+        for scale, stage, was, now in regressions:
+            print(f"REGRESSION [{scale}] {stage}: {was:.2f}s -> {now:.2f}s")
+        if regressions:
+            status = 1
+        else:
+            print("No regressions against baseline")
+
+    if args.save_baseline:
+        BASELINE.write_text(json.dumps(report, indent=2))
+        print(f"Saved baseline to {BASELINE}")
+
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""Synthetic flight schedule for `python -m src.main flights`.
+
+    python bench/schedule.py --out /tmp/bench/schedule.csv --flights 300000 \
+        --stations CYYQ CYTH CYQD --start 2024-01-01 --days 365
+
+Flights to random destinations among the stations, ETAs spread over the
+period, planned 1 to 6 hours before ETA. With --alternates the alt1 / alt2
+columns are filled from the other stations. Same seed, same schedule.
+"""
+
+import argparse
+import csv
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+
+
+def generate(path, flights: int, stations: list, start: datetime, days: int, alternates: bool, seed: int = 1) -> int:
+    r = random.Random(seed)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    span = days * 24 * 60
+    with path.open("w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["flight", "destination", "eta", "planning_time"] + (["alt1", "alt2"] if alternates else []))
+        for i in range(flights):
+            dest = r.choice(stations)
+            eta = start + timedelta(minutes=r.randrange(span))
+            plan = eta - timedelta(minutes=r.randrange(60, 361))
+            row = [f"FL{i:06d}", dest, f"{eta:%Y-%m-%d %H:%M}", f"{plan:%Y-%m-%d %H:%M}"]
+            if alternates:
+                others = [s for s in stations if s != dest]
+                row += r.sample(others, min(2, len(others))) + [""] * (2 - min(2, len(others)))
+            w.writerow(row)
+    return flights
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--out", required=True)
+    ap.add_argument("--flights", type=int, default=100_000)
+    ap.add_argument("--stations", nargs="+", default=["CYYQ", "CYTH", "CYQD", "CYYL"])
+    ap.add_argument("--start", default="2024-01-01")
+    ap.add_argument("--days", type=int, default=365)
+    ap.add_argument("--alternates", action="store_true", help="fill alt1 / alt2 columns")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args(argv)
+
+    n = generate(args.out, args.flights, args.stations, datetime.fromisoformat(args.start), args.days,
+                 args.alternates, args.seed)
+    print(f"Wrote {n} flights to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""CLI startup-time benchmark.
+
+Times the light `python -m src.main` commands (help, stages, taf, check)
+against a bare interpreter and a bare `import pandas`, and checks with
+`python -X importtime` that none of them pull in pandas / NumPy / bs4.
+
+    python bench/startup.py                 # 10 runs per command
+    python bench/startup.py --runs 30 --output startup.json
+
+A tiny corpus is generated and taken through the clean stage first so
+`taf` and `check` have stores to read. Exit code 1 if a light command
+imports a heavy module.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO = BENCH_DIR.parent
+sys.path.insert(0, str(REPO))
+
+from bench.corpus import CorpusConfig, generate, station_codes  # noqa: E402
+
+HEAVY = ("pandas", "numpy", "bs4")
+
+# name -> (argv after the interpreter, must stay light)
+COMMANDS = {
+    "python": (["-c", "pass"], True),
+    "import_pandas": (["-c", "import pandas"], False),
+    "help": (["-m", "src.main", "--help"], True),
+    "stages": (["-m", "src.main", "stages"], True),
+    "taf": (["-m", "src.main", "taf", "CYYQ", "2023-01-10 12:00"], True),
+    "check": (["-m", "src.main", "check", "CYYQ"], True),
+}
+
+
+def prepare(workdir: Path):
+    """Tiny corpus -> nested_tafs.bin / nested_tafs_clean.bin in workdir."""
+    cfg = CorpusConfig(stations=station_codes(1), years=[2023], months=[1])
+    generate(cfg, workdir / "data")
+    subprocess.run(
+        [sys.executable, "-m", "src.main", "run", "--data", "data", "--only", "clean", "--jobs", "1"],
+        cwd=workdir, env=_env(), check=True, stdout=subprocess.DEVNULL
+    )
+
+
+def _env() -> dict:
+    return dict(os.environ, PYTHONPATH=str(REPO))
+
+
+def time_command(argv: list, workdir: Path, runs: int) -> dict:
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, *argv], cwd=workdir, env=_env(),
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - t0)
+    return {
+        "median_ms": round(statistics.median(times) * 1000, 1),
+        "min_ms": round(min(times) * 1000, 1),
+    }
+
+
+def heavy_imports(argv: list, workdir: Path) -> list:
+    """Top-level heavy packages the command imported (from -X importtime)."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", *argv], cwd=workdir, env=_env(),
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    found = set()
+    for line in proc.stderr.splitlines():
+        #import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        name = line.rsplit("|", 1)[1].strip()
+        if name.split(".")[0] in HEAVY:
+            found.add(name.split(".")[0])
+    return sorted(found)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--runs", type=int, default=10)
+    ap.add_argument("--output", help="write results JSON here as well")
+    args = ap.parse_args(argv)
+
+    workdir = Path(tempfile.mkdtemp(prefix="altwx_startup_"))
+    prepare(workdir)
+
+    results = {}
+    status = 0
+    for name, (cmd, light) in COMMANDS.items():
+        res = time_command(cmd, workdir, args.runs)
+        res["heavy_imports"] = heavy_imports(cmd, workdir)
+        results[name] = res
+        flag = ""
+        if light and res["heavy_imports"]:
+            flag = f"  <-- imports {', '.join(res['heavy_imports'])}"
+            status = 1
+        print(f"{name:<14} {res['median_ms']:>8.1f} ms (min {res['min_ms']:.1f}){flag}")
+
+    if args.output:
+        report = {"python": platform.python_version(), "runs": args.runs, "commands": results}
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+    for p in sorted(workdir.rglob("*"), reverse=True):
+        p.unlink() if p.is_file() else p.rmdir()
+    workdir.rmdir()
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
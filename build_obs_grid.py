@@ -0,0 +1,16 @@
+# bins metars_parsed.csv into one row per station-hour -> metars_hourly.csv
+# (worst ceiling / vis, landing suitability, missing-hour flags)
+# logic lives in src/obs_grid.py
+
+from src import obs_grid
+
+#LandingMinimaReqts.csv for per-station landing limits; stations without
+#minima (all of them with None) get suitable_for_landing NA, as in R
+LANDING_MINIMA = "LandingMinimaReqts.csv"
+
+#analysis window the grid spans (src/devset.py RUNS), as in build_dev_file.py;
+#merged_data.R fills in any hours of its own window beyond it
+#RUN = "ANALYSIS1"
+RUN = "ANALYSIS2"
+
+obs_grid.main(landing_csv=LANDING_MINIMA, run=RUN)
@@ -1,6 +1,6 @@
-from pathlib import Path
+from src import archive
 
-TAF_DIR = Path("data")
+TAF_DIR = "data"
 
 def is_busted_taf_line(line: str) -> bool:
     line = line.strip()
@@ -11,8 +11,8 @@ def is_busted_taf_line(line: str) -> bool:
     return False
 
 
-for file in TAF_DIR.glob("*.txt"):
-    with file.open(encoding="utf-8") as f:
+for file in archive.find(TAF_DIR):
+    with archive.open_text(file) as f:
         busted_file = False
 
         for i, line in enumerate(f, start=1):
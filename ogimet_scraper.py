@@ -1,9 +1,10 @@
-import os
 import time
 import datetime
 import requests
 from dateutil.relativedelta import relativedelta
 
+from src import archive
+
 # --------------- CONFIG ---------------
 
 AIRPORTS = "CYFO CYEK CYRT CYXN CYCS CYBK CYZS CYUT CYUX CYGT CYBB CYHK CYYH CYRB CYAB CYIO CYBR CYTE CYQK CYVC".split(" ")   # Add your airports here
@@ -80,27 +81,24 @@ def fetch_ogimet(icao, year, month):
                 return None
 
 def save_text(icao, year, month, text):
-    """Save the response text to a file."""
-    os.makedirs(SAVE_DIR, exist_ok=True)
-    filename = os.path.join(SAVE_DIR, f"{icao}_{year}-{month:02d}.txt")
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write(text)
+    """Save the response text, compressed (src/archive.py), checking it on the way."""
+    path, _ = archive.write(SAVE_DIR, f"{icao}_{year}-{month:02d}.txt", text)
+    return path
 
 # --------------- MAIN SCRIPT ---------------
 
 if __name__ == "__main__":
     for icao in AIRPORTS:
         for year, month in daterange_months(START_YEAR, START_MONTH, END_YEAR, END_MONTH):
-            filename = os.path.join(SAVE_DIR, f"{icao}_{year}-{month:02d}.txt")
-            if os.path.exists(filename):
+            if archive.locate(SAVE_DIR, f"{icao}_{year}-{month:02d}.txt"):
                 print(f"Skipping {icao} {year}-{month:02d} (already exists)")
                 continue
 
             print(f"Fetching {icao} {year}-{month:02d}...")
             text = fetch_ogimet(icao, year, month)
             if text:
-                save_text(icao, year, month, text)
-                print(f"Saved {icao}_{year}-{month:02d}.txt")
+                path = save_text(icao, year, month, text)
+                print(f"Saved {path.name}")
             else:
                 print(f"Failed {icao} {year}-{month:02d}")
 
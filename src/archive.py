@@ -0,0 +1,161 @@
+"""Raw Ogimet archive files: compressed on write, one opener for every reader.
+
+    data/CYYQ_2024-01.txt.zst   zstandard, when the package is installed
+    data/CYYQ_2024-01.txt.gz    gzip otherwise
+    data/CYYQ_2024-01.txt       uncompressed (older files), still read
+
+A file is its logical name (CYYQ_2024-01.txt, what parsed_reports.json and
+every later output records) plus an optional codec suffix. The monthly
+text compresses about 5x with gzip, and reading it back is a streaming
+decompress instead of a full read of the raw file.
+
+write() runs the bad_files.py / catch_errors.py checks on the text before
+it is stored, so a bad response is reported when it arrives rather than by
+a separate pass over data/.
+"""
+
+import gzip
+import io
+import os
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# preferred first when one logical name has several files
+SUFFIXES = (".zst", ".gz", "")
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 10
+
+
+def default_codec() -> str:
+    return ".zst" if zstandard is not None else ".gz"
+
+
+def logical_name(path) -> str:
+    """CYYQ_2024-01.txt.gz -> CYYQ_2024-01.txt."""
+    name = Path(path).name
+    for suffix in SUFFIXES[:-1]:
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def find(folder, pattern: str = "*.txt") -> list[Path]:
+    """One file per logical name matching pattern, sorted by logical name."""
+    best = {}
+    for suffix in SUFFIXES:
+        for path in Path(folder).glob(pattern + suffix):
+            best.setdefault(logical_name(path), path)
+    return [best[name] for name in sorted(best)]
+
+
+def locate(folder, name: str) -> Path | None:
+    """The stored file for a logical name, if any."""
+    for suffix in SUFFIXES:
+        path = Path(folder) / (name + suffix)
+        if path.exists():
+            return path
+    return None
+
+
+# ----------------------------
+# Reading
+# ----------------------------
+
+def open_archive(path):
+    """Binary stream of the decompressed file."""
+    path = Path(path)
+    if path.suffix == ".gz":
+        return gzip.open(path, "rb")
+    if path.suffix == ".zst":
+        if zstandard is None:
+            raise RuntimeError(f"{path.name}: the zstandard package is needed to read .zst archives")
+        return zstandard.ZstdDecompressor().stream_reader(path.open("rb"), closefd=True)
+    return path.open("rb")
+
+
+def open_text(path):
+    """Text stream (UTF-8, universal newlines) of the decompressed file."""
+    return io.TextIOWrapper(open_archive(path), encoding="utf-8")
+
+
+def read_bytes(path) -> bytes:
+    with open_archive(path) as f:
+        return f.read()
+
+
+# ----------------------------
+# Writing
+# ----------------------------
+
+def busted_lines(text: str) -> list[tuple[int, str]]:
+    """(line number, line) of TAFs cut off after TEMPO (catch_errors.py)."""
+    out = []
+    for i, line in enumerate(text.splitlines(), start=1):
+        line = line.strip()
+        if " TEMPO=" in line or line.endswith("TEMPO="):
+            out.append((i, line))
+    return out
+
+
+def check(data) -> tuple[str, list[str]]:
+    """(text, problems) for a response; raises UnicodeDecodeError on bytes
+    that are not UTF-8 (bad_files.py), which the parser could not read."""
+    text = data.decode("utf-8") if isinstance(data, bytes) else data
+    problems = [f"line {i}: {line}" for i, line in busted_lines(text)]
+    return text, problems
+
+
+def compress(raw: bytes, codec: str) -> bytes:
+    if codec == ".gz":
+        return gzip.compress(raw, compresslevel=GZIP_LEVEL, mtime=0)
+    if codec == ".zst":
+        if zstandard is None:
+            raise RuntimeError("the zstandard package is not installed")
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    if codec == "":
+        return raw
+    raise ValueError(f"unknown codec {codec!r}")
+
+
+def write(folder, name: str, data, codec: str | None = None) -> tuple[Path, list[str]]:
+    """Check, compress and store one response under its logical name.
+
+    Replaces any other copy of the same name; returns (path, problems).
+    """
+    codec = default_codec() if codec is None else codec
+    text, problems = check(data)
+    for problem in problems:
+        print(f"{name}: {problem}")
+
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    path = folder / (name + codec)
+    #a crash mid-write must not leave a short file that later counts as archived
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(compress(text.encode("utf-8"), codec))
+    os.replace(tmp, path)
+
+    for suffix in SUFFIXES:
+        other = folder / (name + suffix)
+        if other != path:
+            other.unlink(missing_ok=True)
+    return path, problems
+
+
+def compress_folder(folder="data", codec: str | None = None) -> tuple[int, int]:
+    """Rewrite every stored file with codec; returns (bytes before, after)."""
+    codec = default_codec() if codec is None else codec
+    before = after = 0
+    for path in find(folder):
+        if path.name == logical_name(path) + codec:
+            continue
+        size = path.stat().st_size
+        new, _ = write(folder, logical_name(path), read_bytes(path), codec)
+        before += size
+        after += new.stat().st_size
+        print(f"{path.name} -> {new.name} ({size} -> {new.stat().st_size} bytes)")
+    return before, after
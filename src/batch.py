@@ -0,0 +1,467 @@
+"""Station-month batch mode: a SQLite work queue shared by any number of workers.
+
+    python -m src.main batch submit --data data --queue /shared/batch_queue
+    python -m src.main batch work --queue /shared/batch_queue    # on every node, as often as wanted
+    python -m src.main batch status --queue /shared/batch_queue
+    python -m src.main batch merge --queue /shared/batch_queue --out .
+
+    python -m src.main batch run --data data --workers 4         # all of the above on one box
+
+A unit is one archive file (one station-month). Its parse -> dev -> metars /
+tafs -> clean -> hourly chain runs start to finish in one worker, and the
+results land in <queue>/units/<file name>/. Each unit's output is written to a
+scratch directory first and then swapped in, and its log goes to log.txt
+there. merge puts the units back together:
+
+    metars_parsed.csv       units concatenated in file order
+    nested_tafs_clean.bin   TAFs of every unit; on a (station, issued) clash
+                            between units the later file wins, as dedupe_tafs
+                            does over the whole archive
+    tafs_hourly.csv         the units' rows minus those of clashing TAFs
+                            (same rows as the pipeline, grouped by unit)
+    metars_hourly.csv       built from the merged METARs (src/obs_grid.py)
+
+Queue (<queue>/queue.db):
+
+    claim     BEGIN IMMEDIATE, take the first pending unit (or one whose
+              lease ran out), lease it to this worker for LEASE_SECONDS
+    renew     a heartbeat thread extends the lease while the unit runs
+    complete  only by the worker still holding the lease
+    fail      back to pending after RETRY_DELAY * attempts seconds, or
+              failed after max_attempts; status lists the errors
+
+A worker that dies leaves its lease to expire, and another worker picks the
+unit up. Workers exit when nothing is pending or leased. Submitting again
+adds new files, requeues files whose size / mtime changed, and retries
+failed units. SQLite needs working file locks, so use a local disk or a
+network filesystem that supports them (NFSv4 or later).
+"""
+
+import contextlib
+import csv
+import json
+import os
+import re
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from src import checkpoint
+from src import metrics
+
+DB = "queue.db"
+UNITS_DIR = "units"
+DEFAULT_QUEUE = "batch_queue"
+
+LEASE_SECONDS = 300
+POLL_SECONDS = 2.0
+RETRY_DELAY = 5.0
+MAX_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS units (
+    name TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',      -- pending / leased / done / failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    available_at REAL NOT NULL DEFAULT 0,
+    error TEXT,
+    seconds REAL,
+    metars INTEGER,
+    hourly INTEGER
+);
+CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+# ----------------------------
+# Queue
+# ----------------------------
+
+class WorkQueue:
+    """units and settings tables in <folder>/queue.db; one connection per
+    thread / process."""
+
+    def __init__(self, folder=DEFAULT_QUEUE, timeout: float = 60.0):
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.folder / DB, timeout=timeout, isolation_level=None)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def unit_dir(self, name: str) -> Path:
+        return self.folder / UNITS_DIR / name
+
+    @contextlib.contextmanager
+    def _write(self):
+        #BEGIN IMMEDIATE takes the write lock up front, so two workers can't
+        #both read the same pending unit and claim it
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.db
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        self.db.execute("COMMIT")
+
+    # ---- setup ----
+
+    def settings(self) -> dict:
+        return {k: json.loads(v) for k, v in self.db.execute("SELECT key, value FROM settings")}
+
+    def submit(self, paths, settings: dict) -> dict:
+        """Add archive files; returns counts of added / requeued / unchanged."""
+        from src import archive
+
+        out = {"added": 0, "requeued": 0, "unchanged": 0}
+        with self._write() as db:
+            old = {k: json.loads(v) for k, v in db.execute("SELECT key, value FROM settings")}
+            if old and old != settings:
+                #different window / attempts: every unit's output is stale
+                print(f"Settings changed ({old} -> {settings}); requeueing everything")
+                db.execute("UPDATE units SET state = 'pending', attempts = 0, error = NULL, available_at = 0")
+            db.executemany("INSERT OR REPLACE INTO settings VALUES (?, ?)",
+                           [(k, json.dumps(v)) for k, v in settings.items()])
+
+            for path in paths:
+                name = archive.logical_name(path)
+                fingerprint = json.dumps(checkpoint.file_fingerprint(path))
+                row = db.execute("SELECT fingerprint, state FROM units WHERE name = ?", (name,)).fetchone()
+                if row is None:
+                    db.execute("INSERT INTO units (name, path, fingerprint) VALUES (?, ?, ?)",
+                               (name, str(Path(path).resolve()), fingerprint))
+                    out["added"] += 1
+                elif row[0] != fingerprint or row[1] == "failed":
+                    db.execute("UPDATE units SET path = ?, fingerprint = ?, state = 'pending', attempts = 0, "
+                               "error = NULL, available_at = 0 WHERE name = ?",
+                               (str(Path(path).resolve()), fingerprint, name))
+                    out["requeued"] += 1
+                else:
+                    out["unchanged"] += 1
+        return out
+
+    # ---- leases ----
+
+    def claim(self, worker: str, lease: float = LEASE_SECONDS) -> tuple | None:
+        """(name, path, attempt) leased to worker, or None if nothing is
+        ready."""
+        now = time.time()
+        max_attempts = self.settings().get("max_attempts", MAX_ATTEMPTS)
+        with self._write() as db:
+            #a lease that ran out on the last attempt: the unit keeps killing its worker
+            db.execute("UPDATE units SET state = 'failed', error = COALESCE(error, 'lease expired') "
+                       "WHERE state = 'leased' AND lease_until < ? AND attempts >= ?", (now, max_attempts))
+            row = db.execute(
+                "SELECT name, path, attempts FROM units "
+                "WHERE (state = 'pending' AND available_at <= ?) OR (state = 'leased' AND lease_until < ?) "
+                "ORDER BY name LIMIT 1", (now, now)).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE units SET state = 'leased', worker = ?, attempts = attempts + 1, lease_until = ? "
+                       "WHERE name = ?", (worker, now + lease, row[0]))
+        return row[0], row[1], row[2] + 1
+
+    def renew(self, name: str, worker: str, lease: float = LEASE_SECONDS) -> bool:
+        cur = self.db.execute("UPDATE units SET lease_until = ? WHERE name = ? AND worker = ? AND state = 'leased'",
+                              (time.time() + lease, name, worker))
+        return cur.rowcount == 1
+
+    def complete(self, name: str, worker: str, seconds: float, metars: int, hourly: int) -> bool:
+        """False if the lease was lost (another worker has the unit)."""
+        cur = self.db.execute(
+            "UPDATE units SET state = 'done', error = NULL, lease_until = NULL, seconds = ?, metars = ?, hourly = ? "
+            "WHERE name = ? AND worker = ? AND state = 'leased'", (seconds, metars, hourly, name, worker))
+        return cur.rowcount == 1
+
+    def fail(self, name: str, worker: str, error: str) -> str:
+        """Back to pending (after a delay) or failed; returns the new state."""
+        max_attempts = self.settings().get("max_attempts", MAX_ATTEMPTS)
+        with self._write() as db:
+            row = db.execute("SELECT attempts FROM units WHERE name = ? AND worker = ? AND state = 'leased'",
+                             (name, worker)).fetchone()
+            if row is None:
+                return "lost"
+            state = "failed" if row[0] >= max_attempts else "pending"
+            db.execute("UPDATE units SET state = ?, error = ?, lease_until = NULL, available_at = ? WHERE name = ?",
+                       (state, error, time.time() + RETRY_DELAY * row[0], name))
+        return state
+
+    # ---- progress ----
+
+    def counts(self) -> dict:
+        out = {"pending": 0, "leased": 0, "done": 0, "failed": 0}
+        out.update(dict(self.db.execute("SELECT state, COUNT(*) FROM units GROUP BY state")))
+        return out
+
+    def remaining(self) -> int:
+        """Units a worker may still have to do (pending or leased)."""
+        return self.db.execute("SELECT COUNT(*) FROM units WHERE state IN ('pending', 'leased')").fetchone()[0]
+
+    def units(self, state: str | None = None) -> list[dict]:
+        cur = self.db.execute("SELECT * FROM units" + (" WHERE state = ?" if state else "") + " ORDER BY name",
+                              (state,) if state else ())
+        names = [d[0] for d in cur.description]
+        return [dict(zip(names, row)) for row in cur]
+
+
+class Heartbeat:
+    """Renews a lease from a thread (its own connection) while a unit runs."""
+
+    def __init__(self, folder, name: str, worker: str, lease: float = LEASE_SECONDS):
+        self.args = (folder, name, worker, lease)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        folder, name, worker, lease = self.args
+        q = WorkQueue(folder)
+        try:
+            while not self._stop.wait(lease / 3):
+                if not q.renew(name, worker, lease):
+                    break
+        finally:
+            q.close()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+# ----------------------------
+# One unit
+# ----------------------------
+
+def process_unit(path: Path, unit_dir: Path, settings: dict) -> dict:
+    """parse -> dev -> metars / tafs -> clean -> hourly for one archive file,
+    into unit_dir. Empty outputs are not written."""
+    from src import clean, devset, hourly, metars, parser, tafs
+    from src.taf_store import write_tafs
+
+    scratch = unit_dir.with_name(f"{unit_dir.name}.{socket.gethostname()}.{os.getpid()}.tmp")
+    shutil.rmtree(scratch, ignore_errors=True)
+    scratch.mkdir(parents=True)
+
+    with open(scratch / "log.txt", "w", encoding="utf-8") as log, contextlib.redirect_stdout(log):
+        data = devset.filter_reports([parser.build_output_for_file(path)], settings["run"])
+        df_metars, _ = metars.run(data)
+        cleaned, _ = clean.run(tafs.run(data)[0])
+        if len(df_metars):
+            df_metars.to_csv(scratch / metars.OUTPUT, index=False)
+        n_hourly = 0
+        if cleaned:
+            write_tafs(scratch / clean.OUTPUT, cleaned)
+            df_hourly = hourly.build_hourly(cleaned)
+            n_hourly = len(df_hourly)
+            hourly.save(df_hourly, scratch)
+        checkpoint.flush(scratch)
+
+    #a unit re-run after a lost lease writes the same files; last swap wins
+    shutil.rmtree(unit_dir, ignore_errors=True)
+    os.replace(scratch, unit_dir)
+    return {"metars": len(df_metars), "hourly": n_hourly}
+
+
+def work(folder=DEFAULT_QUEUE, worker: str | None = None, lease: float = LEASE_SECONDS,
+         poll: float = POLL_SECONDS, max_units: int | None = None) -> int:
+    """Claim and run units until none are left; returns units completed."""
+    q = WorkQueue(folder)
+    settings = q.settings()
+    if not settings:
+        print(f"{q.folder / DB}: nothing submitted")
+        return 0
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+
+    #one run report per worker: run_reports/batch_work_<worker>.json
+    metrics.start("batch_work_" + re.sub(r"[^\w.-]", "_", worker), q.folder)
+    done = 0
+    while max_units is None or done < max_units:
+        unit = q.claim(worker, lease)
+        if unit is None:
+            if not q.remaining():
+                break
+            time.sleep(poll)        # others' leases may still expire, or a retry come due
+            continue
+
+        name, path, attempt = unit
+        t0 = time.perf_counter()
+        try:
+            with Heartbeat(q.folder, name, worker, lease):
+                info = process_unit(Path(path), q.unit_dir(name), settings)
+        except Exception as e:
+            state = q.fail(name, worker, f"{type(e).__name__}: {e}")
+            metrics.drop("unit_failed")
+            print(f"[{worker}] {name} attempt {attempt} failed ({e}) -> {state}")
+            continue
+
+        seconds = time.perf_counter() - t0
+        if q.complete(name, worker, round(seconds, 3), **info):
+            done += 1
+            metrics.count("units_done")
+            print(f"[{worker}] {name} done in {seconds:.1f}s ({info['metars']} METARs, {info['hourly']} hourly rows)")
+        else:
+            metrics.drop("lease_lost")
+            print(f"[{worker}] {name} lease lost; another worker has it")
+
+    metrics.finish()
+    q.close()
+    return done
+
+
+# ----------------------------
+# Merge
+# ----------------------------
+
+def _append_csv(src: Path, out, header_written: bool, drop=None) -> int:
+    """Copy src's rows to out (its header only if none written yet); rows
+    where drop(row) is true are left out. Returns rows copied."""
+    n = 0
+    with open(src, newline="", encoding="utf-8") as f:
+        header = f.readline()
+        if not header_written:
+            out.write(header)
+        if drop is None:
+            for line in f:
+                out.write(line)
+                n += 1
+            return n
+        #csv.reader: raw TAF text is quoted when it holds a comma
+        reader = csv.reader(f)
+        writer = csv.writer(out, lineterminator="\n")
+        columns = next(csv.reader([header]))
+        for row in reader:
+            if not drop(dict(zip(columns, row))):
+                writer.writerow(row)
+                n += 1
+    return n
+
+
+def merge(folder=DEFAULT_QUEUE, out_dir=".", landing_csv=None, partial: bool = False) -> int:
+    """Assemble the done units into the pipeline's outputs in out_dir."""
+    from src import clean, devset, hourly, metars, obs_grid, suitability
+    from src.model import parse_stamp
+    from src.taf_store import read_tafs, write_tafs
+
+    q = WorkQueue(folder)
+    counts = q.counts()
+    if counts["done"] == 0 or (not partial and counts["done"] != sum(counts.values())):
+        print(f"Not merging: {counts} (batch merge --partial merges the done units)")
+        return 1
+
+    metrics.start("batch_merge", out_dir)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    names = [u["name"] for u in q.units("done")]
+
+    # ---- TAFs: the later unit wins a (station, issued) clash ----
+    owner, per_unit = {}, {}
+    with metrics.timer("tafs"):
+        for name in names:
+            path = q.unit_dir(name) / clean.OUTPUT
+            per_unit[name] = read_tafs(path) if path.exists() else []
+            for taf in per_unit[name]:
+                owner[(taf.station, taf.issued)] = name
+        kept = [t for name in names for t in per_unit[name] if owner[(t.station, t.issued)] == name]
+        clashes = sum(len(v) for v in per_unit.values()) - len(kept)
+        metrics.drop("duplicate_station_issued", clashes)
+        write_tafs(out_dir / clean.OUTPUT, kept)
+    del per_unit
+
+    # ---- row files, one unit after another ----
+    n_metars = n_hourly = 0
+    with metrics.timer("concat"):
+        with open(out_dir / metars.OUTPUT, "w", newline="", encoding="utf-8") as out:
+            for name in names:
+                path = q.unit_dir(name) / metars.OUTPUT
+                if path.exists():
+                    n_metars += _append_csv(path, out, out.tell() > 0)
+        with open(out_dir / hourly.OUTPUT, "w", newline="", encoding="utf-8") as out:
+            for name in names:
+                path = q.unit_dir(name) / hourly.OUTPUT
+                if not path.exists():
+                    continue
+                drop = None
+                if clashes:
+                    drop = lambda row, name=name: owner.get((row["station"], parse_stamp(row["issued"]))) != name
+                n_hourly += _append_csv(path, out, out.tell() > 0, drop)
+
+    # ---- quarantined records ----
+    for name in names:
+        for path in sorted((q.unit_dir(name) / checkpoint.QUARANTINE_DIR).glob("*.jsonl")):
+            folder_out = out_dir / checkpoint.QUARANTINE_DIR
+            folder_out.mkdir(exist_ok=True)
+            with open(folder_out / path.name, "a", encoding="utf-8") as f:
+                f.write(path.read_text(encoding="utf-8"))
+
+    print(f"Merged {len(names)} units: {n_metars} METARs, {len(kept)} TAFs ({clashes} duplicates across units), "
+          f"{n_hourly} hourly rows")
+    metrics.count("units_merged", len(names))
+    metrics.count("metars_out", n_metars)
+    metrics.count("hourly_rows_out", n_hourly)
+
+    if n_metars:
+        start, end = obs_grid.run_window(q.settings().get("run", devset.DEFAULT_RUN))
+        with metrics.timer("grid"):
+            obs_grid.save(obs_grid.build_grid(metars.load(out_dir), suitability.Requirements(landing_csv=landing_csv),
+                                              start, end), out_dir)
+    metrics.finish()
+    q.close()
+    return 0
+
+
+# ----------------------------
+# Entry points
+# ----------------------------
+
+def submit(data_dir="data", folder=DEFAULT_QUEUE, run: str | None = None, max_attempts: int = MAX_ATTEMPTS) -> dict:
+    from src import archive, devset
+
+    q = WorkQueue(folder)
+    paths = archive.find(data_dir)
+    result = q.submit(paths, {"run": run or devset.DEFAULT_RUN, "max_attempts": max_attempts})
+    print(f"{len(paths)} files: {result['added']} added, {result['requeued']} requeued, "
+          f"{result['unchanged']} unchanged -> {q.folder / DB}")
+    q.close()
+    return result
+
+
+def status(folder=DEFAULT_QUEUE) -> dict:
+    q = WorkQueue(folder)
+    counts = q.counts()
+    print(", ".join(f"{n} {state}" for state, n in counts.items()))
+    for u in q.units("leased"):
+        print(f"  leased  {u['name']} to {u['worker']} (attempt {u['attempts']}, "
+              f"{u['lease_until'] - time.time():.0f}s left)")
+    for u in q.units("failed"):
+        print(f"  failed  {u['name']} after {u['attempts']} attempts: {u['error']}")
+    q.close()
+    return counts
+
+
+def run_local(data_dir="data", folder=DEFAULT_QUEUE, out_dir=".", workers: int = 2, run: str | None = None,
+              landing_csv=None, lease: float = LEASE_SECONDS) -> int:
+    """submit, workers as separate processes on this box, then merge."""
+    submit(data_dir, folder, run)
+    cmd = [sys.executable, "-m", "src.main", "batch", "work", "--queue", str(Path(folder).resolve()),
+           "--lease", str(lease)]
+    root = Path(__file__).resolve().parents[1]
+    t0 = time.perf_counter()
+    procs = [subprocess.Popen(cmd + ["--worker", f"{socket.gethostname()}:w{i}"], cwd=root) for i in range(workers)]
+    codes = [p.wait() for p in procs]
+    print(f"{workers} workers finished in {time.perf_counter() - t0:.1f}s (exit codes {codes})")
+    if status(folder)["failed"]:
+        return 1
+    return merge(folder, out_dir, landing_csv)
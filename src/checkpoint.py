@@ -0,0 +1,173 @@
+"""Resumable stages: atomic part files, a progress ledger and a quarantine.
+
+A long stage that works in parts (hourly.build_partitioned) writes each
+part under a temp name and renames it (write_atomic() for bytes), then
+records it in a Ledger:
+
+    ledger = checkpoint.Ledger(parts_dir / "ledger.json", fingerprint)
+    for n, part in enumerate(parts):
+        if ledger.done(n):
+            continue                    # finished by an earlier run
+        ...
+        ledger.mark(n, rows=rows)
+
+The fingerprint describes the inputs and settings the parts were cut from
+(store size / mtime, partition key, budget); a ledger with a different one
+is stale and starts over. A crash leaves the finished parts and the ledger
+behind, so the next run only does what is left.
+
+Records that raise are quarantined instead of failing the run:
+
+    taf = checkpoint.guard("tafs", key, record, build_taf, record)
+    ...
+    checkpoint.flush(out_dir)           # -> quarantine/tafs.jsonl
+
+Each line holds the stage, a key, the error, where it was raised and the
+record, so the bad report can be looked at (and fixed in the parser) without
+re-running anything. flush() appends, so a stage that starts from scratch
+calls reset() first; only a resumed run keeps the lines it already wrote.
+"""
+
+import json
+import os
+import traceback
+from pathlib import Path
+
+from src import metrics
+
+QUARANTINE_DIR = "quarantine"
+
+_quarantined = []       # (stage, entry) since the last flush
+
+
+# ----------------------------
+# Files
+# ----------------------------
+
+def write_atomic(path, data):
+    """Write bytes / str to path via a temp file, so a crash never leaves a
+    partial file under the final name."""
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    with tmp.open("wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class Ledger:
+    """Which parts of a stage are complete; a JSON file rewritten atomically
+    after every part."""
+
+    def __init__(self, path, fingerprint: dict):
+        self.path = Path(path)
+        self.fingerprint = fingerprint
+        self.parts = {}
+        if self.path.exists():
+            try:
+                saved = json.loads(self.path.read_text())
+            except (OSError, ValueError):
+                saved = {}
+            if saved.get("fingerprint") == fingerprint:
+                self.parts = saved.get("parts", {})
+            else:
+                print(f"{self.path}: inputs changed, starting over")
+
+    def __len__(self) -> int:
+        return len(self.parts)
+
+    def done(self, part) -> dict | None:
+        return self.parts.get(str(part))
+
+    def mark(self, part, **info):
+        self.parts[str(part)] = info
+        write_atomic(self.path, json.dumps({"fingerprint": self.fingerprint, "parts": self.parts}))
+
+    def clear(self):
+        self.parts = {}
+        self.path.unlink(missing_ok=True)
+
+
+def file_fingerprint(path) -> dict:
+    st = Path(path).stat()
+    return {"file": Path(path).name, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+# ----------------------------
+# Quarantine
+# ----------------------------
+
+def _where(exc: BaseException) -> str:
+    frames = traceback.extract_tb(exc.__traceback__)
+    if not frames:
+        return ""
+    f = frames[-1]
+    return f"{Path(f.filename).name}:{f.lineno} in {f.name}"
+
+
+def entry(stage: str, key, record, exc: BaseException) -> dict:
+    """A quarantine line; worker processes return these for the parent to
+    add(). record may be anything with to_dict() (a Taf)."""
+    return {
+        "stage": stage,
+        "key": key,
+        "error": f"{type(exc).__name__}: {exc}",
+        "where": _where(exc),
+        "record": record.to_dict() if hasattr(record, "to_dict") else record,
+    }
+
+
+def quarantine(stage: str, key, record, exc: BaseException) -> dict:
+    """Set a record aside in this process."""
+    e = entry(stage, key, record, exc)
+    add(stage, [e])
+    return e
+
+
+def add(stage: str, entries: list):
+    for item in entries:
+        _quarantined.append((stage, item))
+    if entries:
+        metrics.drop("quarantined", len(entries))
+
+
+def guard(stage: str, key, record, fn, *args):
+    """fn(*args), or None with the record quarantined if it raises."""
+    try:
+        return fn(*args)
+    except Exception as e:
+        quarantine(stage, key, record, e)
+        return None
+
+
+def pending(stage: str | None = None) -> list:
+    return [item for s, item in _quarantined if stage is None or s == stage]
+
+
+def reset(out_dir, stage: str):
+    """Drop a stage's quarantine file (a run starting from scratch)."""
+    (Path(out_dir) / QUARANTINE_DIR / f"{stage}.jsonl").unlink(missing_ok=True)
+
+
+def flush(out_dir=".") -> int:
+    """Append quarantined records to quarantine/<stage>.jsonl; returns how
+    many were written."""
+    if not _quarantined:
+        return 0
+    folder = Path(out_dir) / QUARANTINE_DIR
+    folder.mkdir(parents=True, exist_ok=True)
+    by_stage = {}
+    for stage, item in _quarantined:
+        by_stage.setdefault(stage, []).append(item)
+    for stage, entries in by_stage.items():
+        path = folder / f"{stage}.jsonl"
+        with path.open("a", encoding="utf-8") as f:
+            for item in entries:
+                f.write(json.dumps(item, default=str) + "\n")
+        print(f"Quarantined {len(entries)} {stage} records to {path}")
+    n = len(_quarantined)
+    _quarantined.clear()
+    return n
@@ -0,0 +1,118 @@
+"""Drop TAFs whose segment times don't fit inside the TAF valid period.
+
+Library half of catch_errors_2.py.
+"""
+
+import json
+from pathlib import Path
+
+from src.model import Taf, TafStatus, SegType, format_stamp
+from src.taf_store import read_tafs, write_tafs, export_json
+from src import metrics
+
+OUTPUT = "nested_tafs_clean.bin"
+OUTPUT_JSON = "nested_tafs_clean.json"   # for inspection
+PROBLEMS = "nested_tafs_problems.json"
+
+
+def drop_reason(taf: Taf) -> str | None:
+    """Why a TAF can't be expanded hourly, or None if it is fine."""
+    #NIL / cancelled TAFs are kept as-is
+    if taf.status in {TafStatus.CANCELLED, TafStatus.NIL}:
+        return None
+
+    #timestamps are integer epoch minutes, so compare directly
+    vf = taf.valid_from
+    vt = taf.valid_to
+
+    #no valid period -> cannot be expanded hourly
+    if vf is None or vt is None:
+        return "no_valid_period"
+
+    for seg in taf.segments:
+        start = seg.start
+        end   = seg.end
+
+        # FM: only start must exist
+        if seg.type == SegType.FM:
+
+            if start is None or not (vf <= start <= vt):
+                return "fm_missing_start" if start is None else "fm_outside_valid_period"
+
+        # All others: start and end must exist and be inside TAF window
+        else:
+            if (
+                start is None or end is None or
+                start < vf or
+                end   > vt or
+                start >= end
+            ):
+                if start is None or end is None:
+                    return f"{seg.type.name.lower()}_missing_period"
+                elif start >= end:
+                    return f"{seg.type.name.lower()}_empty_period"
+                else:
+                    return f"{seg.type.name.lower()}_outside_valid_period"
+
+    return None
+
+
+def run(tafs: list[Taf]) -> tuple[list[Taf], list[dict]]:
+    """(kept TAFs, dropped TAF summaries)."""
+    metrics.count("tafs_in", len(tafs))
+
+    cleaned = []
+    dropped = []
+
+    i = 0
+    total = len(tafs)
+    for taf in tafs:
+
+        i += 1
+        if i % 1000 == 0 or i == total:
+            print(f"{i} of {total} -- dropped {len(dropped)}")
+
+        reason = drop_reason(taf)
+
+        if reason is not None:
+            metrics.drop(reason)
+            dropped.append({
+                "station": taf.station,
+                "issued": format_stamp(taf.issued),
+                "raw": taf.raw,
+                "reason": reason
+            })
+            continue
+
+        cleaned.append(taf)
+
+    print(f"Dropped {len(dropped)} TAFs")
+    print(f"Kept    {len(cleaned)} TAFs")
+
+    metrics.count("tafs_out", len(cleaned))
+    return cleaned, dropped
+
+
+def save(result: tuple, out_dir="."):
+    cleaned, dropped = result
+    out_dir = Path(out_dir)
+
+    write_tafs(out_dir / OUTPUT, cleaned)
+    export_json(cleaned, out_dir / OUTPUT_JSON)
+
+    with open(out_dir / PROBLEMS, "w") as f:
+        json.dump(dropped, f, default=str)
+
+
+def load(out_dir=".") -> list[Taf]:
+    return read_tafs(Path(out_dir) / OUTPUT)
+
+
+def main(out_dir="."):
+    from src import tafs
+
+    metrics.start("clean", out_dir)
+    with metrics.timer("read_tafs"):
+        nested = tafs.load(out_dir)
+    save(run(nested), out_dir)
+    metrics.finish()
@@ -0,0 +1,282 @@
+"""Climatology cube: suitability hour counts by station, month and hour of day.
+
+Built once from tafs_hourly.csv and metars_parsed.csv (src/suitability.py
+rules), so "how often was X suitable in month M at hour H" is a slice and a
+sum instead of a re-aggregation of the hourly rows.
+
+    alternate  [station, month, hour of day, lead bucket, outcome]
+    landing    [station, month, hour of day, outcome]
+
+    outcome    suitable / unsuitable / missing
+    month      calendar month (YYYY-MM); month-of-year roll-ups sum these
+    lead       hours from TAF issue to the hour, in lead_step buckets; the
+               last bucket holds hours with no TAF in force (missing)
+
+Every hour between a station's first and last data is counted, so hours
+with no TAF in force / no METAR show up as missing. The cube is saved as a
+compressed .npz next to the other outputs; update() folds in a new batch,
+replacing whole station-months it covers (feed it whole months; the first
+hours of a batch count as missing when their TAF was issued in the last).
+
+    cube = build(df_hourly, df_metars, Requirements(...))
+    cube.query("landing", stations=["CYYQ"], month_of_year=[1, 2], by=["station", "hour"])
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from src import metrics
+from src import suitability
+from src.suitability import SUITABLE, UNSUITABLE
+
+OUTPUT = "climatology.npz"
+
+OUTCOMES = ("suitable", "unsuitable", "missing")
+MEASURES = ("alternate", "landing")
+LEAD_STEP = 6
+MAX_LEAD = 48           # leads past this go in the last real bucket
+
+
+def _month_index(hours):
+    #hours since 1970 -> months since 1970
+    import numpy as np
+    return hours.astype("datetime64[h]").astype("datetime64[M]").astype(np.int64)
+
+
+def month_label(month: int) -> str:
+    return f"{1970 + month // 12}-{month % 12 + 1:02d}"
+
+
+def _outcome(state):
+    import numpy as np
+    out = np.full(len(state), 2, np.int64)
+    out[state == SUITABLE] = 0
+    out[state == UNSUITABLE] = 1
+    return out
+
+
+class Cube:
+    """Dense count arrays plus their axis labels."""
+
+    def __init__(self, stations, months, alternate, landing, lead_step: int = LEAD_STEP):
+        import numpy as np
+        self.stations = np.asarray(stations, dtype=str)
+        self.months = np.asarray(months, dtype=np.int64)
+        self.alternate = alternate
+        self.landing = landing
+        self.lead_step = lead_step
+
+    @property
+    def leads(self) -> list:
+        """Lead bucket labels (hours); -1 is 'no TAF in force'."""
+        return [i * self.lead_step for i in range(self.alternate.shape[3] - 1)] + [-1]
+
+    # ---- storage ----
+
+    def save(self, path):
+        import numpy as np
+        np.savez_compressed(
+            path, stations=self.stations, months=self.months,
+            alternate=self.alternate, landing=self.landing, lead_step=self.lead_step,
+        )
+
+    @classmethod
+    def load(cls, path) -> "Cube":
+        import numpy as np
+        with np.load(path) as z:
+            return cls(z["stations"], z["months"], z["alternate"], z["landing"], int(z["lead_step"]))
+
+    # ---- updates ----
+
+    def merge(self, other: "Cube") -> "Cube":
+        """New cube over both cubes' axes; other's station-months win."""
+        import numpy as np
+
+        if other.alternate.shape[3] != self.alternate.shape[3]:
+            raise ValueError("cubes use different lead buckets")
+
+        stations = np.union1d(self.stations, other.stations)
+        months = np.union1d(self.months, other.months)
+        out = Cube(
+            stations, months,
+            np.zeros((len(stations), len(months)) + self.alternate.shape[2:], self.alternate.dtype),
+            np.zeros((len(stations), len(months)) + self.landing.shape[2:], self.landing.dtype),
+            self.lead_step,
+        )
+        for src in (self, other):
+            si = np.searchsorted(stations, src.stations)
+            mi = np.searchsorted(months, src.months)
+            for name in MEASURES:
+                arr = getattr(src, name)
+                dst = getattr(out, name)
+                #replace only the station-months src actually has data for
+                covered = arr.reshape(arr.shape[0], arr.shape[1], -1).sum(axis=2) > 0
+                for s, m in zip(*np.nonzero(covered)):
+                    dst[si[s], mi[m]] = arr[s, m]
+        return out
+
+    # ---- queries ----
+
+    def query(self, measure: str, stations=None, months=None, month_of_year=None,
+              hours=None, leads=None, by=()):
+        """Counts summed over everything not in by, as a DataFrame.
+
+        stations / months ('YYYY-MM') / month_of_year (1-12) / hours (0-23) /
+        leads (bucket labels) narrow the cube; by is any of 'station',
+        'month', 'month_of_year', 'hour', 'lead' ('lead' for alternate only).
+        """
+        import numpy as np
+        import pandas as pd
+
+        if measure not in MEASURES:
+            raise KeyError(f"measure must be one of {MEASURES}")
+        arr = getattr(self, measure)
+        by = list(by)
+
+        month_labels = np.array([month_label(m) for m in self.months])
+        axes = {
+            "station": self.stations,
+            "month": month_labels,
+            "hour": np.arange(24),
+        }
+        if measure == "alternate":
+            axes["lead"] = np.array(self.leads)
+        elif "lead" in by or leads is not None:
+            raise ValueError("landing has no lead axis")
+
+        select = {
+            "station": None if stations is None else np.isin(self.stations, list(stations)),
+            "month": None if months is None else np.isin(month_labels, list(months)),
+            "hour": None if hours is None else np.isin(np.arange(24), list(hours)),
+            "lead": None if leads is None else np.isin(axes.get("lead", []), list(leads)),
+        }
+        if month_of_year is not None:
+            moy = np.isin(self.months % 12 + 1, list(month_of_year))
+            select["month"] = moy if select["month"] is None else select["month"] & moy
+
+        names = list(axes)
+        for i, name in enumerate(names):
+            if select[name] is not None:
+                arr = np.compress(select[name], arr, axis=i)
+                axes[name] = axes[name][select[name]]
+
+        if "month_of_year" in by:
+            #fold the month axis onto 1..12
+            moy = np.array([int(m[5:]) for m in axes["month"]], dtype=np.int64)
+            folded = np.zeros(arr.shape[:1] + (12,) + arr.shape[2:], arr.dtype)
+            np.add.at(folded, (slice(None), moy - 1), arr)
+            arr = folded
+            names[1] = "month_of_year"
+            axes["month_of_year"] = np.arange(1, 13)
+
+        keep = [i for i, n in enumerate(names) if n in by]
+        drop = tuple(i for i in range(len(names)) if i not in keep)
+        summed = arr.sum(axis=drop)
+
+        index = np.indices(summed.shape[:-1]).reshape(len(keep), -1) if keep else np.zeros((0, 1), np.int64)
+        counts = summed.reshape(-1, len(OUTCOMES))
+        df = pd.DataFrame({names[i]: axes[names[i]][index[j]] for j, i in enumerate(keep)})
+        for k, outcome in enumerate(OUTCOMES):
+            df[outcome] = counts[:, k]
+        judged = df["suitable"] + df["unsuitable"]
+        df["frac_suitable"] = (df["suitable"] / judged.where(judged > 0)).round(4)
+        #groups the data never reached (other months of the year, ...)
+        return df[counts.sum(axis=1) > 0].reset_index(drop=True)
+
+
+# ----------------------------
+# Build
+# ----------------------------
+
+def _grid_counts(stations, station_codes, hours, shape_months, month0):
+    """Hours per (station, month, hour of day) between each station's
+    first and last hour -- the crossing(station, time = seq(...)) grid."""
+    import numpy as np
+
+    grid = np.zeros((len(stations), shape_months, 24), np.int64)
+    for s in range(len(stations)):
+        h = hours[station_codes == s]
+        if not len(h):
+            continue
+        span = np.arange(h.min(), h.max() + 1)
+        np.add.at(grid[s], (_month_index(span) - month0, span % 24), 1)
+    return grid
+
+
+@metrics.timed()
+def build(df_hourly, df_metars, req=None, lead_step: int = LEAD_STEP) -> Cube:
+    import numpy as np
+
+    req = req or suitability.Requirements()
+    taf_rows = suitability.alternate_rows(df_hourly, req)
+    alt = suitability.alternate_hours(taf_rows)
+    land = suitability.landing_hours(suitability.landing_rows(df_metars, req))
+
+    stations = np.union1d(np.unique(taf_rows["station"]), np.unique(land["station"]))
+    n_leads = MAX_LEAD // lead_step            # real buckets; +1 for "none"
+    all_hours = np.concatenate([taf_rows["hour"], land["hour"]])
+    if not len(all_hours):
+        return Cube(stations, [], np.zeros((len(stations), 0, 24, n_leads + 1, 3), np.int32),
+                    np.zeros((len(stations), 0, 24, 3), np.int32), lead_step)
+
+    month0 = int(_month_index(all_hours.min()))
+    n_months = int(_month_index(all_hours.max())) - month0 + 1
+
+    # ---- alternate ----
+    a_st = np.searchsorted(stations, alt["station"])
+    a_month = _month_index(alt["hour"]) - month0
+    a_lead = np.minimum(alt["lead"] // lead_step, n_leads - 1)
+    shape = (len(stations), n_months, 24, n_leads + 1, 3)
+    alternate = np.bincount(
+        np.ravel_multi_index((a_st, a_month, alt["hour"] % 24, a_lead, _outcome(alt["state"])), shape),
+        minlength=int(np.prod(shape)),
+    ).reshape(shape)
+    #grid hours (first to last hourly TAF row) with no TAF in force
+    grid = _grid_counts(stations, np.searchsorted(stations, taf_rows["station"]), taf_rows["hour"], n_months, month0)
+    alternate[..., n_leads, 2] += np.maximum(grid - alternate.sum(axis=(3, 4)), 0)
+
+    # ---- landing ----
+    l_st = np.searchsorted(stations, land["station"])
+    l_month = _month_index(land["hour"]) - month0
+    shape = (len(stations), n_months, 24, 3)
+    landing = np.bincount(
+        np.ravel_multi_index((l_st, l_month, land["hour"] % 24, _outcome(land["state"])), shape),
+        minlength=int(np.prod(shape)),
+    ).reshape(shape)
+    grid = _grid_counts(stations, l_st, land["hour"], n_months, month0)
+    landing[..., 2] += grid - landing.sum(axis=3)
+
+    months = np.arange(month0, month0 + n_months)
+    metrics.count("alternate_hours", int(alternate.sum()))
+    metrics.count("landing_hours", int(landing.sum()))
+    return Cube(stations, months, alternate.astype(np.int32), landing.astype(np.int32), lead_step)
+
+
+# ----------------------------
+# Stage
+# ----------------------------
+
+def update(out_dir=".", alternate_csv=None, landing_csv=None, replace=False) -> Cube:
+    """Build from the current hourly outputs and fold into the saved cube."""
+    from src import hourly, metars
+
+    metrics.start("climatology", out_dir)
+    path = Path(out_dir) / OUTPUT
+    req = suitability.Requirements(alternate_csv, landing_csv)
+
+    with metrics.timer("load"):
+        df_hourly = hourly.load(out_dir)
+        df_metars = metars.load(out_dir)
+    no_alt, no_landing = req.without_minima(set(df_hourly["station"]) | set(df_metars["station"]))
+    if no_alt or no_landing:
+        print(f"No minima (counted missing) for: alternate {no_alt or '-'}, landing {no_landing or '-'}")
+
+    cube = build(df_hourly, df_metars, req)
+    if path.exists() and not replace:
+        cube = Cube.load(path).merge(cube)
+    cube.save(path)
+
+    print(f"Saved {path}: {len(cube.stations)} stations x {len(cube.months)} months")
+    metrics.finish()
+    return cube
@@ -0,0 +1,300 @@
+"""Analysis-window subset of the parsed reports (parsed_reports_dev.json).
+
+Library half of build_dev_file.py. sample_reports() cuts it down further to
+a small, representative slice for development runs:
+
+    python -m src.main run --sample 0.01 --seed 7
+
+Reports are grouped into strata by station, month, report type and a rare
+feature (NIL / CNL TAF, PROB/TEMPO-heavy TAF, busted issue time, SPECI is
+its own type). Within a stratum a report is kept when a hash of the seed and
+the report is under the fraction, and the min_per_stratum lowest hashes are
+always kept, so rare strata turn up even in a 1% slice. The choice depends
+only on the seed and the report itself (file name, station, issue or
+database time, raw text), never on where it sits in the data: the same seed
+gives the same slice, and adding a month of data does not reshuffle the
+rest. With unit="day" the unit is a station-day (all of one station's
+reports that day), which keeps the hours around a TAF together for hourly /
+suitability work.
+
+Sampling runs on the parsed reports before the window filter, which drops
+reports without an issue time; that way the busted_issued stratum is seen
+(and counted in the report) rather than silently empty.
+
+sample_report.json compares the slice with what it was cut from, stratum
+dimension by dimension.
+"""
+
+import hashlib
+import json
+import re
+from collections import Counter, defaultdict
+from pathlib import Path
+from datetime import datetime, date
+
+from src import metrics
+
+CHECKPOINT = "parsed_reports_dev.json"
+SAMPLE_REPORT = "sample_report.json"
+
+MIN_PER_STRATUM = 2
+# TAFs with at least this many TEMPO / PROB groups count as "change-heavy"
+HEAVY_CHANGE_GROUPS = 3
+# rarest first: a station-day takes the rarest feature of its reports
+FEATURES = ["busted_issued", "nil", "cnl", "change_heavy", "plain"]
+
+_CHANGE_RE = re.compile(r"\b(?:TEMPO|PROB\d{2})\b")
+_CNL_RE = re.compile(r"FCST CNCLD|FCST NOT AVBL|\bCNL\b")
+
+# Filters
+RUNS = {
+    "ANALYSIS1": {
+        "keep_stations": {"CYYQ", "CYTH", "CYQD", "CYYL"},
+        "min_date": date(2024, 11, 1),
+        "max_date": date(2025, 11, 30),
+    },
+    "ANALYSIS2": {
+        "keep_stations": {"CYYQ", "CYTH", "CYQD", "CYYL"},
+        "min_date": date(2022, 10, 1),
+        "max_date": date(2025, 10, 1),
+    },
+}
+
+DEFAULT_RUN = "ANALYSIS2"
+
+
+def parse_issued_date(issued):
+    try:
+        return datetime.strptime(issued, "%Y%m%d%H%M").date()
+    except Exception:
+        return None
+
+
+def in_window(r, kind, min_date, max_date):
+    metrics.count(f"{kind}_in")
+    d = parse_issued_date(r.get("issued"))
+    if d is None:
+        metrics.drop(f"{kind}_no_issued")
+        return False
+    if not (min_date <= d <= max_date):
+        metrics.drop(f"{kind}_outside_window")
+        return False
+    return True
+
+
+def filter_reports(data: list, run: str = DEFAULT_RUN) -> list:
+    """Keep METARs / TAFs issued inside the run's date window."""
+    min_date = RUNS[run]["min_date"]
+    max_date = RUNS[run]["max_date"]
+
+    filtered = []
+
+    for entry in data:
+        meta_station = entry.get("meta", {}).get("station")
+
+        # If the meta station isn't in our keep list, skip
+        #if meta_station not in RUNS[run]["keep_stations"]:
+        #    continue
+
+        # Filter METARs and TAFs by year
+        metars = [r for r in entry.get("metars", []) if in_window(r, "metars", min_date, max_date)]
+
+        tafs = [r for r in entry.get("tafs", []) if in_window(r, "tafs", min_date, max_date)]
+
+        metrics.count("metars_out", len(metars))
+        metrics.count("tafs_out", len(tafs))
+
+        # Skip files with no remaining reports
+        if not metars and not tafs:
+            metrics.drop("empty_file")
+            continue
+
+        # Copy structure with filtered lists
+        filtered.append({
+            "filename": entry.get("filename"),
+            "meta": entry.get("meta", {}),
+            "metars": metars,
+            "tafs": tafs
+        })
+
+    return filtered
+
+
+# ----------------------------
+# Stratified sampling
+# ----------------------------
+
+def feature(report: dict, kind: str) -> str:
+    """The rare feature a report stands for (FEATURES), 'plain' if none."""
+    if not report.get("issued"):
+        return "busted_issued"
+    if kind == "tafs":
+        raw = report.get("raw") or ""
+        if "NIL" in raw:
+            return "nil"
+        if _CNL_RE.search(raw):
+            return "cnl"
+        if len(_CHANGE_RE.findall(raw)) >= HEAVY_CHANGE_GROUPS:
+            return "change_heavy"
+    return "plain"
+
+
+def _month(report: dict) -> str:
+    stamp = report.get("issued") or report.get("db_time_stamp") or ""
+    return f"{stamp[:4]}-{stamp[4:6]}" if len(stamp) >= 6 else "unknown"
+
+
+def _units(data: list, unit: str) -> dict:
+    """{unit key: [(file index, kind, report index), ...]} with a stratum
+    per unit."""
+    units = defaultdict(list)
+    for f, entry in enumerate(data):
+        for kind in ("metars", "tafs"):
+            for r, report in enumerate(entry.get(kind, [])):
+                station = report.get("station") or entry.get("meta", {}).get("station")
+                if unit == "day":
+                    stamp = report.get("issued") or report.get("db_time_stamp") or ""
+                    key = (station, stamp[:8])
+                else:
+                    key = (entry.get("filename"), station,
+                           report.get("issued") or report.get("db_time_stamp"), report.get("raw"))
+                units[key].append((f, kind, r))
+    return units
+
+
+def _stratum(data: list, members: list, unit: str) -> tuple:
+    reports = [(kind, data[f][kind][r]) for f, kind, r in members]
+    kind, first = reports[0]
+    rarest = min((feature(rep, k) for k, rep in reports), key=FEATURES.index)
+    if unit == "day":
+        #a day covers every type; its stratum is station, month, rarest feature
+        return first.get("station"), _month(first), "day", rarest
+    return first.get("station"), _month(first), first.get("type"), rarest
+
+
+def _score(seed: int, key) -> float:
+    digest = hashlib.blake2b(repr((seed, key)).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2**64
+
+
+def sample_reports(data: list, fraction: float, seed: int = 0, min_per_stratum: int = MIN_PER_STRATUM,
+                   unit: str = "report") -> tuple[list, dict]:
+    """(sampled data in the same shape, coverage report)."""
+    units = _units(data, unit)
+    strata = defaultdict(list)
+    for key, members in units.items():
+        strata[_stratum(data, members, unit)].append((_score(seed, key), key))
+
+    keep = set()
+    for members in strata.values():
+        members.sort()
+        for rank, (score, key) in enumerate(members):
+            if score < fraction or rank < min_per_stratum:
+                keep.update(units[key])
+
+    sampled = []
+    for f, entry in enumerate(data):
+        kept = {kind: [rep for r, rep in enumerate(entry.get(kind, [])) if (f, kind, r) in keep]
+                for kind in ("metars", "tafs")}
+        if kept["metars"] or kept["tafs"]:
+            sampled.append({**entry, **kept})
+
+    metrics.count("sample_strata", len(strata))
+    metrics.count("sample_reports", len(keep))
+    return sampled, coverage(data, sampled, strata, fraction, seed, unit)
+
+
+def _profile(data: list) -> dict:
+    out = {"station": Counter(), "month": Counter(), "type": Counter(), "feature": Counter()}
+    for entry in data:
+        for kind in ("metars", "tafs"):
+            for report in entry.get(kind, []):
+                out["station"][report.get("station")] += 1
+                out["month"][_month(report)] += 1
+                out["type"][report.get("type")] += 1
+                out["feature"][feature(report, kind)] += 1
+    return out
+
+
+def coverage(full: list, sample: list, strata: dict, fraction: float, seed: int, unit: str) -> dict:
+    """How well the slice covers the full data: per dimension, values seen
+    and report counts / shares side by side."""
+    full_p, sample_p = _profile(full), _profile(sample)
+    n_full = sum(full_p["type"].values())
+    n_sample = sum(sample_p["type"].values())
+
+    report = {
+        "fraction": fraction,
+        "seed": seed,
+        "unit": unit,
+        "reports": n_full,
+        "sampled": n_sample,
+        "actual_fraction": round(n_sample / n_full, 4) if n_full else None,
+        "strata": len(strata),
+        "dimensions": {},
+    }
+    for dim in ("station", "month", "type", "feature"):
+        values = sorted(full_p[dim], key=str)
+        report["dimensions"][dim] = {
+            "covered": sum(1 for v in values if sample_p[dim][v]),
+            "values": len(values),
+            "counts": {
+                str(v): {
+                    "full": full_p[dim][v],
+                    "sample": sample_p[dim][v],
+                    "full_share": round(full_p[dim][v] / n_full, 4),
+                    "sample_share": round(sample_p[dim][v] / n_sample, 4) if n_sample else None,
+                }
+                for v in values
+            },
+        }
+    return report
+
+
+def print_coverage(report: dict):
+    print(f"Sampled {report['sampled']} of {report['reports']} reports "
+          f"({report['actual_fraction']:.2%}, target {report['fraction']:.2%}) from {report['strata']} strata")
+    for dim, d in report["dimensions"].items():
+        line = f"  {dim:<8} {d['covered']}/{d['values']} covered"
+        if dim in ("type", "feature"):
+            line += "  " + ", ".join(f"{v} {c['sample']}/{c['full']}" for v, c in d["counts"].items())
+        print(line)
+
+
+def save_coverage(report: dict, out_dir="."):
+    path = Path(out_dir) / SAMPLE_REPORT
+    path.write_text(json.dumps(report, indent=2))
+    print(f"Coverage report: {path}")
+
+
+def sample_and_report(data: list, fraction: float, seed: int = 0, unit: str = "report", out_dir=".") -> list:
+    """sample_reports, with the coverage printed and saved next to the outputs."""
+    sampled, report = sample_reports(data, fraction, seed, unit=unit)
+    print_coverage(report)
+    save_coverage(report, out_dir)
+    return sampled
+
+
+def save(filtered: list, out_dir="."):
+    output_path = Path(out_dir) / CHECKPOINT
+    with output_path.open("w", encoding="utf-8") as f:
+        json.dump(filtered, f, indent=2, ensure_ascii=False)
+
+    print(f"Saved filtered dataset with {len(filtered)} entries to {output_path}")
+
+
+def load(out_dir=".") -> list:
+    with (Path(out_dir) / CHECKPOINT).open(encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(run: str = DEFAULT_RUN, out_dir=".", sample: float | None = None, seed: int = 0, unit: str = "report"):
+    from src import parser
+
+    metrics.start("dev", out_dir)
+    print(f"Loading {Path(out_dir) / parser.CHECKPOINT}...")
+    data = parser.load(out_dir)
+    if sample is not None:
+        data = sample_and_report(data, sample, seed, unit, out_dir)
+    save(filter_reports(data, run), out_dir)
+    metrics.finish()
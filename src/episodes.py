@@ -0,0 +1,229 @@
+"""Below-minima episodes: contiguous stretches a station was unusable.
+
+    python -m src.main episodes --alt-minima AlternateMinimaReqts.csv \
+        --landing-minima LandingMinimaReqts.csv --grid max_tailwind=5,10,15
+
+An episode is a run of consecutive station-hours judged UNSUITABLE (src/
+suitability.py), per measure:
+
+    alternate   the TAF in force for the hour was below alternate minima
+    landing     a METAR / SPECI in the hour was below landing minima
+
+A suitable hour ends an episode; an hour with no verdict (no TAF in force,
+no report, MISSING) ends it too unless bridge allows that many unknown
+hours between two unsuitable ones. Each episode has its start / end (the
+hour after the last), hours (end - start), bad_hours (the unsuitable hours
+in it) and the worst ceiling / vis seen: the altmin values of the TAF rows
+for alternate, the reports' for landing.
+
+The policy-independent inputs are sweep.prepare()'s, decoded once; each
+parameter set of the grid (none: the default policy) only redoes the states
+and then the run-length work on whole arrays -- no loop over hours or
+stations. Outputs:
+
+    episodes.csv            set, parameters, measure, station, start, end,
+                            hours, bad_hours, worst_ceiling, worst_vis
+    episode_histogram.csv   set, parameters, measure, station, duration
+                            bucket, episodes, hours
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from src import metrics
+from src import suitability
+from src.suitability import UNSUITABLE, MISSING
+
+OUTPUT = "episodes.csv"
+HISTOGRAM = "episode_histogram.csv"
+
+# duration buckets (hours): 1, 2, 3-5, 6-11, 12-23, 24-47, 48+
+BUCKET_EDGES = [1, 2, 3, 6, 12, 24, 48]
+
+
+def bucket_labels() -> list[str]:
+    labels = []
+    for lo, hi in zip(BUCKET_EDGES, BUCKET_EDGES[1:] + [None]):
+        if hi is None:
+            labels.append(f"{lo}+")
+        elif hi == lo + 1:
+            labels.append(str(lo))
+        else:
+            labels.append(f"{lo}-{hi - 1}")
+    return labels
+
+
+# ----------------------------
+# Run-length extraction
+# ----------------------------
+
+def find_episodes(station, hour, state, ceiling=None, vis=None, bridge: int = 0) -> dict:
+    """Episodes of UNSUITABLE hours in per-station-hour arrays.
+
+    station is any sortable key (codes or names), hour hours since 1970,
+    one row per station-hour in any order. Returns arrays: station, start,
+    end, hours, bad_hours, worst_ceiling, worst_vis (NaN when unknown).
+    """
+    import numpy as np
+
+    n = len(hour)
+    ceiling = np.full(n, np.nan) if ceiling is None else np.asarray(ceiling, float)
+    vis = np.full(n, np.nan) if vis is None else np.asarray(vis, float)
+
+    #only judged hours matter: an unknown hour is just a gap in the hours
+    judged = np.flatnonzero(np.asarray(state) != MISSING)
+    judged = judged[np.lexsort((hour[judged], station[judged]))]
+    st, hr = station[judged], hour[judged]
+    bad = state[judged] == UNSUITABLE
+
+    carry = np.zeros(len(judged), dtype=bool)
+    carry[1:] = (st[1:] == st[:-1]) & bad[:-1] & (hr[1:] - hr[:-1] <= bridge + 1)
+    rows = np.flatnonzero(bad)
+    first = np.flatnonzero(~carry[rows])
+    if not len(first):
+        empty = np.zeros(0, np.int64)
+        return {"station": station[:0], "start": empty, "end": empty, "hours": empty,
+                "bad_hours": empty, "worst_ceiling": np.zeros(0), "worst_vis": np.zeros(0)}
+
+    last = np.append(first[1:], len(rows)) - 1
+    src = judged[rows]
+    start = hr[rows][first]
+    end = hr[rows][last] + 1
+    with np.errstate(invalid="ignore"):
+        worst_ceiling = np.fmin.reduceat(ceiling[src], first)
+    worst_ceiling[np.isinf(worst_ceiling)] = np.nan      # no ceiling reported
+    return {
+        "station": st[rows][first],
+        "start": start,
+        "end": end,
+        "hours": end - start,
+        "bad_hours": np.diff(np.append(first, len(rows))),
+        "worst_ceiling": worst_ceiling,
+        "worst_vis": np.fmin.reduceat(vis[src], first),
+    }
+
+
+def group_minimum(values, group, n_groups: int):
+    """Per group minimum ignoring NaN; group ids are sorted (report groups
+    from sweep.prepare)."""
+    import numpy as np
+
+    out = np.full(n_groups, np.nan)
+    if len(group):
+        starts = np.flatnonzero(np.append(True, group[1:] != group[:-1]))
+        out[group[starts]] = np.fmin.reduceat(values, starts)
+    return out
+
+
+def policy_episodes(arrays: dict, context: dict, req: suitability.Requirements, bridge: int = 0,
+                    landing_worst: tuple | None = None) -> dict:
+    """{measure: find_episodes result} for one policy; stations as indexes
+    into context['stations']."""
+    from src import sweep
+
+    states = sweep.hour_states(arrays, context, req)
+    if landing_worst is None:
+        landing_worst = landing_extremes(arrays)
+    return {
+        "alternate": find_episodes(arrays["alt_station"], arrays["alt_hour"], states["alternate"],
+                                   arrays["alt_ceiling"], arrays["alt_vis"], bridge),
+        "landing": find_episodes(arrays["land_group_station"], arrays["land_group_hour"], states["landing"],
+                                 *landing_worst, bridge),
+    }
+
+
+def landing_extremes(arrays: dict) -> tuple:
+    """Lowest ceiling / vis per report group; the same for every policy."""
+    n_groups = len(arrays["land_group_station"])
+    return (group_minimum(arrays["land_ceiling"], arrays["land_group"], n_groups),
+            group_minimum(arrays["land_vis"], arrays["land_group"], n_groups))
+
+
+# ----------------------------
+# Tables
+# ----------------------------
+
+def episodes_frame(sets: list[dict], results: list, stations: list, min_hours: int = 1):
+    import numpy as np
+    import pandas as pd
+
+    frames = []
+    names = np.asarray(stations, dtype=str)
+    for i, (params, result) in enumerate(zip(sets, results)):
+        for measure, ep in result.items():
+            keep = ep["hours"] >= min_hours
+            df = pd.DataFrame({
+                "measure": measure,
+                "station": names[ep["station"][keep]],
+                "start": ep["start"][keep].astype("datetime64[h]"),
+                "end": ep["end"][keep].astype("datetime64[h]"),
+                "hours": ep["hours"][keep],
+                "bad_hours": ep["bad_hours"][keep],
+                "worst_ceiling": ep["worst_ceiling"][keep],
+                "worst_vis": ep["worst_vis"][keep],
+            })
+            for name, value in reversed(params.items()):
+                df.insert(0, name, value)
+            df.insert(0, "set", i)
+            frames.append(df)
+    df = pd.concat(frames, ignore_index=True)
+    return df.sort_values(["set", "measure", "station", "start"], ignore_index=True)
+
+
+def histogram(df_episodes, params: list | None = None):
+    """Episode counts and hours per duration bucket, per set / measure /
+    station (buckets with no episodes included)."""
+    import numpy as np
+    import pandas as pd
+
+    labels = bucket_labels()
+    keys = ["set"] + list(params or []) + ["measure", "station"]
+    df = df_episodes[keys + ["hours"]].copy()
+    df["duration"] = pd.Categorical.from_codes(
+        np.searchsorted(BUCKET_EDGES, df["hours"].to_numpy(), side="right") - 1, labels)
+    out = df.groupby(keys + ["duration"], observed=False, dropna=False).agg(
+        episodes=("hours", "size"), hours=("hours", "sum")).reset_index()
+    #observed=False crosses every key; keep the combinations that exist
+    present = df_episodes[keys].drop_duplicates()
+    return present.merge(out, on=keys, how="left").sort_values(keys + ["duration"], ignore_index=True)
+
+
+# ----------------------------
+# Entry point
+# ----------------------------
+
+def main(out_dir=".", alternate_csv=None, landing_csv=None, grid_specs=None, stations=None,
+         bridge: int = 0, min_hours: int = 1):
+    from src import hourly, metars, sweep
+
+    metrics.start("episodes", out_dir)
+    sets = sweep.combinations(sweep.parse_grid(grid_specs))
+    req = suitability.Requirements(alternate_csv, landing_csv)
+
+    with metrics.timer("load"):
+        df_hourly = hourly.load(out_dir)
+        df_metars = metars.load(out_dir)
+    if stations:
+        df_hourly = df_hourly[df_hourly["station"].isin(stations)]
+        df_metars = df_metars[df_metars["station"].isin(stations)]
+
+    arrays, context = sweep.prepare(df_hourly, df_metars)
+    landing_worst = landing_extremes(arrays)
+    print(f"Finding episodes for {len(sets)} parameter sets over {len(context['stations'])} stations")
+    with metrics.timer("episodes"):
+        results = [policy_episodes(arrays, context, req.with_policy(sweep.make_policy(p, req.policy)),
+                                   bridge, landing_worst) for p in sets]
+
+    df = episodes_frame(sets, results, context["stations"], min_hours)
+    metrics.count("episodes", len(df))
+    path = Path(out_dir) / OUTPUT
+    df.to_csv(path, index=False)
+    print(f"Saved {len(df)} episodes to {path}")
+
+    hist = histogram(df, list(sets[0]))
+    path = Path(out_dir) / HISTOGRAM
+    hist.to_csv(path, index=False)
+    print(f"Saved {len(hist)} histogram rows to {path}")
+    metrics.finish()
+    return df, hist
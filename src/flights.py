@@ -0,0 +1,316 @@
+"""Bulk flight-schedule evaluation: destination and alternates per flight.
+
+    python -m src.main flights schedule.csv --alt-minima AlternateMinimaReqts.csv \
+        --landing-minima LandingMinimaReqts.csv --alt-list 2AltPolicy.csv
+
+The per-flight version of two_alt_policy_eval.R. The schedule is a CSV with
+one row per flight:
+
+    flight, destination, eta, planning_time [, alt1, alt2, ...]
+
+(times in anything pandas reads, UTC). For each flight:
+
+    destination     landing state of the ETA hour from the reports in it
+                    (suitable / unsuitable / missing), src/suitability.py
+    altN            each candidate's alternate state for the ETA hour, per
+                    the TAF in force at planning time: the latest one issued
+                    at or before planning_time - lag that covers the hour
+    legal           candidates suitable as an alternate
+    outcome         landable / diverted_covered / diverted_uncovered /
+                    no_observation (diverted: destination unsuitable;
+                    covered: at least `required` legal alternates)
+
+Candidates come from the schedule's altN columns, else --alt-list
+(2AltPolicy.csv: Aerodrome, Alt1, Alt2 with the leading C dropped, as the R
+script reads it), else the nearest stations within --nm (stations.csv).
+
+Nothing is joined row by row: the TAF hours are sorted by (station, hour,
+issued) and the reports' station-hours by (station, hour), so each flight /
+candidate is np.searchsorted on those keys, a whole column of flights at a
+time. Outputs flights_evaluated.csv and flights_summary.csv (per
+destination and ETA month).
+"""
+
+from __future__ import annotations
+
+import csv
+from pathlib import Path
+
+from src import metrics
+from src import suitability
+from src.suitability import SUITABLE, UNSUITABLE, MISSING
+
+OUTPUT = "flights_evaluated.csv"
+SUMMARY = "flights_summary.csv"
+
+DEFAULT_NM = 300
+MAX_ALTERNATES = 2
+STATE_NAMES = {SUITABLE: "suitable", UNSUITABLE: "unsuitable", MISSING: "missing"}
+OUTCOMES = ["landable", "diverted_covered", "diverted_uncovered", "no_observation"]
+
+
+# ----------------------------
+# Sorted lookup tables
+# ----------------------------
+
+class Lookup:
+    """TAF hours and landing station-hours as sorted int64 keys, on one
+    station coding."""
+
+    def __init__(self, rows: dict, landing: dict):
+        import numpy as np
+
+        self.stations = np.union1d(np.unique(rows["station"]), np.unique(landing["station"]))
+
+        # ---- TAF hours by (station, hour, issued) ----
+        code = np.searchsorted(self.stations, rows["station"]).astype(np.int64)
+        order = np.lexsort((rows["issued"], rows["hour"], code))
+        group = (code[order] << 32) | rows["hour"][order]
+        self.groups, gidx = np.unique(group, return_inverse=True)
+        #within a group rows are sorted by issue time: one key for "group, then issued"
+        self.taf_keys = (gidx.astype(np.int64) << 32) | rows["issued"][order]
+        self.taf_state = rows["state"][order]
+        self.taf_issued = rows["issued"][order]
+
+        # ---- landing station-hours ----
+        code = np.searchsorted(self.stations, landing["station"]).astype(np.int64)
+        keys = (code << 32) | landing["hour"]
+        order = np.argsort(keys, kind="stable")
+        self.land_keys = keys[order]
+        self.land_state = landing["state"][order]
+
+    def codes(self, names):
+        """Station codes for an array of names; -1 for unknown / blank."""
+        import numpy as np
+
+        names = np.asarray(names, dtype=str)
+        code = np.searchsorted(self.stations, names)
+        found = code < len(self.stations)
+        found[found] = self.stations[code[found]] == names[found]
+        return np.where(found, code, -1).astype(np.int64)
+
+    def landing(self, code, hour):
+        """Landing state per (code, hour); MISSING with no reports."""
+        import numpy as np
+
+        keys = (code << 32) | hour
+        pos = np.searchsorted(self.land_keys, keys)
+        hit = (code >= 0) & (pos < len(self.land_keys))
+        hit[hit] = self.land_keys[pos[hit]] == keys[hit]
+        return np.where(hit, self.land_state[np.minimum(pos, len(self.land_state) - 1)], MISSING).astype(np.int8)
+
+    def alternate(self, code, hour, cutoff):
+        """(state, issued) per (code, hour) from the latest TAF issued at or
+        before cutoff (epoch minutes) that covers the hour; (MISSING, -1)
+        without one."""
+        import numpy as np
+
+        n = len(code)
+        state = np.full(n, MISSING, dtype=np.int8)
+        issued = np.full(n, -1, dtype=np.int64)
+        if not len(self.groups):
+            return state, issued
+
+        gkey = (code << 32) | hour
+        g = np.searchsorted(self.groups, gkey)
+        ok = (code >= 0) & (g < len(self.groups))
+        ok[ok] = self.groups[g[ok]] == gkey[ok]
+        #last row of the group issued <= cutoff
+        pos = np.searchsorted(self.taf_keys, (g << 32) | np.maximum(cutoff, 0), side="right") - 1
+        ok &= pos >= 0
+        ok[ok] = (self.taf_keys[pos[ok]] >> 32) == g[ok]
+        state[ok] = self.taf_state[pos[ok]]
+        issued[ok] = self.taf_issued[pos[ok]]
+        return state, issued
+
+
+# ----------------------------
+# Schedule and candidates
+# ----------------------------
+
+def _minutes(values):
+    import numpy as np
+    import pandas as pd
+
+    times = pd.to_datetime(values, utc=True).dt.tz_localize(None)
+    if times.isna().any():
+        raise ValueError(f"{int(times.isna().sum())} schedule times could not be read")
+    return times.to_numpy("datetime64[m]").astype(np.int64)
+
+
+def load_schedule(path):
+    """Schedule frame plus eta / planning minutes; altN columns upper-cased."""
+    import pandas as pd
+
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    df.columns = [c.strip().lower() for c in df.columns]
+    missing = [c for c in ("flight", "destination", "eta", "planning_time") if c not in df.columns]
+    if missing:
+        raise ValueError(f"{path}: schedule needs columns {', '.join(missing)}")
+    df["destination"] = df["destination"].str.strip().str.upper()
+    for col in alternate_columns(df):
+        df[col] = df[col].str.strip().str.upper()
+    return df, _minutes(df["eta"]), _minutes(df["planning_time"])
+
+
+def alternate_columns(df) -> list[str]:
+    cols = [c for c in df.columns if c.startswith("alt") and c[3:].isdigit()]
+    return sorted(cols, key=lambda c: int(c[3:]))
+
+
+def load_alt_list(path) -> dict[str, list[str]]:
+    """2AltPolicy.csv -> {aerodrome: [alt1, alt2, ...]}; 3-letter codes get
+    the C back (str_c("C", ...) in two_alt_policy_eval.R)."""
+    def icao(code):
+        code = (code or "").strip().upper()
+        return "C" + code if len(code) == 3 else code
+
+    out = {}
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            row = {k.strip().lower(): v for k, v in row.items() if k}
+            alts = [icao(row[k]) for k in sorted((k for k in row if k.startswith("alt") and k[3:].isdigit()),
+                                                 key=lambda k: int(k[3:]))]
+            out[icao(row.get("aerodrome"))] = [a for a in alts if a]
+    return out
+
+
+def candidates(df, alt_list: dict | None = None, index=None, nm: float = DEFAULT_NM,
+               max_alternates: int = MAX_ALTERNATES):
+    """flights x max_alternates array of candidate ICAOs ('' for none)."""
+    import numpy as np
+
+    cols = alternate_columns(df)
+    if cols:
+        out = df[cols].to_numpy(str)
+        return out[:, :max_alternates] if out.shape[1] > max_alternates else out
+
+    #per destination, then broadcast to its flights
+    dests, inverse = np.unique(df["destination"].to_numpy(str), return_inverse=True)
+    table = np.full((len(dests), max_alternates), "", dtype=object)
+    for i, dest in enumerate(dests):
+        if alt_list is not None:
+            alts = alt_list.get(dest, [])
+        elif index is not None:
+            try:
+                alts = [icao for icao, _ in index.within(dest, nm)]
+            except KeyError:
+                alts = []
+        else:
+            alts = []
+        alts = alts[:max_alternates]
+        table[i, :len(alts)] = alts
+    return table.astype(str)[inverse]
+
+
+# ----------------------------
+# Evaluation
+# ----------------------------
+
+@metrics.timed()
+def evaluate(lookup: Lookup, destination, eta, planning, alternates, lag: int = 0, required: int = 1) -> dict:
+    """Column arrays per flight; alternates is flights x K ICAOs."""
+    import numpy as np
+
+    eta_hour = eta // 60
+    cutoff = planning - lag
+    dest = lookup.landing(lookup.codes(destination), eta_hour)
+
+    alt_state = np.full(alternates.shape, MISSING, dtype=np.int8)
+    alt_issued = np.full(alternates.shape, -1, dtype=np.int64)
+    for k in range(alternates.shape[1]):
+        alt_state[:, k], alt_issued[:, k] = lookup.alternate(lookup.codes(alternates[:, k]), eta_hour, cutoff)
+
+    legal = (alt_state == SUITABLE).sum(axis=1)
+    outcome = np.select(
+        [dest == SUITABLE, (dest == UNSUITABLE) & (legal >= required), dest == UNSUITABLE],
+        [0, 1, 2], default=3,
+    )
+    metrics.count("flights", len(eta))
+    return {"destination": dest, "alt_state": alt_state, "alt_issued": alt_issued, "legal": legal,
+            "outcome": outcome}
+
+
+def results_frame(df, alternates, result: dict):
+    import numpy as np
+    import pandas as pd
+
+    names = np.array([STATE_NAMES[s] for s in (SUITABLE, UNSUITABLE, MISSING)])
+    state_name = lambda s: names[np.select([s == SUITABLE, s == UNSUITABLE], [0, 1], default=2)]
+
+    out = pd.DataFrame({
+        "flight": df["flight"].to_numpy(),
+        "destination": df["destination"].to_numpy(),
+        "eta": df["eta"].to_numpy(),
+        "planning_time": df["planning_time"].to_numpy(),
+        "destination_landing": state_name(result["destination"]),
+    })
+    for k in range(alternates.shape[1]):
+        issued = result["alt_issued"][:, k]
+        out[f"alt{k + 1}"] = alternates[:, k]
+        out[f"alt{k + 1}_state"] = state_name(result["alt_state"][:, k])
+        out[f"alt{k + 1}_taf_issued"] = pd.Series(issued.astype("datetime64[m]")).where(issued >= 0)
+    out["legal_alternates"] = result["legal"]
+    out["outcome"] = np.array(OUTCOMES)[result["outcome"]]
+    return out
+
+
+def summary(df_flights, eta):
+    """Flights per destination and ETA month, counted by outcome."""
+    import pandas as pd
+
+    df = pd.DataFrame({
+        "destination": df_flights["destination"],
+        "month": eta.astype("datetime64[m]").astype("datetime64[M]").astype(str),
+        "outcome": pd.Categorical(df_flights["outcome"], OUTCOMES),
+    })
+    out = df.groupby(["destination", "month", "outcome"], observed=False).size().unstack("outcome", fill_value=0)
+    out = out[out.sum(axis=1) > 0].reset_index()
+    out.columns.name = None
+    out.insert(2, "flights", out[OUTCOMES].sum(axis=1))
+    diverted = out["diverted_covered"] + out["diverted_uncovered"]
+    out["landable_share"] = (out["landable"] / out["flights"]).round(4)
+    out["covered_when_diverted"] = (out["diverted_covered"] / diverted.where(diverted > 0)).round(4)
+    return out
+
+
+# ----------------------------
+# Entry point
+# ----------------------------
+
+def main(schedule_csv, out_dir=".", alternate_csv=None, landing_csv=None, alt_list_csv=None,
+         nm: float = DEFAULT_NM, max_alternates: int = MAX_ALTERNATES, lag: int = 0, required: int = 1):
+    from src import hourly, metars, stations
+
+    metrics.start("flights", out_dir)
+    req = suitability.Requirements(alternate_csv, landing_csv)
+    with metrics.timer("load_schedule"):
+        df, eta, planning = load_schedule(schedule_csv)
+    with metrics.timer("load"):
+        df_hourly = hourly.load(out_dir)
+        df_metars = metars.load(out_dir)
+    with metrics.timer("index"):
+        rows = suitability.alternate_rows(df_hourly, req)
+        lookup = Lookup(rows, suitability.landing_hours(suitability.landing_rows(df_metars, req)))
+    del df_hourly, df_metars
+
+    alt_list = load_alt_list(alt_list_csv) if alt_list_csv else None
+    index = None
+    if alt_list is None and (Path(out_dir) / stations.OUTPUT).exists():
+        index = stations.StationIndex.load(out_dir)
+    alternates = candidates(df, alt_list, index, nm, max_alternates)
+
+    with metrics.timer("evaluate"):
+        result = evaluate(lookup, df["destination"].to_numpy(str), eta, planning, alternates, lag, required)
+    df_flights = results_frame(df, alternates, result)
+    path = Path(out_dir) / OUTPUT
+    with metrics.timer("to_csv"):
+        df_flights.to_csv(path, index=False)
+    print(f"Saved {len(df_flights)} flights to {path}")
+
+    df_summary = summary(df_flights, eta)
+    df_summary.to_csv(Path(out_dir) / SUMMARY, index=False)
+    counts = df_flights["outcome"].value_counts()
+    print(", ".join(f"{counts.get(o, 0)} {o}" for o in OUTCOMES))
+    metrics.finish()
+    return df_flights, df_summary
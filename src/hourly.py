@@ -0,0 +1,456 @@
+"""Hourly TAF expansion: clean nested TAFs -> tafs_hourly.csv rows.
+
+Library half of process_hourly.py. expand_taf_to_hourly() turns one TAF into
+an hourly frame (TEMPO / PROB / BECMG overlays marked up in the text
+columns); build_hourly() does every TAF and adds the alternate-minima
+columns the R side reads.
+
+build_partitioned() is the out-of-core version of main(): it reads the TAF
+store one station (or station-year) at a time, sized to a memory budget,
+and streams each partition's rows to a part file that is appended to
+tafs_hourly.csv in order, so peak memory follows the largest partition
+rather than the whole output.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+import re
+from pathlib import Path
+
+from src.model import Taf, TafStatus, SegType, from_minutes, format_stamp
+from src import checkpoint
+from src import metrics
+
+OUTPUT = "tafs_hourly.csv"
+
+NAN = float("nan")   #same value pandas / numpy use for missing
+
+COLUMNS = ["raw_taf", "station", "issued", "status", "time", "wind", "vis", "sigwx", "clouds", "ceiling",
+           "altmin_ceiling", "altmin_vis", "prob_ceiling"]
+
+
+def to_timestamp(minutes):
+    #epoch minutes -> pandas Timestamp (None stays None, like pd.to_datetime(None))
+    import pandas as pd
+
+    if minutes is None:
+        return None
+    return pd.Timestamp(from_minutes(minutes))
+
+
+@metrics.timed()
+def expand_taf_to_hourly(taf):
+    import pandas as pd
+
+    taf_status = taf.status.name
+
+    start_time = to_timestamp(taf.valid_from)
+    end_time = to_timestamp(taf.valid_to)
+
+    if taf.status in {TafStatus.CANCELLED, TafStatus.NIL}:
+
+        #debug step:
+        #print(taf.issued)
+        #print(to_timestamp(taf.issued))
+
+        if pd.isna(start_time):
+            start_time = to_timestamp(taf.issued).ceil("h")
+        if pd.isna(end_time):
+            end_time = start_time + pd.Timedelta(hours=24)
+
+        hours = pd.date_range(start=start_time, end=end_time, freq="1h", inclusive="left")
+
+        return pd.DataFrame({
+            "raw_taf": taf.raw,
+            "station": taf.station,
+            "issued": format_stamp(taf.issued),
+            "status": taf_status,
+            "time": hours,
+            "wind": "",
+            "vis": "",
+            "sigwx": "",
+            "clouds": "",
+            "ceiling": ""
+            })
+    elif start_time is None or end_time is None:
+        metrics.drop("no_valid_period")
+        return None
+
+    hours = pd.date_range(start=start_time, end=end_time, freq="1h", inclusive="left")
+    df = pd.DataFrame({
+        "raw_taf": taf.raw,  # <--- add raw TAF column here
+        "station": taf.station,
+        "issued": format_stamp(taf.issued),
+        "status": taf_status,
+        "time": hours,
+        "wind": "",
+        "vis": "",
+        "sigwx": "",
+        "clouds": "",
+        "ceiling": ""
+    })
+
+    # Helper functions for adding markers
+    def add_tempo(base, val):
+        if val and base:
+            return f"{base} ({val})".strip()
+        elif base:
+            return base
+        elif val:
+            return f"({val})"
+        else:
+            return ""
+
+    def add_prob(base, val, prob):
+        return f"{base} [{prob}%: {val}]".strip() if val else base
+
+    def add_becmg(base, val):
+        return f"{base} -> {val}".strip() if val else base
+
+    def add_becmg_after(base, val):
+        return val or base
+
+    def format_wind(drn, speed, gust):
+        """Return wind as TAF-style string: e.g., 12010G20"""
+        if drn is None or speed is None:
+            return ""
+
+        speed_str = f"{int(speed):02d}"  # 2-digit speed
+        wind = drn + speed_str
+
+        if gust:
+            wind += "G" + f"{int(gust):02d}"
+
+        return wind + "KT"
+
+    # Iterate through all segments
+    for seg in taf.segments:
+        seg_type = seg.type
+        seg_start = to_timestamp(seg.start)
+        seg_end = to_timestamp(seg.end) if seg.end is not None else end_time
+
+        #extract segment data
+        wind = format_wind(seg.dir, seg.speed, seg.gust)
+        vis = seg.vis
+        sigwx = seg.sigwx
+        clouds = seg.clouds
+        ceiling = seg.ceiling
+        if ceiling:
+            ceiling = str(ceiling)
+
+
+        #throwing and error. trap:
+        try:
+            mask = (df["time"] >= seg_start) & (df["time"] < seg_end)
+        except Exception as e:
+            print("\nERROR CREATING MASK")
+            print("Station:", taf.station)
+            print("Raw TAF:", taf.raw)
+            print("Segment dict:", seg)
+            print("seg_start:", seg_start, type(seg_start))
+            print("seg_end:", seg_end, type(seg_end))
+            raise
+
+
+        if seg_type in [SegType.TAF, SegType.FM]:
+            df.loc[mask, ["wind", "vis", "sigwx", "clouds", "ceiling"]] = [wind, vis, sigwx, clouds, ceiling]
+
+        elif seg_type == SegType.TEMPO:
+            for col, val in zip(["wind", "vis", "sigwx", "clouds", "ceiling"], [wind, vis, sigwx, clouds, ceiling]):
+                if val:
+                    df.loc[mask, col] = df.loc[mask, col].apply(lambda x: add_tempo(x, val))
+
+        elif seg_type == SegType.PROB:
+            prob = int(re.search(r"PROB(\d{2})", seg.raw).group(1))
+            for col, val in zip(["wind", "vis", "sigwx", "clouds", "ceiling"], [wind, vis, sigwx, clouds, ceiling]):
+                if val:
+                    df.loc[mask, col] = df.loc[mask, col].apply(lambda x: add_prob(x, val, prob))
+
+        elif seg_type == SegType.BECMG:
+            # During the transition
+            during_mask = (df["time"] >= seg_start) & (df["time"] < seg_end)
+            for col, val in zip(["wind", "vis", "sigwx", "clouds", "ceiling"], [wind, vis, sigwx, clouds, ceiling]):
+                if val:
+                    df.loc[during_mask, col] = df.loc[during_mask, col].apply(lambda x: add_becmg(x, val))
+
+            # After transition complete
+            after_mask = df["time"] >= seg_end
+            for col, val in zip(["wind", "vis", "sigwx", "clouds", "ceiling"], [wind, vis, sigwx, clouds, ceiling]):
+                if val:
+                    df.loc[after_mask, col] = df.loc[after_mask, col].apply(lambda x: add_becmg_after(x, val))
+
+    return df
+
+
+#extract alternate minima data:
+
+# Extract numeric values for ceilings
+@metrics.timed()
+def extract_min_ceiling(text):
+    if not text:
+        return NAN
+    #exclude prob conditions
+    text_no_prob = re.sub(r"\[\d{2}%: \d+\]", "", text)
+
+    #extract ceilings from remaining string
+    vals = [float(x) for x in re.findall(r"\d+", text_no_prob)]
+    return min(vals) if vals else NAN
+
+@metrics.timed()
+def extract_prob_ceiling(text):
+    if not text:
+        return NAN
+    vals = [float(x) for x in re.findall(r"(?<=\[\d{2}%: )\d+(?=\])", text)]
+    return min(vals) if vals else NAN
+
+# Extract numeric values for visibility
+@metrics.timed()
+def extract_min_vis(text):
+    if not text:
+        return NAN
+    text = str(text)
+    #exclude prob condition:
+    text_no_prob = re.sub(r"\[\d{2}%: \d+(?:\.\d+)?\]", "", text)
+
+    #extract ceilings from remaining string
+    vals = [float(x) for x in re.findall(r"\d+(?:\.\d+)?", text_no_prob)]
+    return min(vals) if vals else NAN
+
+
+def add_alt_min_columns(df_tafs_hourly: pd.DataFrame) -> pd.DataFrame:
+    # Apply vectorized (under the hood this is compiled regex run in C)
+    df_tafs_hourly["altmin_ceiling"] = df_tafs_hourly["ceiling"].apply(extract_min_ceiling)
+    df_tafs_hourly["altmin_vis"] = df_tafs_hourly["vis"].apply(extract_min_vis)
+    df_tafs_hourly["prob_ceiling"] = df_tafs_hourly["ceiling"].apply(extract_prob_ceiling)
+    return df_tafs_hourly
+
+
+def build_hourly(tafs: list[Taf]) -> pd.DataFrame:
+    """Expand every TAF hourly and add altmin_ceiling / altmin_vis / prob_ceiling."""
+    import pandas as pd
+
+    print("running")
+    metrics.count("tafs_in", len(tafs))
+
+    # ---- Run for all TAFs ----
+    #(a TAF that raises is quarantined, see src/checkpoint.py, rather than ending the run)
+    all_taf_hours = []
+    for taf in tafs:
+        df_hourly = checkpoint.guard("hourly", _taf_key(taf), taf, expand_taf_to_hourly, taf)
+        all_taf_hours.append(df_hourly)
+
+    with metrics.timer("concat"):
+        df_tafs_hourly = pd.concat(all_taf_hours, ignore_index=True)
+    metrics.count("hourly_rows_out", len(df_tafs_hourly))
+
+    #initialize columns
+    df_tafs_hourly["altmin_ceiling"] = NAN
+    df_tafs_hourly["altmin_vis"] = NAN
+    df_tafs_hourly["prob_ceiling"] = NAN
+
+    print("starting alt min processing")
+    return add_alt_min_columns(df_tafs_hourly)
+
+
+def save(df_tafs_hourly: pd.DataFrame, out_dir="."):
+    path = Path(out_dir) / OUTPUT
+    with metrics.timer("to_csv"):
+        df_tafs_hourly.to_csv(path, index=False)
+    print(f"Saved {len(df_tafs_hourly)} hourly rows to {path}")
+
+
+# ----------------------------
+# Partitioned (out-of-core) run
+# ----------------------------
+
+# peak bytes per hourly row while a partition is expanded, alt-min columns
+# added and written (frames per TAF, the concat copy, the CSV buffer); about
+# 1.5 KB measured on the synthetic corpus, doubled and more for long TAF text.
+# The budget is on top of each process's ~75 MB of pandas / NumPy.
+ROW_BYTES = 4096
+PARTS_DIR = "tafs_hourly.parts"
+
+
+def estimate_rows(entry) -> int:
+    """Hourly rows a store index entry expands to (24 for NIL / CNL
+    without a valid period, 0 when it has none)."""
+    if entry.valid_from is not None and entry.valid_to is not None:
+        return max(0, -(-entry.valid_to // 60) - -(-entry.valid_from // 60))
+    return 24 if entry.status in {TafStatus.CANCELLED, TafStatus.NIL} else 0
+
+
+def partitions(index, by: str = "station", budget_rows: int | None = None, stations=None) -> list[list[int]]:
+    """Store positions grouped by station (by="station-year": station and
+    year issued), in store order; a group estimated over budget_rows is cut
+    into consecutive pieces that are not."""
+    groups = {}
+    for i, e in enumerate(index):
+        if stations is not None and e.station not in stations:
+            continue
+        key = e.station
+        if by == "station-year":
+            key = (e.station, from_minutes(e.issued).year if e.issued is not None else None)
+        groups.setdefault(key, []).append(i)
+
+    out = []
+    for positions in groups.values():   # dicts keep first-seen order, i.e. store order
+        part, rows = [], 0
+        for i in positions:
+            n = estimate_rows(index[i])
+            if part and budget_rows is not None and rows + n > budget_rows:
+                out.append(part)
+                part, rows = [], 0
+            part.append(i)
+            rows += n
+        out.append(part)
+    return out
+
+
+def _taf_key(taf) -> str:
+    return f"{taf.station} {format_stamp(taf.issued)}"
+
+
+def build_partition(store_path, positions: list[int], part_path) -> dict:
+    """Expand one partition from the store straight to a headerless CSV part
+    (runs in a worker process). TAFs that raise come back as quarantine
+    entries instead of failing the partition."""
+    import os
+    from src import checkpoint
+    from src.taf_store import TafStore
+
+    frames, quarantined = [], []
+    with TafStore(store_path) as store:
+        for i in positions:
+            taf = store.load(i)
+            try:
+                df = expand_taf_to_hourly(taf)
+            except Exception as e:
+                quarantined.append(checkpoint.entry("hourly", _taf_key(taf), taf, e))
+                continue
+            if df is not None:
+                frames.append(df)
+
+    #written under a temp name and renamed, so a part that exists is complete
+    part_path = Path(part_path)
+    tmp = part_path.with_name(part_path.name + ".tmp")
+    rows = 0
+    if frames:
+        import pandas as pd
+        df = pd.concat(frames, ignore_index=True)
+        del frames
+        df["altmin_ceiling"] = NAN
+        df["altmin_vis"] = NAN
+        df["prob_ceiling"] = NAN
+        add_alt_min_columns(df).to_csv(tmp, index=False, header=False)
+        rows = len(df)
+    else:
+        tmp.write_bytes(b"")
+    os.replace(tmp, part_path)
+    return {"part": str(part_path), "tafs": len(positions), "rows": rows,
+            "quarantined": quarantined, "peak_rss_mb": metrics.peak_rss_mb()}
+
+
+def build_partitioned(out_dir=".", stations=None, memory_mb: int = 1024, jobs: int = 1, by: str = "station",
+                      restart: bool = False) -> int:
+    """tafs_hourly.csv partition by partition; jobs worker processes, each
+    kept to memory_mb / jobs. Returns the row count.
+
+    Same rows as build_hourly(), grouped by partition (store order within
+    each) instead of in store order. Finished parts are kept in
+    tafs_hourly.parts/ with a ledger until the CSV is assembled, so a
+    failed run picks up where it stopped (restart=True starts over).
+    """
+    import shutil
+    from concurrent.futures import ProcessPoolExecutor
+    from src import checkpoint, clean
+    from src.taf_store import TafStore
+
+    store_path = Path(out_dir) / clean.OUTPUT
+    with TafStore(store_path) as store:
+        index = store.index
+    budget_rows = max(1, memory_mb * 2**20 // max(1, jobs) // ROW_BYTES)
+    parts = partitions(index, by, budget_rows, set(stations) if stations else None)
+    metrics.count("tafs_in", sum(map(len, parts)))
+    metrics.count("partitions", len(parts))
+
+    parts_dir = Path(out_dir) / PARTS_DIR
+    parts_dir.mkdir(exist_ok=True)
+    part_paths = [parts_dir / f"part-{n:05d}.csv" for n in range(len(parts))]
+    ledger = checkpoint.Ledger(parts_dir / "ledger.json", {
+        **checkpoint.file_fingerprint(store_path),
+        "by": by,
+        "budget_rows": budget_rows,
+        "stations": sorted(stations) if stations else None,
+        "partitions": len(parts),
+    })
+    if restart:
+        ledger.clear()
+    if not len(ledger):
+        checkpoint.reset(out_dir, "hourly")
+    todo = [n for n in range(len(parts)) if not (ledger.done(n) and part_paths[n].exists())]
+    print(f"{len(parts)} partitions, up to {budget_rows} hourly rows each, {jobs} job(s)"
+          + (f"; resuming, {len(parts) - len(todo)} already done" if len(todo) < len(parts) else ""))
+    metrics.count("partitions_resumed", len(parts) - len(todo))
+
+    peak = 0.0
+    pool = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 and len(todo) > 1 else None
+    try:
+        args = ([store_path] * len(todo), [parts[n] for n in todo], [part_paths[n] for n in todo])
+        results = pool.map(build_partition, *args) if pool is not None else map(build_partition, *args)
+        with metrics.timer("partitions"):
+            for n, result in zip(todo, results):
+                checkpoint.add("hourly", result["quarantined"])
+                checkpoint.flush(out_dir)
+                ledger.mark(n, rows=result["rows"], tafs=result["tafs"], quarantined=len(result["quarantined"]))
+                peak = max(peak, result["peak_rss_mb"] or 0.0)
+    except BaseException:
+        print(f"Stopped with {len(ledger)} of {len(parts)} partitions done; run again to resume")
+        raise
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    #every part is complete: assemble, then drop the parts and the ledger
+    path = Path(out_dir) / OUTPUT
+    tmp = path.with_name(path.name + ".tmp")
+    with metrics.timer("assemble"), tmp.open("wb") as out:
+        out.write((",".join(COLUMNS) + "\n").encode("utf-8"))
+        for part in part_paths:
+            with part.open("rb") as f:
+                shutil.copyfileobj(f, out)
+    tmp.replace(path)
+    total = sum(ledger.done(n)["rows"] for n in range(len(parts)))
+    ledger.clear()
+    shutil.rmtree(parts_dir, ignore_errors=True)
+
+    metrics.count("hourly_rows_out", total)
+    print(f"Saved {total} hourly rows to {path}" + (f" (worker peak {peak} MB)" if peak else ""))
+    return total
+
+
+def load(out_dir=".") -> pd.DataFrame:
+    import pandas as pd
+    return pd.read_csv(Path(out_dir) / OUTPUT)
+
+
+def main(out_dir=".", stations=None, memory_mb: int | None = None, jobs: int = 1, by: str = "station",
+         restart: bool = False):
+    from src.taf_store import read_tafs
+    from src import clean
+
+    metrics.start("hourly", out_dir)
+    if memory_mb is not None:
+        build_partitioned(out_dir, stations, memory_mb, jobs, by, restart)
+        metrics.finish()
+        return
+
+    #a single pass starts over, so its quarantine does too
+    checkpoint.reset(out_dir, "hourly")
+
+    # Load nested TAFs (produced from earlier step); stations limits which get decoded
+    with metrics.timer("read_tafs"):
+        tafs = read_tafs(Path(out_dir) / clean.OUTPUT, stations=stations)
+    save(build_hourly(tafs), out_dir)
+    checkpoint.flush(out_dir)
+    metrics.finish()
@@ -0,0 +1,223 @@
+"""Streaming ingest: parse Ogimet months while later ones are still downloading.
+
+ogimet_scraper.py and the parse stage are two full passes (download
+everything to data/, then re-read all of data/). Here one producer thread
+fetches (station, month) units and puts each response on a bounded queue;
+parser threads take them off, extract reports straight from the response
+text (src/parser.py) and
+
+    - archive the raw text to data/{ICAO}_{YYYY-MM}.txt.gz (provenance
+      only; src/archive.py)
+    - append the parsed entry to parsed_reports.partial.jsonl
+
+so a refresh takes about as long as the download. At the end the new
+entries are merged into parsed_reports.json by filename (same order and
+shape parse_archive() gives) and `run --from dev` picks them up.
+
+The download is rate limited (ogimet_scraper.REQUEST_DELAY between
+requests) and parsing a month takes milliseconds, so threads are enough:
+the queue bound only matters when the parser falls behind, and then the
+producer waits instead of holding every response in memory.
+
+Units already archived are not downloaded again; they are parsed from
+data/ only when neither report file has them yet (e.g. after a crash
+between archiving and the final merge).
+"""
+
+import json
+import queue
+import threading
+import time
+from pathlib import Path
+
+from src import archive
+from src import metrics
+from src import parser
+
+PARTIAL = "parsed_reports.partial.jsonl"
+
+_DONE = None        # queue sentinel, one per parser thread
+
+
+def archive_name(icao: str, year: int, month: int) -> str:
+    return f"{icao}_{year}-{month:02d}.txt"
+
+
+def month_range(start: str, end: str) -> list[tuple[int, int]]:
+    """'2024-01', '2024-03' -> [(2024, 1), (2024, 2), (2024, 3)]."""
+    y, m = map(int, start.split("-"))
+    y_end, m_end = map(int, end.split("-"))
+    out = []
+    while (y, m) <= (y_end, m_end):
+        out.append((y, m))
+        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+    return out
+
+
+# ----------------------------
+# Fetchers: (icao, year, month) -> response text or None
+# ----------------------------
+
+def ogimet_fetcher(delay: float | None = None):
+    """ogimet_scraper.fetch_ogimet with its pause after every request."""
+    import ogimet_scraper
+
+    delay = ogimet_scraper.REQUEST_DELAY if delay is None else delay
+
+    def fetch(icao, year, month):
+        try:
+            return ogimet_scraper.fetch_ogimet(icao, year, month)
+        finally:
+            time.sleep(delay)
+    return fetch
+
+
+def directory_fetcher(source, delay: float = 0.0):
+    """Serve archive files from another directory, optionally with a fake
+    per-request delay -- a local stand-in for Ogimet."""
+    source = Path(source)
+
+    def fetch(icao, year, month):
+        time.sleep(delay)
+        path = archive.locate(source, archive_name(icao, year, month))
+        return archive.read_bytes(path).decode("utf-8") if path else None
+    return fetch
+
+
+# ----------------------------
+# Report store
+# ----------------------------
+
+def load_partial(out_dir=".") -> dict:
+    """{filename: entry} from the partial log; a torn last line is ignored."""
+    path = Path(out_dir) / PARTIAL
+    entries = {}
+    if not path.exists():
+        return entries
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                metrics.drop("partial_torn_line")
+                continue
+            entries[entry["filename"]] = entry
+    return entries
+
+
+def merge(new: dict, out_dir=".") -> list:
+    """Fold {filename: entry} into parsed_reports.json (new entries win)."""
+    path = Path(out_dir) / parser.CHECKPOINT
+    entries = {e["filename"]: e for e in parser.load(out_dir)} if path.exists() else {}
+    entries.update(new)
+    all_files = [entries[name] for name in sorted(entries)]
+    parser.save(all_files, out_dir)
+    return all_files
+
+
+# ----------------------------
+# Producer / consumers
+# ----------------------------
+
+def _produce(units, fetch, q: queue.Queue, n_consumers: int, failed: list):
+    for icao, year, month in units:
+        with metrics.timer("fetch"):
+            text = fetch(icao, year, month)
+        if not text:
+            print(f"Failed {icao} {year}-{month:02d}")
+            failed.append((icao, year, month))
+            continue
+        metrics.count("fetched")
+        with metrics.timer("queue_put"):        #time spent blocked on a full queue
+            q.put((archive_name(icao, year, month), text))
+    for _ in range(n_consumers):
+        q.put(_DONE)
+
+
+def _consume(q: queue.Queue, data_dir: Path, log, lock: threading.Lock, parsed: dict):
+    while (item := q.get()) is not _DONE:
+        name, text = item
+        try:
+            with metrics.timer("parse"):
+                entry = parser.file_output(name, *parser.reports_from_buffer(text.encode("utf-8")))
+        except Exception as e:
+            #keep draining, or the producer blocks on a full queue
+            print(f"Could not parse {name}: {e!r}")
+            metrics.drop("parse_error")
+            continue
+        line = json.dumps(entry, ensure_ascii=False)
+        with lock:
+            try:
+                _, problems = archive.write(data_dir, name, text)
+                log.write(line + "\n")
+                log.flush()
+            except Exception as e:
+                #same as a parse error: a dead consumer would hang the producer
+                print(f"Could not store {name}: {e!r}")
+                metrics.drop("write_error")
+                continue
+            metrics.count("busted_tempo_lines", len(problems))
+            parsed[name] = entry
+        print(f"Parsed {name}: {len(entry['tafs'])} TAFs, {len(entry['metars'])} METARs")
+
+
+def ingest(stations, months, fetch, data_dir="data", out_dir=".", workers: int = 1,
+           queue_size: int = 4, refresh: bool = False) -> dict:
+    """Fetch, parse and store every (station, month); returns {filename: entry}."""
+    data_dir, out_dir = Path(data_dir), Path(out_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    parsed = load_partial(out_dir)
+    stored = set(parsed)
+    if (out_dir / parser.CHECKPOINT).exists():
+        stored |= {e["filename"] for e in parser.load(out_dir)}
+
+    units, skipped = [], 0
+    for icao in stations:
+        for year, month in months:
+            name = archive_name(icao, year, month)
+            path = archive.locate(data_dir, name)
+            if refresh or path is None:
+                units.append((icao, year, month))
+            elif name not in stored:
+                #archived but never made it into a report file
+                parsed[name] = parser.build_output_for_file(path)
+                metrics.count("reparsed")
+            else:
+                skipped += 1
+    metrics.count("units", len(units))
+    metrics.count("skipped", skipped)
+    print(f"Ingesting {len(units)} station-months ({skipped} already stored)")
+
+    q = queue.Queue(maxsize=queue_size)
+    lock = threading.Lock()
+    failed = []
+    with (out_dir / PARTIAL).open("a", encoding="utf-8") as log:
+        threads = [threading.Thread(target=_consume, args=(q, data_dir, log, lock, parsed), daemon=True)
+                   for _ in range(workers)]
+        for t in threads:
+            t.start()
+        t_fetch = time.perf_counter()
+        _produce(units, fetch, q, workers, failed)
+        fetch_done = time.perf_counter()
+        for t in threads:
+            t.join()
+
+    #parsing left over once the last download finished: the part a
+    #separate parse pass would have been
+    metrics.count("tail_ms", round((time.perf_counter() - fetch_done) * 1000))
+    metrics.count("download_ms", round((fetch_done - t_fetch) * 1000))
+    metrics.count("failed", len(failed))
+    return parsed
+
+
+def main(stations, start, end, fetch=None, data_dir="data", out_dir=".", workers: int = 1,
+         queue_size: int = 4, refresh: bool = False):
+    metrics.start("ingest", out_dir)
+    fetch = fetch or ogimet_fetcher()
+    parsed = ingest(stations, month_range(start, end), fetch, data_dir, out_dir, workers, queue_size, refresh)
+    with metrics.timer("merge"):
+        merge(parsed, out_dir)
+    (Path(out_dir) / PARTIAL).unlink(missing_ok=True)
+    metrics.finish()
@@ -0,0 +1,280 @@
+"""Watch mode: keep hourly suitability current as new reports land.
+
+    python -m src.main watch incoming/ --stations CYTH CYYQ \
+        --alt-minima AlternateMinimaReqts.csv --landing-minima LandingMinimaReqts.csv
+
+Polls a drop directory (archive files, plain or compressed, appended to or
+replaced) or a fetcher standing in for Ogimet, and only handles what is
+new since the last poll:
+
+    - each source remembers how far into its text it has read, so only
+      the reports after that (complete up to their '=') are parsed
+    - a new TAF is built, checked (clean.drop_reason) and expanded on its
+      own -- one station's latest TAF, not the whole hourly stage
+    - a new METAR / SPECI is decoded and judged against the landing minima
+
+LiveState holds, per station, every recent TAF's hourly alternate states
+and every recent report's landing state, and answers "which hours of the
+next 24 are suitable" with the same rules as src/suitability.py (TAF in
+force: latest issued at least 3 h before the hour; an hour is unsuitable
+for landing if any report in it is). Anything older than keep_hours
+before the newest report is dropped, so state stays small.
+
+The clock is the newest report seen ("data", right for replays and for
+Ogimet's lag) or the wall clock ("wall").
+"""
+
+from __future__ import annotations
+
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from src import metrics
+from src import suitability
+from src.model import from_minutes, parse_stamp, to_minutes
+from src.suitability import SUITABLE, UNSUITABLE, MISSING
+
+KEEP_HOURS = 48
+STATE_CHARS = {SUITABLE: "+", UNSUITABLE: "-", MISSING: "?"}
+
+
+# ----------------------------
+# Sources: only the new reports
+# ----------------------------
+
+def new_reports(buf: bytes, offset: int) -> tuple[list, int]:
+    """Reports in buf after offset, up to the last complete one; (reports,
+    new offset)."""
+    from src import parser
+
+    end = buf.rfind(b"=")
+    if end < offset:
+        return [], offset
+    return parser.extract_reports_bytes(buf[offset:end + 1]), end + 1
+
+
+class DropDirectory:
+    """Archive files in a directory; a file is re-read only when its size
+    or mtime changes, and only past what was already read."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._seen = {}         # file name -> (size, mtime)
+        self._offset = {}       # logical name -> bytes of text handled
+
+    def poll(self) -> list:
+        from src import archive
+
+        reports = []
+        for path in archive.find(self.path):
+            st = path.stat()
+            if self._seen.get(path.name) == (st.st_size, st.st_mtime_ns):
+                continue
+            self._seen[path.name] = (st.st_size, st.st_mtime_ns)
+
+            name = archive.logical_name(path)
+            buf = archive.read_bytes(path)
+            offset = self._offset.get(name, 0)
+            if len(buf) < offset:
+                #replaced by a shorter file: start over (LiveState skips repeats)
+                offset = 0
+            found, self._offset[name] = new_reports(buf, offset)
+            reports += found
+        return reports
+
+
+class FetchSource:
+    """Current month per station from a fetcher (src/ingest.py), polled."""
+
+    def __init__(self, fetch, stations, clock=None):
+        self.fetch = fetch
+        self.stations = list(stations)
+        self.clock = clock or (lambda: datetime.now(timezone.utc))
+        self._offset = {}
+
+    def poll(self) -> list:
+        now = self.clock()
+        reports = []
+        for icao in self.stations:
+            text = self.fetch(icao, now.year, now.month)
+            if not text:
+                continue
+            key = (icao, now.year, now.month)
+            found, self._offset[key] = new_reports(text.encode("utf-8"), self._offset.get(key, 0))
+            reports += found
+        return reports
+
+
+# ----------------------------
+# State
+# ----------------------------
+
+class LiveState:
+    """Recent hourly alternate / landing states per station."""
+
+    def __init__(self, req: suitability.Requirements | None = None, stations=None, keep_hours: int = KEEP_HOURS):
+        self.req = req or suitability.Requirements()
+        self.stations = set(stations) if stations else None
+        self.keep_minutes = keep_hours * 60
+        self.latest = None                  # newest issue time seen (epoch minutes)
+        self.tafs = {}                      # station -> {issued: (valid_to, {hour: state})}
+        self.metars = {}                    # station -> {issued: (raw, state) or None if duplicated}
+
+    # ---- updates ----
+
+    def add(self, reports: list) -> set:
+        """Fold in parsed report dicts (src/parser.py); returns the
+        stations that changed."""
+        reports = [r for r in reports if r["issued"] and (self.stations is None or r["station"] in self.stations)]
+        if not reports:
+            return set()
+
+        newest = max(parse_stamp(r["issued"]) for r in reports)
+        self.latest = newest if self.latest is None else max(self.latest, newest)
+        cutoff = self.latest - self.keep_minutes
+
+        tafs = [r for r in reports if r["type"].startswith("TAF") and parse_stamp(r["issued"]) >= cutoff]
+        metars = [r for r in reports if not r["type"].startswith("TAF") and parse_stamp(r["issued"]) >= cutoff]
+        changed = self._add_tafs(tafs) | self._add_metars(metars)
+        self._prune(cutoff)
+        return changed
+
+    def _add_tafs(self, reports: list) -> set:
+        from src import clean, hourly, tafs as tafs_mod
+
+        changed = set()
+        for r in reports:
+            taf = tafs_mod.build_taf(r)
+            reason = clean.drop_reason(taf)
+            if reason:
+                metrics.drop(reason)
+                continue
+            df = hourly.expand_taf_to_hourly(taf)
+            if df is None or df.empty:
+                continue
+            rows = suitability.alternate_rows(hourly.add_alt_min_columns(df), self.req)
+            #a re-sent TAF (same station and issue time) replaces the old one
+            self.tafs.setdefault(taf.station, {})[taf.issued] = (
+                taf.valid_to or int(rows["hour"].max() + 1) * 60,
+                dict(zip(rows["hour"].tolist(), rows["state"].tolist())),
+            )
+            metrics.count("tafs_added")
+            changed.add(taf.station)
+        return changed
+
+    def _add_metars(self, reports: list) -> set:
+        import pandas as pd
+        from src import metars as metars_mod
+
+        fresh, clashes = {}, set()
+        for r in reports:
+            known = self.metars.setdefault(r["station"], {})
+            issued = parse_stamp(r["issued"])
+            key = (r["station"], issued)
+            if issued in known:
+                #two different reports for one time: R drops both
+                if known[issued] is not None and known[issued][0] != r["raw"]:
+                    known[issued] = None
+                    metrics.drop("duplicate_metar")
+            elif key in fresh:
+                if fresh[key]["raw"] != r["raw"]:
+                    clashes.add(key)
+            else:
+                fresh[key] = r
+        for station, issued in clashes:
+            del fresh[(station, issued)]
+            self.metars[station][issued] = None
+            metrics.drop("duplicate_metar")
+        if not fresh:
+            return set()
+
+        #one report per (station, issue time) left, so landing_rows keeps them all, in order
+        df = metars_mod.parse_metars(pd.DataFrame(list(fresh.values())))
+        rows = suitability.landing_rows(df, self.req)
+        for station, issued, raw, state in zip(rows["station"], rows["issued"].tolist(), df["raw"], rows["state"].tolist()):
+            self.metars[station][issued] = (raw, state)
+        metrics.count("metars_added", len(rows["state"]))
+        return set(rows["station"].tolist())
+
+    def _prune(self, cutoff: int):
+        for station, by_issued in self.tafs.items():
+            for issued in [i for i, (valid_to, _) in by_issued.items() if valid_to < cutoff]:
+                del by_issued[issued]
+        for station, by_issued in self.metars.items():
+            for issued in [i for i in by_issued if i < cutoff]:
+                del by_issued[issued]
+
+    # ---- queries ----
+
+    def now_hour(self, clock: str = "data") -> int | None:
+        if clock == "wall":
+            return to_minutes(datetime.now(timezone.utc).replace(tzinfo=None)) // 60
+        return None if self.latest is None else self.latest // 60
+
+    def alternate(self, station: str, start_hour: int, hours: int = 24) -> list:
+        """(state, issued of the TAF in force) per hour from start_hour."""
+        out = []
+        by_issued = self.tafs.get(station, {})
+        for hour in range(start_hour, start_hour + hours):
+            best = None
+            for issued, (_, states) in by_issued.items():
+                if hour in states and issued <= hour * 60 - suitability.TAF_LAG_MINUTES:
+                    if best is None or issued > best:
+                        best = issued
+            out.append((by_issued[best][1][hour], best) if best is not None else (MISSING, None))
+        return out
+
+    def landing(self, station: str, hour: int) -> int:
+        """State of one hour from the reports in it."""
+        states = [v[1] for issued, v in self.metars.get(station, {}).items()
+                  if v is not None and issued // 60 == hour]
+        if any(s == UNSUITABLE for s in states):
+            return UNSUITABLE
+        if states and all(s == SUITABLE for s in states):
+            return SUITABLE
+        return MISSING
+
+    def summary(self, station: str, now_hour: int, hours: int = 24) -> str:
+        alt = self.alternate(station, now_hour, hours)
+        strip = "".join(STATE_CHARS[s] for s, _ in alt)
+        n_ok = sum(s == SUITABLE for s, _ in alt)
+        landing = {SUITABLE: "suitable", UNSUITABLE: "below minima", MISSING: "no verdict"}[self.landing(station, now_hour)]
+        return (f"{station} from {from_minutes(now_hour * 60):%Y-%m-%d %H}Z  alternate {strip}  "
+                f"{n_ok}/{hours} h  landing now: {landing}")
+
+
+# ----------------------------
+# Loop
+# ----------------------------
+
+def update(source, state: LiveState, clock: str = "data", hours: int = 24) -> dict:
+    """One poll: new reports in, summaries for changed stations out."""
+    t0 = time.perf_counter()
+    reports = source.poll()
+    changed = state.add(reports)
+    ms = (time.perf_counter() - t0) * 1000
+    metrics.count("updates")
+    metrics.count("reports_in", len(reports))
+
+    now = state.now_hour(clock)
+    if changed and now is not None:
+        for station in sorted(changed):
+            print(state.summary(station, now, hours))
+    if reports:
+        print(f"  {len(reports)} new reports, {len(changed)} stations updated in {ms:.0f} ms")
+    return {"reports": len(reports), "changed": sorted(changed), "ms": ms}
+
+
+def watch(source, state: LiveState, interval: float = 60.0, clock: str = "data", hours: int = 24,
+          polls: int | None = None):
+    """Poll until interrupted (or polls times)."""
+    n = 0
+    try:
+        while polls is None or n < polls:
+            update(source, state, clock, hours)
+            n += 1
+            if polls is None or n < polls:
+                time.sleep(interval)
+    except KeyboardInterrupt:
+        print("Stopped")
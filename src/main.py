@@ -0,0 +1,543 @@
+"""Command line entry point.
+
+    python -m src.main run                        # whole chain, data/ -> .
+    python -m src.main run --from clean           # reuse checkpoints up to tafs
+    python -m src.main run --only metars --jobs 1
+    python -m src.main run --sample 0.01 --seed 7     # stratified 1% slice, sample_report.json
+    python -m src.main stages                     # show the graph
+    python -m src.main ingest --stations CYYQ CYTH --start 2024-01 --end 2024-03
+    python -m src.main batch run --data data --workers 4  # station-month work queue, then merge
+    python -m src.main hourly --memory-mb 2048 --jobs 4   # station-partitioned, out of core
+    python -m src.main runs build                 # run-length encoded tafs_hourly_runs.csv
+    python -m src.main compress --data data       # gzip / zstd the raw archive
+    python -m src.main taf CYYQ "2024-01-05 12:00"  # TAF in force then
+    python -m src.main pack                       # store amendments as deltas
+    python -m src.main check CYYQ                 # re-validate one station
+    python -m src.main verify --alt-minima AlternateMinimaReqts.csv
+    python -m src.main climatology build --alt-minima ... --landing-minima ...
+    python -m src.main climatology query landing --station CYYQ --by month_of_year hour
+    python -m src.main watch incoming/ --stations CYTH --alt-minima ...   # live availability
+    python -m src.main serve --alt-minima ... --landing-minima ... --port 8765   # JSON queries
+    python -m src.main stations build                # stations.csv from the file headers
+    python -m src.main stations near CYTH --nm 250
+    python -m src.main sweep --alt-minima ... --grid max_tailwind=5,10,15 --grid prob_rule=haa,none
+    python -m src.main flights schedule.csv --alt-list 2AltPolicy.csv --alt-minima ...   # per-flight verdicts
+    python -m src.main episodes --alt-minima ... --landing-minima ...   # below-minima stretches
+
+The old one-script-per-step files (parse_metar_taf.py, build_taf.py, ...)
+still work and run a single stage from the previous stage's files.
+
+Keep this module (and the light commands' code paths) stdlib-only: pandas,
+NumPy and bs4 are imported inside the functions that need them, so `taf`,
+`check` and `stages` start in a fraction of the time a pandas import takes.
+bench/startup.py tracks that.
+"""
+
+import argparse
+import sys
+from datetime import datetime
+from pathlib import Path
+
+
+def cmd_run(args):
+    from src.pipeline import PipelineConfig, run_pipeline
+
+    cfg = PipelineConfig(
+        data_dir=args.data,
+        out_dir=args.out,
+        run=args.run,
+        checkpoints=not args.no_checkpoints,
+        jobs=args.jobs,
+        stations=args.stations,
+        landing_minima=args.landing_minima,
+        sample=args.sample,
+        seed=args.seed,
+        sample_unit=args.sample_unit,
+    )
+    run_pipeline(cfg, targets=args.only, from_stage=args.from_stage)
+
+
+def cmd_ingest(args):
+    from src import ingest
+
+    fetch = ingest.directory_fetcher(args.source, args.delay or 0.0) if args.source else ingest.ogimet_fetcher(args.delay)
+    ingest.main([s.upper() for s in args.stations], args.start, args.end, fetch, args.data, args.out,
+                args.workers, args.queue_size, args.refresh)
+
+
+def cmd_compress(args):
+    from src import archive
+
+    before, after = archive.compress_folder(args.data, args.codec)
+    if before:
+        print(f"{before} -> {after} bytes ({before / max(after, 1):.1f}x)")
+    else:
+        print("Nothing to compress")
+
+
+def cmd_stages(args):
+    from src.pipeline import STAGES
+
+    for stage in STAGES.values():
+        deps = ", ".join(stage.deps) or "-"
+        final = "  (final output)" if stage.final else ""
+        print(f"{stage.name:<8} <- {deps}{final}")
+
+
+def parse_time(value: str) -> int:
+    """'2024-01-05 12:00', '2024-01-05T12' or '202401051200' -> epoch minutes."""
+    from src.model import parse_stamp, to_minutes
+
+    if value.isdigit() and len(value) == 12:
+        return parse_stamp(value)
+    try:
+        return to_minutes(datetime.fromisoformat(value))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"bad time {value!r}") from None
+
+
+def _fraction(value: str) -> float:
+    try:
+        f = float(value)
+    except ValueError:
+        f = -1.0
+    if not 0 < f <= 1:
+        raise argparse.ArgumentTypeError(f"sample fraction must be in (0, 1], got {value!r}")
+    return f
+
+
+def active_segments(taf, minute: int) -> list[bool]:
+    """Per segment: does it apply at minute? The base / latest FM group
+    prevails; TEMPO / PROB / BECMG apply inside their own period."""
+    from src.model import SegType
+
+    prevailing = None
+    for i, seg in enumerate(taf.segments):
+        if seg.type in (SegType.TAF, SegType.FM) and (seg.start is None or seg.start <= minute):
+            prevailing = i
+
+    flags = []
+    for i, seg in enumerate(taf.segments):
+        if seg.type in (SegType.TAF, SegType.FM):
+            flags.append(i == prevailing)
+        else:
+            flags.append(seg.start is not None and seg.end is not None and seg.start <= minute < seg.end)
+    return flags
+
+
+def cmd_taf(args):
+    from src.model import format_stamp
+    from src.taf_store import TafStore
+    from src import clean
+
+    path = Path(args.out) / (args.store or clean.OUTPUT)
+    with TafStore(path) as store:
+        hits = store.valid_at(args.station.upper(), args.time)
+        if not hits:
+            print(f"No {args.station} TAF valid at {format_stamp(args.time)} in {path}")
+            return 1
+
+        for i in (reversed(hits) if args.all else hits[:1]):
+            taf, entry = store.load(i), store.index[i]
+            print(f"{taf.station} issued {format_stamp(taf.issued)} ({taf.status.name}), "
+                  f"effective until {format_stamp(entry.effective_until) or '-'}")
+            if entry.supersedes is not None:
+                print(f"  supersedes the TAF issued {format_stamp(store.index[entry.supersedes].issued)}")
+            print(f"  {taf.raw}")
+            for seg, active in zip(taf.segments, active_segments(taf, args.time)):
+                print(f"  {'>' if active else ' '} {seg.type.name:<6} {seg.raw}")
+    return 0
+
+
+def cmd_pack(args):
+    from src.taf_store import read_tafs, write_tafs
+    from src import clean
+
+    path = Path(args.out) / (args.store or clean.OUTPUT)
+    before = path.stat().st_size
+    tafs = read_tafs(path)
+    tmp = path.with_name(path.name + ".tmp")
+    write_tafs(tmp, tafs, delta=not args.full)
+    tmp.replace(path)
+    print(f"{path}: {len(tafs)} TAFs, {before} -> {path.stat().st_size} bytes")
+    return 0
+
+
+def cmd_check(args):
+    from collections import Counter
+    from src.model import format_stamp
+    from src.taf_store import TafStore
+    from src import clean, tafs as tafs_mod
+
+    path = Path(args.out) / tafs_mod.OUTPUT
+    reasons = Counter()
+    n = 0
+    with TafStore(path) as store:
+        for taf in store.select([args.station.upper()]):
+            n += 1
+            reason = clean.drop_reason(taf)
+            if reason:
+                reasons[reason] += 1
+                if args.verbose:
+                    print(f"{format_stamp(taf.issued)} {reason}: {taf.raw}")
+
+    print(f"{args.station}: {n} TAFs, {n - sum(reasons.values())} ok")
+    for reason, k in reasons.most_common():
+        print(f"  {reason:<28} {k}")
+    return 0
+
+
+def parse_threshold(values) -> dict:
+    name, ceiling, vis = values
+    return name, {None: [(float(ceiling), float(vis))]}
+
+
+def cmd_verify(args):
+    from src import verify
+
+    extra = dict(parse_threshold(t) for t in args.threshold or [])
+    verify.main(args.out, args.alt_minima, args.landing_minima, args.lead_step, extra)
+
+
+def cmd_climatology(args):
+    from src import climatology
+
+    if args.action == "build":
+        climatology.update(args.out, args.alt_minima, args.landing_minima, replace=args.replace)
+        return 0
+
+    import pandas as pd
+
+    cube = climatology.Cube.load(Path(args.out) / climatology.OUTPUT)
+    df = cube.query(args.measure, stations=args.station, months=args.month, month_of_year=args.month_of_year,
+                    hours=args.hour, leads=args.lead, by=args.by or [])
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(df.to_string(index=False))
+    return 0
+
+
+def cmd_hourly(args):
+    from src import hourly
+
+    hourly.main(args.out, args.stations, args.memory_mb, args.jobs, args.by, args.restart)
+    return 0
+
+
+def cmd_runs(args):
+    from src import runs
+
+    if args.action == "build":
+        runs.build(args.out)
+    elif args.action == "expand":
+        runs.expand_file(args.out)
+    else:
+        runs.summary(args.out, args.alt_minima)
+    return 0
+
+
+def cmd_sweep(args):
+    from src import sweep
+
+    try:
+        sweep.parse_grid(args.grid)
+    except ValueError as e:
+        print(e)
+        return 2
+    sweep.main(args.out, args.alt_minima, args.landing_minima, args.grid, args.jobs, args.stations)
+    return 0
+
+
+def cmd_episodes(args):
+    from src import episodes, sweep
+
+    try:
+        sweep.parse_grid(args.grid)
+    except ValueError as e:
+        print(e)
+        return 2
+    episodes.main(args.out, args.alt_minima, args.landing_minima, args.grid, args.stations,
+                  args.bridge, args.min_hours)
+    return 0
+
+
+def cmd_batch(args):
+    from src import batch
+
+    if args.action == "submit":
+        batch.submit(args.data, args.queue, args.run, args.max_attempts)
+        return 0
+    if args.action == "work":
+        batch.work(args.queue, args.worker, args.lease, max_units=args.max_units)
+        return 0
+    if args.action == "status":
+        return 1 if batch.status(args.queue)["failed"] else 0
+    if args.action == "merge":
+        return batch.merge(args.queue, args.out, args.landing_minima, args.partial)
+    return batch.run_local(args.data, args.queue, args.out, args.workers, args.run, args.landing_minima, args.lease)
+
+
+def cmd_flights(args):
+    from src import flights
+
+    try:
+        flights.main(args.schedule, args.out, args.alt_minima, args.landing_minima, args.alt_list, args.nm,
+                     args.max_alternates, args.lag, args.required)
+    except (OSError, ValueError) as e:
+        print(e)
+        return 2
+    return 0
+
+
+def cmd_watch(args):
+    from src import live, suitability
+
+    if args.ogimet:
+        from src import ingest
+        if not args.stations:
+            print("--ogimet needs --stations")
+            return 2
+        source = live.FetchSource(ingest.ogimet_fetcher(delay=0), [s.upper() for s in args.stations])
+    else:
+        source = live.DropDirectory(args.source)
+
+    stations = [s.upper() for s in args.stations] if args.stations else None
+    state = live.LiveState(suitability.Requirements(args.alt_minima, args.landing_minima), stations, args.keep_hours)
+    live.watch(source, state, args.interval, args.clock, args.hours, args.polls)
+    return 0
+
+
+def cmd_serve(args):
+    from src import service
+
+    service.main(args.out, args.alt_minima, args.landing_minima, args.host, args.port, args.cache_size)
+    return 0
+
+
+def cmd_stations(args):
+    from src import stations
+
+    if args.action == "build":
+        stations.main(args.data, args.out)
+        return 0
+
+    index = stations.StationIndex.load(args.out)
+    if args.action == "near":
+        try:
+            found = index.within(args.station, args.nm)
+        except KeyError as e:
+            print(e.args[0])
+            return 1
+        for icao, nm in found:
+            print(f"{icao}  {nm:7.1f} nm")
+        print(f"{len(found)} stations within {args.nm:g} nm of {args.station.upper()}")
+        return 0
+
+    df = index.distances(args.station, args.max_nm, args.top)
+    path = Path(args.out) / stations.DISTANCES
+    df.to_csv(path, index=False)
+    print(f"Saved {len(df)} station pairs to {path}")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="python -m src.main", description="Alt_Wx_Finder pipeline")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="run the pipeline graph")
+    run.add_argument("--data", default="data", help="raw Ogimet files")
+    run.add_argument("--out", default=".", help="where outputs / checkpoints go")
+    run.add_argument("--run", default="ANALYSIS2", help="analysis window (src/devset.py RUNS)")
+    run.add_argument("--jobs", type=int, default=2, help="processes for independent stages")
+    run.add_argument("--no-checkpoints", action="store_true",
+                     help="only write the final outputs (metars_parsed.csv, metars_hourly.csv, tafs_hourly.csv)")
+    run.add_argument("--from", dest="from_stage", help="start here, loading upstream checkpoints")
+    run.add_argument("--only", nargs="+", help="target stages (default: all final stages)")
+    run.add_argument("--stations", nargs="+", help="limit hourly expansion to these stations")
+    run.add_argument("--landing-minima", help="LandingMinimaReqts.csv for the hourly METAR grid")
+    run.add_argument("--sample", type=_fraction, help="keep a stratified fraction of the parsed reports, e.g. 0.01")
+    run.add_argument("--seed", type=int, default=0, help="sample seed; same seed, same slice")
+    run.add_argument("--sample-unit", choices=["report", "day"], default="report",
+                     help="sample single reports or whole station-days")
+    run.set_defaults(func=cmd_run)
+
+    stages = sub.add_parser("stages", help="list stages and dependencies")
+    stages.set_defaults(func=cmd_stages)
+
+    ing = sub.add_parser("ingest", help="download and parse station-months into parsed_reports.json")
+    ing.add_argument("--stations", nargs="+", required=True)
+    ing.add_argument("--start", required=True, help="first month, YYYY-MM")
+    ing.add_argument("--end", required=True, help="last month, YYYY-MM")
+    ing.add_argument("--data", default="data", help="raw archive directory")
+    ing.add_argument("--out", default=".", help="directory holding parsed_reports.json")
+    ing.add_argument("--source", help="read responses from this directory instead of Ogimet")
+    ing.add_argument("--delay", type=float, help="seconds per request (default: ogimet_scraper.REQUEST_DELAY, 0 for --source)")
+    ing.add_argument("--workers", type=int, default=1, help="parser threads")
+    ing.add_argument("--queue-size", type=int, default=4, help="responses held before the download waits")
+    ing.add_argument("--refresh", action="store_true", help="download months that are already archived")
+    ing.set_defaults(func=cmd_ingest)
+
+    comp = sub.add_parser("compress", help="rewrite the raw archive compressed")
+    comp.add_argument("--data", default="data", help="raw archive directory")
+    comp.add_argument("--codec", choices=[".gz", ".zst", ""], help="default: .zst if zstandard is installed, else .gz")
+    comp.set_defaults(func=cmd_compress)
+
+    taf = sub.add_parser("taf", help="show the TAF in force for a station at a time")
+    taf.add_argument("station")
+    taf.add_argument("time", type=parse_time, help="UTC, e.g. '2024-01-05 12:00' or 202401051200")
+    taf.add_argument("--out", default=".", help="directory holding the TAF store")
+    taf.add_argument("--store", help="store file name (default nested_tafs_clean.bin)")
+    taf.add_argument("--all", action="store_true", help="every TAF valid then, not just the latest")
+    taf.set_defaults(func=cmd_taf)
+
+    hrl = sub.add_parser("hourly", help="expand the clean TAF store to tafs_hourly.csv, station by station")
+    hrl.add_argument("--out", default=".", help="directory with nested_tafs_clean.bin")
+    hrl.add_argument("--stations", nargs="+", help="only these stations")
+    hrl.add_argument("--memory-mb", type=int, default=1024, help="memory budget shared by the jobs")
+    hrl.add_argument("--jobs", type=int, default=1, help="partitions expanded at once, one process each")
+    hrl.add_argument("--by", choices=["station", "station-year"], default="station", help="partition key")
+    hrl.add_argument("--restart", action="store_true", help="ignore partitions finished by an earlier run")
+    hrl.set_defaults(func=cmd_hourly)
+
+    rns = sub.add_parser("runs", help="run-length encoded hourly TAF table")
+    rns.add_argument("action", choices=["build", "expand", "summary"],
+                     help="build from tafs_hourly.csv, expand back to it, or alternate hours per station")
+    rns.add_argument("--out", default=".", help="directory with the hourly outputs")
+    rns.add_argument("--alt-minima", help="AlternateMinimaReqts.csv (summary)")
+    rns.set_defaults(func=cmd_runs)
+
+    pack = sub.add_parser("pack", help="rewrite the TAF store with amendments as deltas")
+    pack.add_argument("--out", default=".", help="directory holding the TAF store")
+    pack.add_argument("--store", help="store file name (default nested_tafs_clean.bin)")
+    pack.add_argument("--full", action="store_true", help="write full records instead (undo)")
+    pack.set_defaults(func=cmd_pack)
+
+    check = sub.add_parser("check", help="re-run the clean step's checks for one station")
+    check.add_argument("station")
+    check.add_argument("--out", default=".", help="directory holding nested_tafs.bin")
+    check.add_argument("-v", "--verbose", action="store_true", help="print each dropped TAF")
+    check.set_defaults(func=cmd_check)
+
+    ver = sub.add_parser("verify", help="TAF vs METAR contingency tables -> verification.csv")
+    ver.add_argument("--out", default=".", help="directory with tafs_hourly.csv / metars_parsed.csv")
+    ver.add_argument("--alt-minima", help="AlternateMinimaReqts.csv for per-station alternate thresholds")
+    ver.add_argument("--landing-minima", help="LandingMinimaReqts.csv for per-station landing thresholds")
+    ver.add_argument("--lead-step", type=int, default=6, help="lead-time bucket width in hours")
+    ver.add_argument("--threshold", nargs=3, action="append", metavar=("NAME", "CEILING", "VIS"),
+                     help="extra (or replacement) threshold for every station, repeatable")
+    ver.set_defaults(func=cmd_verify)
+
+    clim = sub.add_parser("climatology", help="build / query the suitability climatology cube")
+    clim_sub = clim.add_subparsers(dest="action", required=True)
+    cb = clim_sub.add_parser("build", help="fold the current hourly outputs into climatology.npz")
+    cb.add_argument("--out", default=".")
+    cb.add_argument("--alt-minima", help="AlternateMinimaReqts.csv")
+    cb.add_argument("--landing-minima", help="LandingMinimaReqts.csv")
+    cb.add_argument("--replace", action="store_true", help="start a new cube instead of updating")
+    cq = clim_sub.add_parser("query", help="roll up counts")
+    cq.add_argument("measure", choices=["alternate", "landing"])
+    cq.add_argument("--out", default=".")
+    cq.add_argument("--station", nargs="+")
+    cq.add_argument("--month", nargs="+", help="YYYY-MM")
+    cq.add_argument("--month-of-year", nargs="+", type=int)
+    cq.add_argument("--hour", nargs="+", type=int)
+    cq.add_argument("--lead", nargs="+", type=int, help="lead bucket start hours, -1 = no TAF")
+    cq.add_argument("--by", nargs="+", choices=["station", "month", "month_of_year", "hour", "lead"])
+    clim.set_defaults(func=cmd_climatology)
+
+    wat = sub.add_parser("watch", help="poll for new reports and keep hourly suitability current")
+    wat.add_argument("source", nargs="?", default="data", help="drop directory of archive files")
+    wat.add_argument("--ogimet", action="store_true", help="poll Ogimet for the current month instead")
+    wat.add_argument("--stations", nargs="+", help="only these stations")
+    wat.add_argument("--alt-minima", help="AlternateMinimaReqts.csv")
+    wat.add_argument("--landing-minima", help="LandingMinimaReqts.csv")
+    wat.add_argument("--interval", type=float, default=60.0, help="seconds between polls")
+    wat.add_argument("--hours", type=int, default=24, help="hours ahead to show")
+    wat.add_argument("--clock", choices=["data", "wall"], default="data",
+                     help="'now' is the newest report seen (default) or the wall clock")
+    wat.add_argument("--keep-hours", type=int, default=48, help="history kept per station")
+    wat.add_argument("--polls", type=int, help="stop after this many polls")
+    wat.set_defaults(func=cmd_watch)
+
+    srv = sub.add_parser("serve", help="local HTTP/JSON availability queries over the hourly outputs")
+    srv.add_argument("--out", default=".", help="directory with tafs_hourly.csv / metars_parsed.csv")
+    srv.add_argument("--alt-minima", help="AlternateMinimaReqts.csv")
+    srv.add_argument("--landing-minima", help="LandingMinimaReqts.csv")
+    srv.add_argument("--host", default="127.0.0.1")
+    srv.add_argument("--port", type=int, default=8765)
+    srv.add_argument("--cache-size", type=int, default=4096, help="responses kept in the LRU")
+    srv.set_defaults(func=cmd_serve)
+
+    stn = sub.add_parser("stations", help="station registry and distances from the file headers")
+    stn_sub = stn.add_subparsers(dest="action", required=True)
+    sb = stn_sub.add_parser("build", help="stations.csv from the archive headers")
+    sb.add_argument("--data", default="data", help="raw archive directory")
+    sb.add_argument("--out", default=".")
+    sn = stn_sub.add_parser("near", help="stations within a radius")
+    sn.add_argument("station")
+    sn.add_argument("--nm", type=float, default=200.0)
+    sn.add_argument("--out", default=".", help="directory holding stations.csv")
+    sd = stn_sub.add_parser("distances", help="pairwise distance table -> station_distances.csv")
+    sd.add_argument("--station", nargs="+", help="only from these stations")
+    sd.add_argument("--max-nm", type=float)
+    sd.add_argument("--top", type=int, help="nearest N per station")
+    sd.add_argument("--out", default=".")
+    stn.set_defaults(func=cmd_stations)
+
+    sw = sub.add_parser("sweep", help="availability per station for a grid of minima policies -> sweep.csv")
+    sw.add_argument("--out", default=".", help="directory with tafs_hourly.csv / metars_parsed.csv")
+    sw.add_argument("--alt-minima", help="AlternateMinimaReqts.csv")
+    sw.add_argument("--landing-minima", help="LandingMinimaReqts.csv")
+    sw.add_argument("--grid", nargs="+", action="extend", metavar="NAME=V1,V2",
+                    help="parameter values to cross (src/sweep.py PARAMS)")
+    sw.add_argument("--jobs", type=int, default=1, help="worker processes")
+    sw.add_argument("--stations", nargs="+")
+    sw.set_defaults(func=cmd_sweep)
+
+    bt = sub.add_parser("batch", help="station-month work queue for big rebuilds (src/batch.py)")
+    bt.add_argument("action", choices=["submit", "work", "status", "merge", "run"])
+    bt.add_argument("--queue", default="batch_queue", help="queue folder (shared between nodes)")
+    bt.add_argument("--data", default="data", help="raw Ogimet files (submit / run)")
+    bt.add_argument("--out", default=".", help="where merge writes the outputs")
+    bt.add_argument("--run", help="analysis window (src/devset.py RUNS)")
+    bt.add_argument("--workers", type=int, default=2, help="worker processes for run")
+    bt.add_argument("--worker", help="worker name (default host:pid)")
+    bt.add_argument("--lease", type=float, default=300, help="lease seconds, renewed while a unit runs")
+    bt.add_argument("--max-attempts", type=int, default=3)
+    bt.add_argument("--max-units", type=int, help="stop a worker after this many units")
+    bt.add_argument("--landing-minima", help="LandingMinimaReqts.csv for the METAR grid")
+    bt.add_argument("--partial", action="store_true", help="merge even with units not done")
+    bt.set_defaults(func=cmd_batch)
+
+    fl = sub.add_parser("flights", help="destination / alternate availability per scheduled flight")
+    fl.add_argument("schedule", help="CSV: flight, destination, eta, planning_time [, alt1, alt2, ...]")
+    fl.add_argument("--out", default=".", help="directory with tafs_hourly.csv / metars_parsed.csv")
+    fl.add_argument("--alt-minima", help="AlternateMinimaReqts.csv")
+    fl.add_argument("--landing-minima", help="LandingMinimaReqts.csv")
+    fl.add_argument("--alt-list", help="2AltPolicy.csv alternates per aerodrome")
+    fl.add_argument("--nm", type=float, default=300, help="else: nearest stations within nm (stations.csv)")
+    fl.add_argument("--max-alternates", type=int, default=2)
+    fl.add_argument("--lag", type=int, default=0, help="minutes before planning time a TAF must be issued")
+    fl.add_argument("--required", type=int, default=1, help="legal alternates needed to count as covered")
+    fl.set_defaults(func=cmd_flights)
+
+    ep = sub.add_parser("episodes", help="contiguous below-minima episodes per station -> episodes.csv")
+    ep.add_argument("--out", default=".", help="directory with tafs_hourly.csv / metars_parsed.csv")
+    ep.add_argument("--alt-minima", help="AlternateMinimaReqts.csv")
+    ep.add_argument("--landing-minima", help="LandingMinimaReqts.csv")
+    ep.add_argument("--grid", nargs="+", action="extend", metavar="NAME=V1,V2",
+                    help="policy variants, as for sweep")
+    ep.add_argument("--stations", nargs="+")
+    ep.add_argument("--bridge", type=int, default=0, help="unknown hours allowed inside an episode")
+    ep.add_argument("--min-hours", type=int, default=1, help="drop shorter episodes")
+    ep.set_defaults(func=cmd_episodes)
+
+    return ap
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
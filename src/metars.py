@@ -0,0 +1,257 @@
+"""METAR decoding: parsed report dicts -> metars_parsed.csv rows.
+
+Library half of build_metars.py.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from fractions import Fraction
+from pathlib import Path
+
+from src import metrics
+from src import wxcache
+
+OUTPUT = "metars_parsed.csv"
+BUSTED = "metars_busted_issuedtime.csv"
+
+
+def collect_metar_records(data: list) -> tuple[list, list]:
+    """Flatten METARs out of the per-file dicts; (good, busted issue time)."""
+    metar_records = []
+    metar_records_busted_issuetime = []
+
+    for file_entry in data:
+        filename = file_entry.get("filename")
+        for metar in file_entry.get("metars", []):
+
+            record = {
+                "filename": filename,
+                "station": metar.get("station"),
+                "issued": metar.get("issued"),
+                "db_time_stamp": metar.get("db_time_stamp"),
+                "type": metar.get("type"),
+                "contents": metar.get("contents"),
+                "remark": metar.get("remark"),
+                "raw": metar.get("raw")
+            }
+
+            metrics.count("metars_in")
+            if metar.get("issued") is None:
+                metrics.drop("busted_issued_time")
+                metar_records_busted_issuetime.append(record)
+            else:
+                metar_records.append(record)
+
+    return metar_records, metar_records_busted_issuetime
+
+
+# ----------------------------
+# Parsing functions
+# ----------------------------
+
+# Wind
+wind_pattern = metrics.pattern('wind', r'(?P<direction>\d{3}|VRB|000)(?P<speed>\d{2,3})(G(?P<gust>\d{2,3}))?KT')
+@metrics.timed()
+def parse_wind(raw):
+    match = wind_pattern.search(raw)
+    if match:
+        return {
+            "wind_dir": match.group("direction"),
+            "wind_speed": int(match.group("speed")),
+            "wind_gust": int(match.group("gust")) if match.group("gust") else None
+        }
+    return {"wind_dir": None, "wind_speed": None, "wind_gust": None}
+
+# Visibility
+
+vis_pattern = metrics.pattern('vis', r'(?<=\s)(?:P6SM|\d+\s\d+\/\d+SM|\d+\/\d+SM|\d+SM)(?=\s)')
+
+@metrics.timed()
+def parse_visibility(raw):
+    match = vis_pattern.search(raw)
+    if not match:
+        return None
+
+    vis = match.group(0).replace("SM", "").strip()
+
+    if vis == "P6":
+        return 6.1  # just flag >6 miles
+
+    try:
+        if " " in vis:  # e.g., '1 1/2'
+            whole, frac = vis.split()
+            num = int(whole) + float(Fraction(frac))
+        elif "/" in vis:  # e.g., '3/4'
+            num = float(Fraction(vis))
+        else:  # whole number
+            num = int(vis)
+    except Exception:
+        return None
+
+    return num
+
+#sig wx
+sigwx_pattern = metrics.pattern('sigwx',
+    r'(?:(?<=^)|(?<=\s))'                   #look behind: start with new line or space (do not consume)
+    r'(?:[\+\-−–]|VC)?'                     # optional intensity / proximity
+    r'(?:MI|BC|PR|DR|BL|SH|TS|FZ)?'         # optional descriptor
+    r'(?:DZ|RA|SN|SG|IC|PL|GR|GS|BR|FG|FU|DU|SA|HZ|VA|PO|SQ|NSW|\+?FC|\+?SS|\+?DS)+\b'  # phenomenon
+)
+@metrics.timed()
+def extract_sigwx(raw):
+    matches = [m.group(0) for m in sigwx_pattern.finditer(raw)]
+    if matches:
+        return {"sigwx": ", ".join(matches)}
+    return {"sigwx": None}
+
+# Clouds
+cloud_pattern = metrics.pattern('cloud', r'\bSKC|(?:FEW|SCT|BKN|OVC)\d{3}(?:CB)?|VV\d{3}\b')
+@metrics.timed()
+def parse_clouds(raw):
+    matches = [m.group(0) for m in cloud_pattern.finditer(raw)]
+
+    if matches:
+        return {"clouds": ", ".join(matches)}
+    return {"clouds": None}
+
+
+#ceilings
+ceilings_pattern = metrics.pattern('ceilings', r'\b(?:BKN|OVC|VV)\d{3}(?:CB)?\b')
+ceiling_pattern = metrics.pattern('ceiling', r'\d{3}')
+
+@metrics.timed()
+def extract_ceilings(clouds):
+    if not clouds:
+        return {"ceilings": None}
+    matches = [m.group(0) for m in ceilings_pattern.finditer(clouds)]
+
+    if matches:
+        return {"ceilings": ", ".join(matches)}
+    return {"ceilings": None}
+
+
+@metrics.timed()
+def extract_ceiling(ceilings):
+
+    if not ceilings:
+        return {"ceiling": None}
+    matches = [int(m.group(0)) for m in ceiling_pattern.finditer(ceilings)]
+
+    if matches:
+        # Convert to feet by multiplying by 100
+        return {"ceiling": min(matches)*100}
+    return {"ceiling": None}
+
+
+# Temperature/Dewpoint
+temp_pattern = metrics.pattern('temp', r'\bM?\d{2}/M?\d{2}\b')
+@metrics.timed()
+def parse_temp_dew(raw):
+    match = temp_pattern.search(raw)
+    if match:
+        segment = match.group(0)  # e.g., "M05/M10" or "03/M02"
+        temp_part, dew_part = segment.split("/")
+        
+        temp = int(temp_part.replace("M", "-"))
+        dew = int(dew_part.replace("M", "-"))
+        
+        return {"temp_c": temp, "dewpoint_c": dew}
+    
+    return {"temp_c": None, "dewpoint_c": None}
+
+
+
+# Altimeter
+alt_pattern = metrics.pattern('altimeter', r'\bA(?P<alt>\d{4})\b')
+@metrics.timed()
+def parse_altimeter(raw):
+    match = alt_pattern.search(raw)
+    if match:
+        return {"altimeter_inhg": float(match.group("alt"))/100}
+    return {"altimeter_inhg": None}
+
+# ----------------------------
+# METAR pipe
+# ----------------------------
+
+def decode_metar(raw) -> wxcache.Weather:
+    """Every decoded field of one report."""
+    clouds = parse_clouds(raw)["clouds"]
+    ceilings = extract_ceilings(clouds)["ceilings"]
+    return wxcache.Weather(
+        **parse_wind(raw),
+        vis=parse_visibility(raw),
+        **extract_sigwx(raw),
+        clouds=clouds,
+        ceilings=ceilings,
+        **extract_ceiling(ceilings),
+        **parse_temp_dew(raw),
+        **parse_altimeter(raw),
+    )
+
+
+def parse_metars(df_metars: pd.DataFrame) -> pd.DataFrame:
+    """Add the decoded wind / vis / wx / cloud / temp / altimeter columns."""
+    import pandas as pd
+
+    if df_metars.empty:
+        return df_metars
+
+    with metrics.timer("metar_pipe"):
+        #not through wxcache: temperature / dewpoint, altimeter and RMK make
+        #nearly every report unique (0 hits in 9401 on the dev set), and even
+        #wind + vis + clouds alone repeat too rarely to pay for the lookups
+        decoded = [decode_metar(raw) for raw in df_metars["raw"]]
+        columns = pd.DataFrame(decoded, columns=wxcache.Weather._fields, index=df_metars.index)
+        df_metars_parsed = df_metars.join(columns.rename(columns={"vis": "visibility"}))
+
+    return df_metars_parsed
+
+
+def run(data: list) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """(parsed METARs, METARs with a busted issue time)."""
+    import pandas as pd
+
+    metar_records, metar_records_busted_issuetime = collect_metar_records(data)
+
+    # Build DataFrame
+    df_metars = pd.DataFrame(metar_records)
+    df_metars_busted_issuedtime = pd.DataFrame(metar_records_busted_issuetime)
+
+    print(df_metars.shape)
+    print(df_metars.head())
+
+    print('processing')
+    df_metars_parsed = parse_metars(df_metars)
+
+    print(df_metars_parsed.head())
+
+    print('done')
+
+    metrics.count("metars_out", len(df_metars_parsed))
+    return df_metars_parsed, df_metars_busted_issuedtime
+
+
+def save(result: tuple, out_dir="."):
+    df_metars_parsed, df_metars_busted_issuedtime = result
+
+    #print bad ones for examination:
+    df_metars_busted_issuedtime.to_csv(Path(out_dir) / BUSTED, index=False)
+
+    # Save to CSV
+    df_metars_parsed.to_csv(Path(out_dir) / OUTPUT, index=False)
+
+
+def load(out_dir=".") -> pd.DataFrame:
+    import pandas as pd
+    return pd.read_csv(Path(out_dir) / OUTPUT)
+
+
+def main(out_dir="."):
+    from src import devset
+
+    metrics.start("metars", out_dir)
+    save(run(devset.load(out_dir)), out_dir)
+    metrics.finish()
@@ -0,0 +1,249 @@
+"""Run instrumentation shared by the pipeline scripts.
+
+Counters, drop reasons, per-function timers, regex call counts and peak
+memory for one run, written out as a JSON report:
+
+    from src import metrics
+
+    metrics.start("build_taf", out_dir)
+    wind_pattern = metrics.pattern("wind", r'...')   # counts regex calls
+
+    @metrics.timed()
+    def parse_ddhh(...): ...
+
+    with metrics.timer("dedupe"):
+        ...
+    metrics.count("tafs_in", len(records))
+    metrics.drop("busted_issued_time")
+
+    metrics.finish()            # -> <out_dir>/run_reports/build_taf.json
+
+Set ALTWX_PROFILE=cprofile (or pyinstrument, if installed) to profile the
+whole run between start() and finish(); the profile is written next to the
+JSON report. Without an out_dir, reports go to ALTWX_REPORT_DIR or
+./run_reports.
+"""
+
+import functools
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
+
+
+def peak_rss_mb() -> float | None:
+    """Peak resident set size of this process so far."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    #KB on Linux, bytes on macOS
+    return round((rss / 1024 if sys.platform == "darwin" else rss) / 1024, 1)
+
+
+class CountedPattern:
+    """Compiled regex that counts every call made through it."""
+
+    __slots__ = ("_re", "_key", "_counters")
+
+    def __init__(self, pattern, key: str, counters: Counter):
+        self._re = re.compile(pattern) if isinstance(pattern, (str, bytes)) else pattern
+        self._key = key
+        self._counters = counters
+
+    @property
+    def pattern(self):
+        return self._re.pattern
+
+    def search(self, *args, **kwargs):
+        self._counters[self._key] += 1
+        return self._re.search(*args, **kwargs)
+
+    def match(self, *args, **kwargs):
+        self._counters[self._key] += 1
+        return self._re.match(*args, **kwargs)
+
+    def fullmatch(self, *args, **kwargs):
+        self._counters[self._key] += 1
+        return self._re.fullmatch(*args, **kwargs)
+
+    def finditer(self, *args, **kwargs):
+        self._counters[self._key] += 1
+        return self._re.finditer(*args, **kwargs)
+
+    def findall(self, *args, **kwargs):
+        self._counters[self._key] += 1
+        return self._re.findall(*args, **kwargs)
+
+    def sub(self, *args, **kwargs):
+        self._counters[self._key] += 1
+        return self._re.sub(*args, **kwargs)
+
+
+class Metrics:
+    def __init__(self):
+        self.counters = Counter()
+        self.drops = Counter()
+        self.timers = defaultdict(lambda: [0, 0.0])   # name -> [calls, seconds]
+        self.name = None
+        self.report_dir = None
+        self._t0 = None
+        self._started = None
+        self._profiler = None
+        self._profiler_kind = None
+
+    # ---- lifecycle ----
+
+    def start(self, name: str, out_dir=None):
+        """Begin a run; its report goes to out_dir/run_reports."""
+        self.report_dir = None if out_dir is None else Path(out_dir) / "run_reports"
+        self.counters.clear()
+        self.drops.clear()
+        self.timers.clear()
+        self.name = name
+        self._t0 = time.perf_counter()
+        self._started = datetime.now().isoformat(timespec="seconds")
+        self._start_profiler(os.environ.get("ALTWX_PROFILE", "").lower())
+
+    def finish(self, report_dir=None) -> dict:
+        """Stop any profiler, write the JSON report and return it."""
+        report_dir = Path(report_dir or self.report_dir or os.environ.get("ALTWX_REPORT_DIR", "run_reports"))
+        report_dir.mkdir(parents=True, exist_ok=True)
+        self._stop_profiler(report_dir)
+
+        report = self.report()
+        path = report_dir / f"{self.name or 'run'}.json"
+        path.write_text(json.dumps(report, indent=2))
+        print(f"Run report: {path} ({report['seconds']}s, peak {report['peak_rss_mb']} MB)")
+        return report
+
+    def report(self) -> dict:
+        elapsed = time.perf_counter() - self._t0 if self._t0 is not None else None
+        regex = {k[len("regex."):]: v for k, v in self.counters.items() if k.startswith("regex.")}
+        return {
+            "stage": self.name,
+            "started": self._started,
+            "seconds": round(elapsed, 3) if elapsed is not None else None,
+            "peak_rss_mb": peak_rss_mb(),
+            "counters": {k: v for k, v in self.counters.items() if not k.startswith("regex.")},
+            "drops": dict(self.drops),
+            "regex_calls": regex,
+            "timers": {
+                k: {
+                    "calls": calls,
+                    "seconds": round(secs, 4),
+                    "mean_us": round(secs / calls * 1e6, 2) if calls else None,
+                }
+                for k, (calls, secs) in sorted(self.timers.items(), key=lambda kv: -kv[1][1])
+            },
+        }
+
+    # ---- recording ----
+
+    def count(self, key: str, n: int = 1):
+        self.counters[key] += n
+
+    def drop(self, reason: str, n: int = 1):
+        self.drops[reason] += n
+
+    @contextmanager
+    def timer(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            t = self.timers[name]
+            t[0] += 1
+            t[1] += time.perf_counter() - t0
+
+    def timed(self, name: str | None = None):
+        """Decorator: accumulate calls and time under name (default fn name)."""
+        def deco(fn):
+            key = name or fn.__name__
+            timers = self.timers
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                t0 = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    t = timers[key]
+                    t[0] += 1
+                    t[1] += time.perf_counter() - t0
+            return wrapper
+        return deco
+
+    def pattern(self, name: str, pattern, flags: int = 0) -> CountedPattern:
+        if isinstance(pattern, (str, bytes)):
+            pattern = re.compile(pattern, flags)
+        return CountedPattern(pattern, f"regex.{name}", self.counters)
+
+    # ---- profiling ----
+
+    def _start_profiler(self, kind: str):
+        self._profiler, self._profiler_kind = None, None
+        if not kind:
+            return
+
+        if kind == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                print("pyinstrument not installed, falling back to cProfile")
+                kind = "cprofile"
+            else:
+                self._profiler = Profiler()
+                self._profiler.start()
+                self._profiler_kind = kind
+                return
+
+        if kind == "cprofile":
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+            self._profiler_kind = kind
+        else:
+            print(f"Unknown ALTWX_PROFILE={kind!r}, not profiling")
+
+    def _stop_profiler(self, report_dir: Path):
+        if self._profiler is None:
+            return
+
+        name = self.name or "run"
+        if self._profiler_kind == "pyinstrument":
+            self._profiler.stop()
+            path = report_dir / f"{name}.html"
+            path.write_text(self._profiler.output_html())
+            print(self._profiler.output_text(unicode=False, color=False))
+        else:
+            import pstats
+            self._profiler.disable()
+            path = report_dir / f"{name}.prof"
+            self._profiler.dump_stats(path)
+            pstats.Stats(self._profiler).sort_stats("cumulative").print_stats(25)
+
+        print(f"Profile: {path}")
+        self._profiler = None
+
+
+# one registry per process -- the scripts are one stage per process
+_run = Metrics()
+
+start = _run.start
+finish = _run.finish
+report = _run.report
+count = _run.count
+drop = _run.drop
+timer = _run.timer
+timed = _run.timed
+pattern = _run.pattern
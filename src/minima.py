@@ -0,0 +1,211 @@
+"""Runway minima and the suitability rules from the R scripts.
+
+Python port of functions.R (calc_max_tailwind, round_ceiling_aviation) and
+the requirement logic in analyze_hourly_tafs.R / analyze_hourly_metars.R:
+
+    usable runway      max tailwind (gust if any) < 10 kt
+    alternate minima   tiered on the number of usable precision approaches,
+                       using the lowest-HAA usable runway:
+                         >= 2  ceiling max(400, HAA + 200)  vis max(1, adv + 0.5)
+                            1  ceiling max(600, HAA + 300)  vis max(2, adv + 1)
+                            0  ceiling max(800, HAA + 300)  vis max(2, adv + 1)
+                       when that is exactly the standard 600-2 / 800-2, the
+                       standard alternate minima also allow +100 ft / 1.5 SM
+                       and +200 ft / 1 SM
+    PROB ceiling       at least the rounded lowest HAA (Policy.prob_rule)
+    landing minima     ceiling >= HAA and vis >= approach ban vis of the
+                       lowest-HAA usable runway
+
+Minima come from AlternateMinimaReqts.csv / LandingMinimaReqts.csv (one row
+per runway: airport, rwy, rwy_bearing, variation, precision_apch,
+lowest_haa, advisory_vis [, apch_ban_vis]). A station with no rows has no
+minima: src/suitability.py judges it MISSING, as the R joins give NA. A
+runway with a blank lowest_haa / advisory_vis (alternate) or lowest_haa /
+apch_ban_vis (landing) can't be judged either and counts as unusable.
+Stdlib only.
+"""
+
+import csv
+import math
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+ALTERNATE_MINIMA = "AlternateMinimaReqts.csv"
+LANDING_MINIMA = "LandingMinimaReqts.csv"
+
+
+@dataclass(slots=True)
+class Runway:
+    airport: str
+    rwy: str
+    bearing: float              # magnetic
+    variation: float = 0.0
+    precision_apch: int = 0
+    lowest_haa: float | None = None
+    advisory_vis: float | None = None
+    apch_ban_vis: float | None = None
+
+
+@dataclass
+class Policy:
+    """The knobs the R scripts hard-code."""
+    max_tailwind: float = 10.0
+    # n precision approaches -> (min ceiling, HAA add, min vis, advisory vis add)
+    tiers: dict = field(default_factory=lambda: {
+        2: (400, 200, 1.0, 0.5),
+        1: (600, 300, 2.0, 1.0),
+        0: (800, 300, 2.0, 1.0),
+    })
+    # standard alternate minima (ceiling, vis) per tier, and the extra
+    # options they allow as (ceiling add, vis)
+    standard: dict = field(default_factory=lambda: {1: (600, 2.0), 0: (800, 2.0)})
+    standard_extra: tuple = ((100, 1.5), (200, 1.0))
+    # PROB ceiling a TAF may carry: "haa" (>= rounded lowest HAA, the R
+    # rule), "alternate" (>= the lowest alternate ceiling) or "none"
+    prob_rule: str = "haa"
+
+    def tier(self, n_precision: int) -> tuple:
+        return self.tiers[min(n_precision, max(self.tiers))]
+
+
+DEFAULT_POLICY = Policy()
+
+
+# ----------------------------
+# Loading
+# ----------------------------
+
+_NUMBER_RE = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def _num(value) -> float | None:
+    #like readr::parse_number: first number in the string
+    if value is None:
+        return None
+    m = _NUMBER_RE.search(str(value).replace(",", ""))
+    return float(m.group(0)) if m else None
+
+
+def load_runways(path) -> dict[str, list[Runway]]:
+    """Minima CSV -> {airport: [Runway, ...]} in file order."""
+    runways = {}
+    with Path(path).open(newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            airport = row["airport"].strip()
+            runways.setdefault(airport, []).append(Runway(
+                airport=airport,
+                rwy=row["rwy"].strip(),
+                bearing=_num(row.get("rwy_bearing")),
+                variation=_num(row.get("variation")) or 0.0,
+                precision_apch=int(_num(row.get("precision_apch")) or 0),
+                lowest_haa=_num(row.get("lowest_haa")),
+                advisory_vis=_num(row.get("advisory_vis")),
+                apch_ban_vis=_num(row.get("apch_ban_vis")),
+            ))
+    return runways
+
+
+# ----------------------------
+# Rules
+# ----------------------------
+
+_WIND_RE = re.compile(r"(VRB\d{2}|\d{3}\d{2}(?:G\d{2})?)")
+
+
+def round_ceiling_aviation(x):
+    """Feet AGL; remainders up to 20 ft round down, anything more rounds up."""
+    remainder = x % 100
+    return x - remainder if remainder <= 20 else x - remainder + 100
+
+
+def max_tailwind(wind: str | None, bearing: float, variation: float = 0.0) -> float | None:
+    """Worst tailwind on a runway over every wind group in the string.
+
+    VRB winds count fully as tailwind; gusts replace the mean speed.
+    None when the string has no wind group.
+    """
+    if not wind or not isinstance(wind, str):
+        return None
+
+    worst = None
+    for group in _WIND_RE.findall(wind):
+        if group.startswith("VRB"):
+            tail = float(group[3:5])
+        else:
+            direction = float(group[:3])
+            speed = float(group[6:8]) if "G" in group else float(group[3:5])
+            tail = max(0.0, -speed * math.cos(math.radians(bearing + variation - direction)))
+        worst = tail if worst is None else max(worst, tail)
+    return worst
+
+
+def usable_runways(runways: list[Runway], wind: str | None, policy: Policy = DEFAULT_POLICY,
+                   unknown_usable: bool = False) -> list[Runway]:
+    """Runways with max tailwind under the limit.
+
+    A missing wind makes every runway unusable for the TAF side (the R
+    filter drops NA) and usable for the METAR side (unknown_usable=True,
+    the R code replaces NA tailwind with 0).
+    """
+    out = []
+    for r in runways:
+        tail = max_tailwind(wind, r.bearing, r.variation)
+        if tail is None:
+            if unknown_usable:
+                out.append(r)
+        elif tail < policy.max_tailwind:
+            out.append(r)
+    return out
+
+
+def _lowest_haa(runways: list[Runway]) -> Runway:
+    #slice_min(lowest_haa, with_ties = FALSE): first in file order wins ties
+    return min(runways, key=lambda r: r.lowest_haa)
+
+
+def _complete(runways: list[Runway], *fields) -> list[Runway]:
+    #blank minima (parse_number -> NA) can't be compared against: skip the runway
+    return [r for r in runways if all(getattr(r, f) is not None for f in fields)]
+
+
+def alternate_options(usable: list[Runway], policy: Policy = DEFAULT_POLICY) -> list[tuple]:
+    """(ceiling, vis) pairs, any one of which makes the station a legal
+    alternate. Empty when no runway is usable."""
+    usable = _complete(usable, "lowest_haa", "advisory_vis")
+    if not usable:
+        return []
+
+    n_precision = sum(r.precision_apch for r in usable)
+    best = _lowest_haa(usable)
+    min_ceiling, haa_add, min_vis, vis_add = policy.tier(n_precision)
+
+    ceiling = round_ceiling_aviation(max(min_ceiling, best.lowest_haa + haa_add))
+    vis = max(min_vis, best.advisory_vis + vis_add)
+    options = [(ceiling, vis)]
+
+    standard = policy.standard.get(min(n_precision, max(policy.tiers)))
+    if standard is not None and (ceiling, vis) == standard:
+        options += [(standard[0] + add, v) for add, v in policy.standard_extra]
+    return options
+
+
+def landing_limits(usable: list[Runway]) -> tuple | None:
+    """(ceiling, vis) to land: HAA and approach ban vis of the best runway."""
+    usable = _complete(usable, "lowest_haa", "apch_ban_vis")
+    if not usable:
+        return None
+    best = _lowest_haa(usable)
+    return best.lowest_haa, best.apch_ban_vis
+
+
+def prob_ceiling_limit(usable: list[Runway], policy: Policy = DEFAULT_POLICY) -> float | None:
+    """Lowest PROB ceiling a TAF may carry and still support an alternate."""
+    usable = _complete(usable, "lowest_haa", "advisory_vis")
+    if not usable or policy.prob_rule == "none":
+        return None
+    if policy.prob_rule == "alternate":
+        return min(c for c, _ in alternate_options(usable, policy))
+    if policy.prob_rule != "haa":
+        raise ValueError(f"unknown prob_rule {policy.prob_rule!r}")
+    return round_ceiling_aviation(_lowest_haa(usable).lowest_haa)
@@ -0,0 +1,386 @@
+"""Compact TAF / segment model shared by the TAF builder and its consumers.
+
+Timestamps are held as integer minutes since 1970-01-01 (naive UTC), segment
+types and TAF statuses as small-int enums, and station / filename / type codes
+are interned, so years of TAFs for many stations fit comfortably in RAM.
+
+encode_taf / decode_taf give a binary record codec (stdlib struct, no extra
+dependencies); to_dict / from_dict keep the legacy nested_tafs.json shape.
+"""
+
+import copy
+import struct
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from enum import IntEnum
+
+EPOCH = datetime(1970, 1, 1)
+
+
+# ----------------------------
+# Time helpers
+# ----------------------------
+
+def to_minutes(dt: datetime | None) -> int | None:
+    """datetime -> integer minutes since EPOCH."""
+    if dt is None:
+        return None
+    return (dt - EPOCH) // timedelta(minutes=1)
+
+
+def from_minutes(minutes: int | None) -> datetime | None:
+    """integer minutes since EPOCH -> datetime."""
+    if minutes is None:
+        return None
+    return EPOCH + timedelta(minutes=minutes)
+
+
+def parse_stamp(stamp: str | None) -> int | None:
+    """'YYYYMMDDHHMM' (the parser's issued format) -> minutes."""
+    if not stamp:
+        return None
+    return to_minutes(datetime.strptime(stamp, "%Y%m%d%H%M"))
+
+
+def format_stamp(minutes: int | None) -> str | None:
+    """minutes -> 'YYYYMMDDHHMM'."""
+    if minutes is None:
+        return None
+    return from_minutes(minutes).strftime("%Y%m%d%H%M")
+
+
+def _parse_legacy_dt(value) -> int | None:
+    #nested_tafs.json was written with default=str, so datetimes come back as
+    #'2024-04-17 13:00:00' (or None)
+    if value is None or value == "":
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, datetime):
+        return to_minutes(value)
+    return to_minutes(datetime.fromisoformat(str(value)))
+
+
+def _format_legacy_dt(minutes: int | None) -> str | None:
+    dt = from_minutes(minutes)
+    return str(dt) if dt is not None else None
+
+
+def _intern(s: str | None) -> str | None:
+    return sys.intern(s) if s is not None else None
+
+
+# ----------------------------
+# Enums
+# ----------------------------
+
+class SegType(IntEnum):
+    UNKNOWN = 0
+    TAF = 1
+    FM = 2
+    BECMG = 3
+    TEMPO = 4
+    PROB = 5
+
+    @classmethod
+    def from_str(cls, s: str | None) -> "SegType":
+        return cls.__members__.get(s or "", cls.UNKNOWN)
+
+
+class TafStatus(IntEnum):
+    NORMAL = 0
+    NIL = 1
+    CANCELLED = 2
+
+    @classmethod
+    def from_str(cls, s: str | None) -> "TafStatus":
+        return cls.__members__.get(s or "", cls.NORMAL)
+
+
+# ----------------------------
+# Model
+# ----------------------------
+
+@dataclass(slots=True)
+class Segment:
+    raw: str
+    type: SegType
+    start: int | None = None      # epoch minutes
+    end: int | None = None        # epoch minutes
+    dir: str | None = None
+    speed: int | None = None
+    gust: int | None = None
+    vis: float | None = None
+    sigwx: str | None = None
+    clouds: str | None = None
+    ceilings: str | None = None
+    ceiling: int | None = None
+
+    def to_dict(self) -> dict:
+        return {
+            "raw": self.raw,
+            "type": self.type.name,
+            "start": _format_legacy_dt(self.start),
+            "end": _format_legacy_dt(self.end),
+            "dir": self.dir,
+            "speed": self.speed,
+            "gust": self.gust,
+            "vis": self.vis,
+            "sigwx": self.sigwx,
+            "clouds": self.clouds,
+            "ceilings": self.ceilings,
+            "ceiling": self.ceiling,
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Segment":
+        return cls(
+            raw=d.get("raw"),
+            type=SegType.from_str(d.get("type")),
+            start=_parse_legacy_dt(d.get("start")),
+            end=_parse_legacy_dt(d.get("end")),
+            dir=_intern(d.get("dir")),
+            speed=d.get("speed"),
+            gust=d.get("gust"),
+            vis=d.get("vis"),
+            sigwx=d.get("sigwx"),
+            clouds=d.get("clouds"),
+            ceilings=d.get("ceilings"),
+            ceiling=d.get("ceiling"),
+        )
+
+
+@dataclass(slots=True)
+class Taf:
+    station: str
+    issued: int | None            # epoch minutes
+    raw: str
+    type: str = "TAF"
+    status: TafStatus = TafStatus.NORMAL
+    valid_from: int | None = None
+    valid_to: int | None = None
+    db_time_stamp: str | None = None
+    filename: str | None = None
+    remarks: str | None = None
+    segments: list[Segment] = field(default_factory=list)
+
+    def __post_init__(self):
+        self.station = _intern(self.station)
+        self.type = _intern(self.type)
+        self.filename = _intern(self.filename)
+
+    def to_dict(self) -> dict:
+        """Legacy nested_tafs.json shape."""
+        return {
+            "filename": self.filename,
+            "station": self.station,
+            "issued": format_stamp(self.issued),
+            "db_time_stamp": self.db_time_stamp,
+            "type": self.type,
+            "valid_from": _format_legacy_dt(self.valid_from),
+            "valid_to": _format_legacy_dt(self.valid_to),
+            "raw": self.raw,
+            "remarks": self.remarks,
+            "segments": [seg.to_dict() for seg in self.segments],
+            "status": self.status.name,
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Taf":
+        return cls(
+            station=d.get("station"),
+            issued=parse_stamp(d.get("issued")),
+            raw=d.get("raw"),
+            type=d.get("type") or "TAF",
+            status=TafStatus.from_str(d.get("status")),
+            valid_from=_parse_legacy_dt(d.get("valid_from")),
+            valid_to=_parse_legacy_dt(d.get("valid_to")),
+            db_time_stamp=d.get("db_time_stamp"),
+            filename=d.get("filename"),
+            remarks=d.get("remarks"),
+            segments=[Segment.from_dict(s) for s in d.get("segments", [])],
+        )
+
+
+# ----------------------------
+# Binary codec
+# ----------------------------
+
+'''
+record layout (little endian):
+
+taf header      issued, valid_from, valid_to (q), status (B), n_segments (H)
+taf strings     station, type, filename, db_time_stamp, raw, remarks
+per segment     type (B), start, end (q), speed, gust (h), ceiling (i), vis (d)
+segment strings raw, dir, sigwx, clouds, ceilings
+
+missing ints are stored as sentinels, missing vis as NaN, missing strings as
+length 0xFFFF.
+
+delta records (encode_taf with a base TAF) put a tag (B) before each
+segment: the index of an identical segment of the base, or 0xFF followed by
+the segment itself.
+'''
+
+_NO_TIME = -(2 ** 63)
+_NO_SHORT = -1
+_NO_INT = -1
+_NO_STR = 0xFFFF
+_LITERAL = 0xFF
+
+_TAF_HEAD = struct.Struct("<qqqBH")
+_SEG_HEAD = struct.Struct("<Bqqhhid")
+_STR_LEN = struct.Struct("<H")
+_TAG = struct.Struct("<B")
+
+
+def _opt(value, sentinel):
+    return sentinel if value is None else value
+
+
+def _from_opt(value, sentinel):
+    return None if value == sentinel else value
+
+
+def _pack_str(out: list, s: str | None):
+    if s is None:
+        out.append(_STR_LEN.pack(_NO_STR))
+        return
+    b = s.encode("utf-8")
+    out.append(_STR_LEN.pack(len(b)))
+    out.append(b)
+
+
+def _unpack_str(buf, pos: int) -> tuple[str | None, int]:
+    (n,) = _STR_LEN.unpack_from(buf, pos)
+    pos += _STR_LEN.size
+    if n == _NO_STR:
+        return None, pos
+    return bytes(buf[pos:pos + n]).decode("utf-8"), pos + n
+
+
+def encode_segment(seg: Segment, out: list):
+    vis = float("nan") if seg.vis is None else float(seg.vis)
+    out.append(_SEG_HEAD.pack(
+        int(seg.type),
+        _opt(seg.start, _NO_TIME),
+        _opt(seg.end, _NO_TIME),
+        _opt(seg.speed, _NO_SHORT),
+        _opt(seg.gust, _NO_SHORT),
+        _opt(seg.ceiling, _NO_INT),
+        vis,
+    ))
+    for s in (seg.raw, seg.dir, seg.sigwx, seg.clouds, seg.ceilings):
+        _pack_str(out, s)
+
+
+def decode_segment(buf, pos: int) -> tuple[Segment, int]:
+    seg_type, start, end, speed, gust, ceiling, vis = _SEG_HEAD.unpack_from(buf, pos)
+    pos += _SEG_HEAD.size
+    raw, pos = _unpack_str(buf, pos)
+    w_dir, pos = _unpack_str(buf, pos)
+    sigwx, pos = _unpack_str(buf, pos)
+    clouds, pos = _unpack_str(buf, pos)
+    ceilings, pos = _unpack_str(buf, pos)
+
+    if vis != vis:  # NaN
+        vis = None
+    elif vis.is_integer():
+        vis = int(vis)
+
+    seg = Segment(
+        raw=raw,
+        type=SegType(seg_type),
+        start=_from_opt(start, _NO_TIME),
+        end=_from_opt(end, _NO_TIME),
+        dir=_intern(w_dir),
+        speed=_from_opt(speed, _NO_SHORT),
+        gust=_from_opt(gust, _NO_SHORT),
+        vis=vis,
+        sigwx=sigwx,
+        clouds=clouds,
+        ceilings=ceilings,
+        ceiling=_from_opt(ceiling, _NO_INT),
+    )
+    return seg, pos
+
+
+def encode_taf(taf: Taf, base: Taf | None = None) -> bytes:
+    """Binary record; with base, segments identical to one of base's are
+    stored as a reference to it."""
+    out = [_TAF_HEAD.pack(
+        _opt(taf.issued, _NO_TIME),
+        _opt(taf.valid_from, _NO_TIME),
+        _opt(taf.valid_to, _NO_TIME),
+        int(taf.status),
+        len(taf.segments),
+    )]
+    for s in (taf.station, taf.type, taf.filename, taf.db_time_stamp, taf.raw, taf.remarks):
+        _pack_str(out, s)
+    if base is None:
+        for seg in taf.segments:
+            encode_segment(seg, out)
+        return b"".join(out)
+
+    known = {}
+    for j, seg in enumerate(base.segments[:_LITERAL]):
+        known.setdefault(_segment_key(seg), j)
+    for seg in taf.segments:
+        j = known.get(_segment_key(seg))
+        if j is None:
+            out.append(_TAG.pack(_LITERAL))
+            encode_segment(seg, out)
+        else:
+            out.append(_TAG.pack(j))
+    return b"".join(out)
+
+
+def _segment_key(seg: Segment) -> tuple:
+    #vis as decode_segment gives it back (4 == 4.0), so a reference decodes identically
+    return (seg.raw, seg.type, seg.start, seg.end, seg.dir, seg.speed, seg.gust,
+            None if seg.vis is None else float(seg.vis), seg.sigwx, seg.clouds, seg.ceilings, seg.ceiling)
+
+
+def decode_taf(buf, pos: int = 0, segments: bool = True, base: Taf | None = None) -> tuple[Taf, int]:
+    """Decode one TAF record starting at pos; returns (taf, next_pos).
+
+    With segments=False only the TAF header is decoded (segments is left
+    empty and next_pos is not meaningful). base is the decoded TAF a delta
+    record refers to.
+    """
+    issued, valid_from, valid_to, status, n_segments = _TAF_HEAD.unpack_from(buf, pos)
+    pos += _TAF_HEAD.size
+    station, pos = _unpack_str(buf, pos)
+    taf_type, pos = _unpack_str(buf, pos)
+    filename, pos = _unpack_str(buf, pos)
+    db_time_stamp, pos = _unpack_str(buf, pos)
+    raw, pos = _unpack_str(buf, pos)
+    remarks, pos = _unpack_str(buf, pos)
+
+    decoded = []
+    if segments:
+        for _ in range(n_segments):
+            if base is not None:
+                (tag,) = _TAG.unpack_from(buf, pos)
+                pos += _TAG.size
+                if tag != _LITERAL:
+                    decoded.append(copy.copy(base.segments[tag]))
+                    continue
+            seg, pos = decode_segment(buf, pos)
+            decoded.append(seg)
+
+    taf = Taf(
+        station=station,
+        issued=_from_opt(issued, _NO_TIME),
+        raw=raw,
+        type=taf_type,
+        status=TafStatus(status),
+        valid_from=_from_opt(valid_from, _NO_TIME),
+        valid_to=_from_opt(valid_to, _NO_TIME),
+        db_time_stamp=db_time_stamp,
+        filename=filename,
+        remarks=remarks,
+        segments=decoded,
+    )
+    return taf, pos
@@ -0,0 +1,156 @@
+"""Hourly METAR observation grid: metars_parsed.csv -> metars_hourly.csv.
+
+One row per station-hour over the analysis window (src/devset.py RUNS:
+min_date 00Z to max_date 23Z; without one, the station's first to last
+report), so the R side no longer joins every METAR on
+floor_date(issued_time); merged_data.R only complete()s its own window's
+hours, which may run past the run's max_date. Each report lands in slot
+offset[station] + (hour - first hour[station]) and the slots are reduced
+with NumPy:
+
+    n_obs                  METARs + SPECIs in the hour (R-style duplicates dropped)
+    worst_ceiling          lowest ceiling reported (empty: no ceiling / no report)
+    worst_vis              lowest vis reported (empty: none reported)
+    any_unsuitable         some report was below landing minima
+    suitable_for_landing   TRUE / FALSE / NA with merged_data.R's rule
+    missing                no report at all in the hour
+    vis_missing            reports, but none with a vis
+
+Landing minima come from LandingMinimaReqts.csv. A station without minima
+(or every station, with no CSV) gets suitable_for_landing NA, as in R.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from src import metrics
+from src import suitability
+from src.suitability import SUITABLE, UNSUITABLE
+
+OUTPUT = "metars_hourly.csv"
+
+
+@metrics.timed()
+def reduce_slots(rows: dict, start: dict | None = None, end: dict | None = None) -> dict:
+    """Dense per-station hour arrays from per-report arrays.
+
+    start / end (an hour index for every station, or {station: hour
+    index}) fix a station's window; reports outside it are dropped.
+    """
+    import numpy as np
+
+    stations, st = np.unique(rows["station"], return_inverse=True)
+    hours = rows["hour"]
+
+    first = np.full(len(stations), np.iinfo(np.int64).max)
+    last = np.full(len(stations), np.iinfo(np.int64).min)
+    np.minimum.at(first, st, hours)
+    np.maximum.at(last, st, hours)
+    for i, name in enumerate(stations):
+        if isinstance(start, dict):
+            first[i] = start.get(name, first[i])
+        elif start is not None:
+            first[i] = start
+        if isinstance(end, dict):
+            last[i] = end.get(name, last[i])
+        elif end is not None:
+            last[i] = end
+
+    length = np.maximum(last - first + 1, 0)
+    offset = np.concatenate([[0], np.cumsum(length)[:-1]]).astype(np.int64)
+    n = int(length.sum())
+
+    inside = (hours >= first[st]) & (hours <= last[st])
+    metrics.drop("outside_window", int((~inside).sum()))
+    slot = offset[st[inside]] + hours[inside] - first[st[inside]]
+    ceiling, vis, state = rows["ceiling"][inside], rows["vis"][inside], rows["state"][inside]
+
+    n_obs = np.bincount(slot, minlength=n)
+    n_vis = np.bincount(slot[~np.isnan(vis)], minlength=n)
+    n_false = np.bincount(slot[state == UNSUITABLE], minlength=n)
+    n_true = np.bincount(slot[state == SUITABLE], minlength=n)
+
+    worst_ceiling = np.full(n, np.inf)
+    np.minimum.at(worst_ceiling, slot, ceiling)
+    worst_vis = np.full(n, np.inf)
+    np.minimum.at(worst_vis, slot[~np.isnan(vis)], vis[~np.isnan(vis)])
+    worst_vis[n_vis == 0] = np.nan
+
+    hour_state = np.where(
+        n_false > 0, UNSUITABLE, np.where((n_obs > 0) & (n_true == n_obs), SUITABLE, suitability.MISSING)
+    ).astype(np.int8)
+
+    return {
+        "station": np.repeat(stations, length),
+        "hour": np.concatenate([np.arange(a, b + 1) for a, b in zip(first, last)]) if n else np.zeros(0, np.int64),
+        "n_obs": n_obs,
+        "worst_ceiling": worst_ceiling,
+        "worst_vis": worst_vis,
+        "any_unsuitable": n_false > 0,
+        "state": hour_state,
+        "missing": n_obs == 0,
+        "vis_missing": (n_obs > 0) & (n_vis == 0),
+    }
+
+
+def run_window(run: str) -> tuple[int, int]:
+    """First / last hour (hours since 1970) of a src/devset.py run window."""
+    import numpy as np
+    from src import devset
+
+    window = devset.RUNS[run]
+    first = np.datetime64(window["min_date"], "h").astype("int64")
+    last = np.datetime64(window["max_date"], "h").astype("int64") + 23
+    return int(first), int(last)
+
+
+def build_grid(df_metars, req=None, start=None, end=None):
+    """metars_parsed rows -> hourly grid DataFrame."""
+    import numpy as np
+    import pandas as pd
+
+    req = req or suitability.Requirements()
+    grid = reduce_slots(suitability.landing_rows(df_metars, req), start, end)
+
+    state = pd.Series(grid["state"]).map({SUITABLE: True, UNSUITABLE: False}).astype("boolean")
+    worst_ceiling = np.where(np.isinf(grid["worst_ceiling"]), np.nan, grid["worst_ceiling"])
+
+    metrics.count("station_hours", len(grid["hour"]))
+    metrics.count("missing_hours", int(grid["missing"].sum()))
+    return pd.DataFrame({
+        "station": grid["station"],
+        "time": grid["hour"].astype("datetime64[h]"),
+        "n_obs": grid["n_obs"],
+        "worst_ceiling": worst_ceiling,
+        "worst_vis": grid["worst_vis"],
+        "any_unsuitable": grid["any_unsuitable"],
+        "suitable_for_landing": state,
+        "missing": grid["missing"],
+        "vis_missing": grid["vis_missing"],
+    })
+
+
+def save(df_grid, out_dir="."):
+    path = Path(out_dir) / OUTPUT
+    with metrics.timer("to_csv"):
+        df_grid.to_csv(path, index=False)
+    print(f"Saved {len(df_grid)} station-hours to {path}")
+
+
+def load(out_dir="."):
+    import pandas as pd
+    return pd.read_csv(Path(out_dir) / OUTPUT, parse_dates=["time"], dtype={"suitable_for_landing": "boolean"})
+
+
+def main(out_dir=".", landing_csv=None, run=None):
+    from src import metars
+
+    metrics.start("grid", out_dir)
+    if landing_csv is None:
+        print("No landing minima: suitable_for_landing is NA everywhere")
+    with metrics.timer("load"):
+        df_metars = metars.load(out_dir)
+    start, end = run_window(run) if run else (None, None)
+    save(build_grid(df_metars, suitability.Requirements(landing_csv=landing_csv), start, end), out_dir)
+    metrics.finish()
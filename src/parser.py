@@ -0,0 +1,307 @@
+"""Ogimet archive parser: raw monthly text files -> report dicts.
+
+Library half of parse_metar_taf.py. parse_archive() returns the same list of
+per-file dicts that parsed_reports.json holds; save() / load() read and write
+that checkpoint.
+"""
+
+import re
+import json
+import mmap
+from pathlib import Path
+from datetime import datetime, timedelta
+
+from src import archive
+from src import metrics
+
+CHECKPOINT = "parsed_reports.json"
+
+
+# REGEX PATTERNS
+OGIMET_REPORT_RE = re.compile(
+    r'(?P<db_time_stamp>\d{10,12})\s'
+    r'(?P<type>METAR|SPECI|TAF(?:\sAMD)?)\s'
+    r'(?P<station>[A-Z]{4})\s'
+    r'(?P<issue_time>\d{6}Z)\s'
+    r'(?P<contents>.*?)'
+    r'(?:\s(?P<remark>RMK.*?))?=',
+    re.DOTALL
+)
+
+
+# bytes-level patterns for the mmap reader: the file is split on the '='
+# terminator and each slice gets the report header regex, so no match can
+# run past its own report (no DOTALL backtracking across the whole file)
+REPORT_HEAD_RE = metrics.pattern('report_head',
+    rb'(?P<db_time_stamp>\d{10,12})\s'
+    rb'(?P<type>METAR|SPECI|TAF(?:\sAMD)?)\s'
+    rb'(?P<station>[A-Z]{4})\s'
+    rb'(?P<issue_time>\d{6}Z)\s'
+)
+REMARK_RE = metrics.pattern('remark', r'\sRMK')
+
+# anything that needs BeautifulSoup (tags / entities) goes the slow way
+MARKUP_BYTES = (b'<', b'&')
+
+# decompressed bytes read at a time from .gz / .zst archives
+READ_CHUNK = 1 << 20
+
+
+META_QUERY_RE = re.compile(r'(?m)^#\s*Query made at\s*(?P<query>.+)$')
+META_INTERVAL_RE = re.compile(r'(?m)^#\s*Time interval:\s*(?P<interval>.+)$')
+META_DETAIL_RE = re.compile(r'(?m)^#\s*Latitude\s*(?P<lat>[\d\-\w.]+)[.]\s*Longitude\s*(?P<lon>[\d\-\w.]+)[.]\s*Altitude\s*(?P<alt>.+).$')
+META_STATION_RE = re.compile(r'(?m)^#\s*(?P<station>[A-Z]{4}),')
+
+def strip_markup(html: str) -> str:
+    from bs4 import BeautifulSoup   #only files with markup get here
+    return BeautifulSoup(html, "html.parser").get_text()
+
+
+def read_file(path: Path) -> str:
+    """Read text file safely (ignore bad characters) and strip HTML."""
+    return strip_markup(path.read_text(encoding='utf-8'))
+
+
+def extract_meta(text: str) -> dict:
+    """Extract station, query time, interval, and coordinates."""
+    meta = {}
+    if m := META_STATION_RE.search(text):
+        meta["station"] = m.group("station")
+    if q := META_QUERY_RE.search(text):
+        meta["query_date"] = q.group("query").strip()
+    if ti := META_INTERVAL_RE.search(text):
+        meta["interval"] = ti.group("interval").strip()
+    if d := META_DETAIL_RE.search(text):
+        meta["latitude"] = d.group("lat").strip()
+        meta["longitude"] = d.group("lon").strip()
+        meta["elevation"] = d.group("alt").strip()
+    return meta
+
+
+@metrics.timed()
+def parse_issued_time(issued_ddhhmmZ: str, db_time_stamp: str, window_days: int = 3) -> datetime | None:
+
+    """
+    There are some instances where the db time stamp does not align with the issue day.
+
+    For example:
+
+    202404191800 TAF AMD CYBK 171317Z 1713/1724 32020G30KT P6SM FEW006 SCT050 TEMPO 1713/1715 3SM -SN BKN006 OVC050 FM171500 34020G30KT P6SM FEW010 FEW006 RMK NXT FCST BY 171800Z="
+
+    --> "202404191800" is the ogimet timestamp (Apr 19)
+    --> "TAF AMD CYBK 171317Z" is the issue time (17th day)
+    --> these are not the same. since 17th day is repeated across the taf, assume this is correct.
+
+    --> so take the ddhhmm from the issue time, and use the yyyymm from the db time stamp
+
+    """
+
+    anchor = datetime.strptime(db_time_stamp, "%Y%m%d%H%M")
+
+    target_dd = int(issued_ddhhmmZ[:2])
+    hh = int(issued_ddhhmmZ[2:4])
+    mm = int(issued_ddhhmmZ[4:6])
+
+    start_date = anchor.date() - timedelta(days=window_days)
+
+    for i in range(2 * window_days + 1):
+        d = start_date + timedelta(days=i)
+        if d.day == target_dd:
+            return datetime(d.year, d.month, d.day, hh, mm)
+
+    return None
+
+def normalize_ws(s: str | None) -> str | None:
+    if s is None:
+        return None
+    return " ".join(s.split())
+
+def make_report(station, type, db_time_stamp, issue_time, contents, remark, full_match) -> dict:
+    """Shape one report the way every downstream script expects it."""
+    remark = normalize_ws(remark) if remark else None
+    contents = normalize_ws(contents) if contents else None
+
+    issued_dt = None
+    if issue_time:
+        issued_dt = parse_issued_time(issue_time, db_time_stamp)
+
+    issued_str_out = issued_dt.strftime("%Y%m%d%H%M") if issued_dt is not None else None
+    if issued_str_out is None:
+        metrics.drop("issued_unparsed")
+
+    return {
+        'station': station,
+        'type': type,
+        'db_time_stamp': db_time_stamp,
+        'issued': issued_str_out,
+        'contents': contents,
+        'remark': remark,
+        'raw': normalize_ws(full_match)
+    }
+
+
+def extract_reports(text: str):
+    """Return list of reports with station, type, issued timestamp, and cleaned raw string."""
+    reports = []
+    for m in OGIMET_REPORT_RE.finditer(text):
+        reports.append(make_report(
+            m.group('station'),
+            m.group('type'),
+            m.group('db_time_stamp'),
+            m.group('issue_time'),
+            m.group('contents'),
+            m.group('remark'),
+            m.group(0)
+        ))
+    return reports
+
+
+def iter_report_slices(buf):
+    """
+    Yield (header_match, end) for each report in a bytes-like buffer.
+
+    A report can never contain '=', so each '='-terminated slice holds at most
+    one report: the leftmost header match inside the slice. end is the index
+    of the terminating '='.
+    """
+    pos = 0
+    while (end := buf.find(b'=', pos)) != -1:
+        if m := REPORT_HEAD_RE.search(buf, pos, end):
+            yield m, end
+        pos = end + 1
+
+
+def extract_reports_bytes(buf):
+    """Same output as extract_reports, read slice by slice from bytes / mmap."""
+    reports = []
+    for m, end in iter_report_slices(buf):
+        body = buf[m.end():end].decode('utf-8')
+        contents, remark = body, None
+        if r := REMARK_RE.search(body):
+            contents, remark = body[:r.start()], body[r.start() + 1:]
+
+        reports.append(make_report(
+            m.group('station').decode('ascii'),
+            m.group('type').decode('ascii'),
+            m.group('db_time_stamp').decode('ascii'),
+            m.group('issue_time').decode('ascii'),
+            contents,
+            remark,
+            buf[m.start():end + 1].decode('utf-8')
+        ))
+    return reports
+
+
+def header_text(buf) -> str:
+    """Decoded text ahead of the first report (where the '#' meta lines live)."""
+    for m, _ in iter_report_slices(buf):
+        return buf[:m.start()].decode('utf-8')
+    return buf[:].decode('utf-8')
+
+
+def reports_from_buffer(buf) -> tuple[dict, list]:
+    """(meta, reports) from the raw bytes of one Ogimet response (bytes or mmap)."""
+    if any(buf.find(b) != -1 for b in MARKUP_BYTES):
+        metrics.count("files_html")
+        #universal newlines, as read_text() gives
+        html = buf[:].decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+        text = strip_markup(html)
+        return extract_meta(text), extract_reports(text)
+
+    return extract_meta(header_text(buf)), extract_reports_bytes(buf)
+
+
+def reports_from_stream(path: Path, chunk_size: int = READ_CHUNK) -> tuple[dict, list]:
+    """reports_from_buffer for a compressed archive, decompressed chunk by
+    chunk. Each chunk is cut after its last '=' and the unterminated tail
+    carried over, so the report slices are the ones the whole buffer gives;
+    the header is held until the first report turns up. HTML (rare) is
+    re-read whole, as markup has to be stripped from the full text."""
+    head, tail, reports = None, b'', []
+    with archive.open_archive(path) as f:
+        while chunk := f.read(chunk_size):
+            buf = tail + chunk
+            if any(buf.find(b) != -1 for b in MARKUP_BYTES):
+                metrics.count("stream_fallback")
+                return reports_from_buffer(archive.read_bytes(path))
+            cut = buf.rfind(b'=') + 1
+            if head is None:
+                first = next(iter_report_slices(buf[:cut]), None)
+                if first is None:
+                    tail = buf
+                    continue
+                head = buf[:first[0].start()]
+            reports.extend(extract_reports_bytes(buf[:cut]))
+            tail = buf[cut:]
+    return extract_meta((tail if head is None else head).decode('utf-8')), reports
+
+
+@metrics.timed()
+def read_reports(path: Path) -> tuple[dict, list]:
+    """(meta, reports) for one archive file, via mmap when it is plain text
+    and streamed when it is compressed."""
+    if path.stat().st_size == 0:
+        return {}, []
+    if archive.logical_name(path) != path.name:
+        with metrics.timer("decompress"):
+            return reports_from_stream(path)
+
+    with path.open('rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return reports_from_buffer(mm)
+
+
+def build_output_for_file(file: Path) -> dict:
+    """Build JSON-friendly structure for a single input file."""
+    return file_output(archive.logical_name(file), *read_reports(file))
+
+
+def file_output(filename: str, meta: dict, reports: list) -> dict:
+    """One parsed_reports.json entry: meta plus the sorted TAFs and METARs."""
+    tafs = [r for r in reports if r["type"] in ("TAF", "TAF AMD")]
+    metars = [r for r in reports if r["type"] in ("METAR", "SPECI")]
+    metrics.count("tafs_out", len(tafs))
+    metrics.count("metars_out", len(metars))
+
+    tafs.sort(key=lambda x: (x["station"], x["db_time_stamp"]))
+    metars.sort(key=lambda x: (x["station"], x["db_time_stamp"]))
+
+    return {
+        "filename": filename,      # top-level file name
+        "meta": meta,
+        "metars": metars,
+        "tafs": tafs
+    }
+
+
+def parse_archive(input_folder="data") -> list:
+    """Parse every archive file in input_folder (sorted by name; .txt,
+    .txt.gz or .txt.zst, see src/archive.py)."""
+    all_files = []
+    i = 0
+    for file in archive.find(input_folder):
+        i += 1
+        print(f"Parsing {file.name} - {i}")
+        metrics.count("files_in")
+
+        parsed = build_output_for_file(file)
+        all_files.append(parsed)
+    return all_files
+
+
+def save(all_files: list, out_dir="."):
+    output_path = Path(out_dir) / CHECKPOINT
+    with output_path.open("w", encoding="utf-8") as filehandle:
+        json.dump(all_files, filehandle, indent=2, ensure_ascii=False)
+
+    print(f"Saved parsed output for {len(all_files)} files to {output_path}")
+
+
+def load(out_dir=".") -> list:
+    with (Path(out_dir) / CHECKPOINT).open(encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(input_folder="data", out_dir="."):
+    metrics.start("parse", out_dir)
+    save(parse_archive(input_folder), out_dir)
+    metrics.finish()
@@ -0,0 +1,260 @@
+"""Pipeline stages as a dependency graph.
+
+    parse -> dev -> metars -> grid
+                 -> tafs -> clean -> hourly
+
+Results pass between stages in memory. When more than one stage is ready
+(metars and tafs both only need dev) the extra ones go to worker processes
+while the last runs in this process, so only the shared input is pickled.
+
+Every stage's files (parsed_reports.json ... nested_tafs_clean.bin) are
+checkpoints: written when checkpoints=True, and read back instead of
+recomputing when a run starts part-way through (from_stage). The final
+outputs, metars_parsed.csv, metars_hourly.csv and tafs_hourly.csv, are
+always written.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass
+from pathlib import Path
+
+from src import checkpoint
+from src import metrics
+
+
+@dataclass
+class PipelineConfig:
+    data_dir: str = "data"
+    out_dir: str = "."
+    run: str = "ANALYSIS2"          # src/devset.py RUNS key
+    checkpoints: bool = True
+    jobs: int = 2
+    stations: list | None = None    # hourly step only
+    landing_minima: str | None = None   # LandingMinimaReqts.csv for the grid
+    sample: float | None = None     # stratified slice of the dev reports (src/devset.py)
+    seed: int = 0
+    sample_unit: str = "report"     # or "day": whole station-days
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    deps: tuple = ()
+    final: bool = False             # always saved
+
+
+STAGES = {
+    "parse": Stage("parse"),
+    "dev": Stage("dev", ("parse",)),
+    "metars": Stage("metars", ("dev",), final=True),
+    "grid": Stage("grid", ("metars",), final=True),
+    "tafs": Stage("tafs", ("dev",)),
+    "clean": Stage("clean", ("tafs",)),
+    "hourly": Stage("hourly", ("clean",), final=True),
+}
+
+
+# ----------------------------
+# Stage bodies
+# ----------------------------
+# compute(cfg, *dep_results) -> result
+# save(result, cfg)
+# load(cfg) -> result, same shape as compute's
+
+def _compute(name: str, cfg: PipelineConfig, inputs: list):
+    if name == "parse":
+        from src import parser
+        return parser.parse_archive(cfg.data_dir)
+    if name == "dev":
+        from src import devset
+        data = inputs[0]
+        if cfg.sample is not None:
+            #before the window filter, which drops busted issue times
+            data = devset.sample_and_report(data, cfg.sample, cfg.seed, cfg.sample_unit, cfg.out_dir)
+        return devset.filter_reports(data, cfg.run)
+    if name == "metars":
+        from src import metars
+        return metars.run(inputs[0])
+    if name == "grid":
+        from src import obs_grid, suitability
+        start, end = obs_grid.run_window(cfg.run)
+        return obs_grid.build_grid(inputs[0][0], suitability.Requirements(landing_csv=cfg.landing_minima),
+                                   start, end)
+    if name == "tafs":
+        from src import tafs
+        return tafs.run(inputs[0])
+    if name == "clean":
+        from src import clean
+        return clean.run(inputs[0][0])
+    if name == "hourly":
+        from src import hourly
+        nested = inputs[0][0]
+        if cfg.stations:
+            nested = [t for t in nested if t.station in set(cfg.stations)]
+        return hourly.build_hourly(nested)
+    raise KeyError(name)
+
+
+def _module(name: str):
+    import importlib
+    modules = {
+        "parse": "src.parser",
+        "dev": "src.devset",
+        "metars": "src.metars",
+        "grid": "src.obs_grid",
+        "tafs": "src.tafs",
+        "clean": "src.clean",
+        "hourly": "src.hourly",
+    }
+    return importlib.import_module(modules[name])
+
+
+def _save(name: str, result, cfg: PipelineConfig):
+    _module(name).save(result, cfg.out_dir)
+
+
+def _load(name: str, cfg: PipelineConfig):
+    result = _module(name).load(cfg.out_dir)
+    #the (records, rejects) stages only hand their records downstream
+    if name in {"metars", "tafs", "clean"}:
+        return result, None
+    return result
+
+
+def execute_stage(name: str, cfg: PipelineConfig, inputs: list, save: bool):
+    """Run one stage (in this process or a worker) with its own run report."""
+    metrics.start(name, cfg.out_dir)
+    #stages here never resume, so last run's quarantined records go
+    checkpoint.reset(cfg.out_dir, name)
+    result = _compute(name, cfg, inputs)
+    if save:
+        with metrics.timer("save"):
+            _save(name, result, cfg)
+    checkpoint.flush(cfg.out_dir)
+    metrics.finish()
+    return result
+
+
+# ----------------------------
+# Planning
+# ----------------------------
+
+def descendants(name: str) -> set:
+    out = set()
+    frontier = [name]
+    while frontier:
+        cur = frontier.pop()
+        for s in STAGES.values():
+            if cur in s.deps and s.name not in out:
+                out.add(s.name)
+                frontier.append(s.name)
+    return out
+
+
+def ancestors(name: str) -> set:
+    out = set()
+    frontier = [name]
+    while frontier:
+        for dep in STAGES[frontier.pop()].deps:
+            if dep not in out:
+                out.add(dep)
+                frontier.append(dep)
+    return out
+
+
+def plan(targets=None, from_stage: str | None = None) -> tuple[list, list]:
+    """(stages to run in dependency order, stages to load from checkpoint)."""
+    targets = list(targets or [s.name for s in STAGES.values() if not descendants(s.name)])
+    for t in targets + ([from_stage] if from_stage else []):
+        if t not in STAGES:
+            raise KeyError(f"unknown stage {t!r}; stages are {', '.join(STAGES)}")
+
+    needed = set(targets)
+    for t in targets:
+        needed |= ancestors(t)
+
+    if from_stage:
+        to_run = ({from_stage} | descendants(from_stage)) & needed
+        if not to_run:
+            raise ValueError(f"none of {targets} depend on {from_stage}")
+    else:
+        to_run = needed
+
+    to_load = {dep for name in to_run for dep in STAGES[name].deps} - to_run
+
+    order = [name for name in STAGES if name in to_run]   # STAGES is topological
+    return order, sorted(to_load)
+
+
+# ----------------------------
+# Runner
+# ----------------------------
+
+def run_pipeline(cfg: PipelineConfig, targets=None, from_stage: str | None = None) -> dict:
+    """Run the graph; returns the in-memory results of the final stages run."""
+    order, to_load = plan(targets, from_stage)
+    Path(cfg.out_dir).mkdir(parents=True, exist_ok=True)
+
+    results = {}
+    for name in to_load:
+        print(f"[pipeline] loading {name} checkpoint")
+        results[name] = _load(name, cfg)
+
+    consumers = {name: {s for s in order if name in STAGES[s].deps} for name in order + to_load}
+    leaves = [name for name in order if not consumers[name]]
+    pending = list(order)
+    running = {}
+    done = set(to_load)
+
+    def finished(name, result):
+        results[name] = result
+        done.add(name)
+        #drop intermediate results once every consumer has them
+        for dep in STAGES[name].deps:
+            if consumers[dep] <= done:
+                results.pop(dep, None)
+
+    def is_ready(name):
+        return all(d in done for d in STAGES[name].deps)
+
+    pool = ProcessPoolExecutor(max_workers=cfg.jobs - 1) if cfg.jobs > 1 else None
+    try:
+        while pending or running:
+            ready = [n for n in pending if is_ready(n)]
+            for name in ready:
+                pending.remove(name)
+
+            #extra ready stages go to workers, the last one runs here
+            if pool is not None:
+                for name in ready[:-1]:
+                    print(f"[pipeline] {name} -> worker")
+                    fut = pool.submit(execute_stage, *_stage_args(name, cfg, results))
+                    running[fut] = name
+                ready = ready[-1:]
+
+            for name in ready:
+                print(f"[pipeline] {name}")
+                finished(name, execute_stage(*_stage_args(name, cfg, results)))
+
+            if running:
+                #only block when nothing else can start
+                timeout = 0 if any(is_ready(n) for n in pending) else None
+                complete, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                for fut in complete:
+                    name = running.pop(fut)
+                    finished(name, fut.result())
+                    print(f"[pipeline] {name} done (worker)")
+            elif pending and not ready:
+                raise RuntimeError(f"stages {pending} can never run")
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    return {name: results.get(name) for name in leaves}
+
+
+def _stage_args(name: str, cfg: PipelineConfig, results: dict) -> tuple:
+    stage = STAGES[name]
+    inputs = [results[d] for d in stage.deps]
+    save = stage.final or cfg.checkpoints
+    return name, cfg, inputs, save
@@ -0,0 +1,244 @@
+"""Run-length encoded hourly TAF table: tafs_hourly_runs.csv.
+
+Most hourly rows repeat the hour before: a prevailing FM group holding for
+9 hours is 9 identical rows but one run. A run is consecutive hours of one
+TAF with the same decoded fields:
+
+    raw_taf, station, issued, status, start, end, hours,
+    wind, vis, sigwx, clouds, ceiling, altmin_ceiling, altmin_vis, prob_ceiling
+
+start / end are the first hour and the hour after the last (end - start ==
+hours). Every hourly column is constant over a run, so the suitability
+rules run once per run (alternate_runs), and the TAF in force is worked out
+on intervals (in_force_runs) instead of per station-hour; totals are the
+runs weighted by their hours.
+
+The hourly table is a view: expand() gives tafs_hourly.csv's rows back,
+iter_hourly() the same a chunk of runs at a time, for readers that still
+want one row per hour.
+
+    python -m src.main runs build            # tafs_hourly.csv -> tafs_hourly_runs.csv
+    python -m src.main runs expand           # and back
+    python -m src.main runs summary --alt-minima AlternateMinimaReqts.csv
+"""
+
+from __future__ import annotations
+
+import heapq
+from pathlib import Path
+
+from src import metrics
+from src import suitability
+from src.hourly import COLUMNS
+
+OUTPUT = "tafs_hourly_runs.csv"
+
+# a run ends where any of these changes, or the hours stop being consecutive
+RUN_KEYS = ["raw_taf", "station", "issued", "status", "wind", "vis", "sigwx", "clouds", "ceiling"]
+RUN_COLUMNS = ["raw_taf", "station", "issued", "status", "start", "end", "hours",
+               "wind", "vis", "sigwx", "clouds", "ceiling", "altmin_ceiling", "altmin_vis", "prob_ceiling"]
+
+_MISSING = object()     # NaN != NaN; compare missing values as this instead
+
+
+# ----------------------------
+# Encode / expand
+# ----------------------------
+
+@metrics.timed()
+def to_runs(df_hourly):
+    """Collapse an hourly frame (build_hourly / tafs_hourly.csv) into runs."""
+    import numpy as np
+    import pandas as pd
+
+    n = len(df_hourly)
+    if not n:
+        return pd.DataFrame(columns=RUN_COLUMNS)
+    hour = pd.to_datetime(df_hourly["time"]).to_numpy("datetime64[h]").astype("int64")
+
+    same = np.zeros(n, dtype=bool)
+    same[1:] = hour[1:] == hour[:-1] + 1
+    for col in RUN_KEYS:
+        values = df_hourly[col].astype(object).where(df_hourly[col].notna(), _MISSING).to_numpy(object)
+        same[1:] &= values[1:] == values[:-1]
+
+    first = np.flatnonzero(~same)
+    length = np.diff(np.append(first, n))
+    runs = df_hourly.iloc[first].reset_index(drop=True)
+    runs["start"] = (hour[first]).astype("datetime64[h]").astype("datetime64[ns]")
+    runs["end"] = (hour[first] + length).astype("datetime64[h]").astype("datetime64[ns]")
+    runs["hours"] = length
+    metrics.count("hourly_rows_in", n)
+    metrics.count("runs_out", len(first))
+    return runs[RUN_COLUMNS]
+
+
+def expand(runs):
+    """The hourly rows of a run table, in tafs_hourly.csv's columns."""
+    import numpy as np
+    import pandas as pd
+
+    hours = runs["hours"].to_numpy(np.int64)
+    df = runs.loc[runs.index.repeat(hours)].reset_index(drop=True)
+    offset = np.arange(len(df)) - np.repeat(np.cumsum(hours) - hours, hours)
+    start = pd.to_datetime(df["start"]).to_numpy("datetime64[h]")
+    df["time"] = (start + offset.astype("timedelta64[h]")).astype("datetime64[ns]")
+    return df[COLUMNS]
+
+
+def iter_hourly(runs, chunk_runs: int = 10_000):
+    """expand() a chunk of runs at a time."""
+    for lo in range(0, len(runs), chunk_runs):
+        yield expand(runs.iloc[lo:lo + chunk_runs])
+
+
+def save(runs, out_dir="."):
+    path = Path(out_dir) / OUTPUT
+    with metrics.timer("to_csv"):
+        runs.to_csv(path, index=False)
+    print(f"Saved {len(runs)} runs ({int(runs['hours'].sum())} hourly rows) to {path}")
+
+
+def load(out_dir="."):
+    import pandas as pd
+    return pd.read_csv(Path(out_dir) / OUTPUT, parse_dates=["start", "end"])
+
+
+# ----------------------------
+# Suitability on runs
+# ----------------------------
+
+def alternate_runs(runs, req: suitability.Requirements) -> dict:
+    """suitability.alternate_rows once per run: station, start / end hour,
+    issued, state."""
+    import numpy as np
+
+    rows = suitability.alternate_rows(runs.assign(time=runs["start"]), req)
+    rows["end"] = rows["hour"] + runs["hours"].to_numpy(np.int64)
+    rows["start"] = rows.pop("hour")
+    return rows
+
+
+def in_force_runs(rows: dict) -> dict:
+    """The TAF in force as intervals: per station, the hours each run is
+    the latest TAF issued at least TAF_LAG_MINUTES before the hour.
+
+    Same hours as suitability.in_force over the expanded rows. A run counts
+    from max(start, first hour its TAF may be used); a sweep over run
+    starts / ends per station keeps the latest-issued run covering each
+    stretch.
+    """
+    import numpy as np
+
+    lag = suitability.TAF_LAG_MINUTES
+    first_ok = -(-(rows["issued"] + lag) // 60)
+    start = np.maximum(rows["start"], first_ok)
+    keep = np.flatnonzero(start < rows["end"])
+
+    out = {"station": [], "start": [], "end": [], "issued": [], "state": []}
+    order = keep[np.lexsort((start[keep], rows["station"][keep]))]
+    stations = rows["station"][order]
+    bounds = np.flatnonzero(np.append(True, stations[1:] != stations[:-1]))
+    #plain lists: the sweep is element by element
+    cols = start.tolist(), rows["end"].tolist(), rows["issued"].tolist(), rows["state"].tolist()
+    for lo, hi in zip(bounds.tolist(), np.append(bounds[1:], len(order)).tolist()):
+        _sweep(str(stations[lo]), order[lo:hi].tolist(), *cols, out)
+
+    return {
+        "station": np.array(out["station"], dtype=str),
+        "start": np.array(out["start"], dtype=np.int64),
+        "end": np.array(out["end"], dtype=np.int64),
+        "issued": np.array(out["issued"], dtype=np.int64),
+        "state": np.array(out["state"], dtype=np.int8),
+    }
+
+
+def _sweep(station, idx, start, end, issued, state, out):
+    #one station's runs, idx sorted by usable start
+    points = sorted({start[i] for i in idx} | {end[i] for i in idx})
+    active = []         # heap of (-issued, -position): later position wins ties, as in in_force
+    nxt, last = 0, None
+    for a, b in zip(points, points[1:]):
+        while nxt < len(idx) and start[idx[nxt]] <= a:
+            i = idx[nxt]
+            heapq.heappush(active, (-issued[i], -i))
+            nxt += 1
+        while active and end[-active[0][1]] <= a:
+            heapq.heappop(active)
+        if not active:
+            last = None
+            continue
+        i = -active[0][1]
+        if i == last:
+            out["end"][-1] = b      # the same run carries on past a point
+            continue
+        out["station"].append(station)
+        out["start"].append(a)
+        out["end"].append(b)
+        out["issued"].append(issued[i])
+        out["state"].append(state[i])
+        last = i
+
+
+def hours_by_station(intervals: dict):
+    """Alternate hours per station from in_force_runs, each interval weighted
+    by its length: station, hours, suitable, unsuitable, missing,
+    suitable_share (suitable / judged hours, NaN with none judged -- a
+    station without minima is all missing, as in climatology)."""
+    import numpy as np
+    import pandas as pd
+
+    df = pd.DataFrame({
+        "station": intervals["station"],
+        "hours": intervals["end"] - intervals["start"],
+        "state": intervals["state"],
+    })
+    df["suitable"] = np.where(df["state"] == suitability.SUITABLE, df["hours"], 0)
+    df["unsuitable"] = np.where(df["state"] == suitability.UNSUITABLE, df["hours"], 0)
+    df["missing"] = np.where(df["state"] == suitability.MISSING, df["hours"], 0)
+    out = df.groupby("station", as_index=False)[["hours", "suitable", "unsuitable", "missing"]].sum()
+    judged = out["suitable"] + out["unsuitable"]
+    out["suitable_share"] = (out["suitable"] / judged.where(judged > 0)).round(4)
+    return out
+
+
+# ----------------------------
+# Entry points
+# ----------------------------
+
+def build(out_dir="."):
+    """tafs_hourly.csv -> tafs_hourly_runs.csv."""
+    from src import hourly
+
+    metrics.start("runs", out_dir)
+    with metrics.timer("read_hourly"):
+        df_hourly = hourly.load(out_dir)
+    runs = to_runs(df_hourly)
+    if len(runs):
+        print(f"{len(df_hourly)} hourly rows -> {len(runs)} runs (mean {len(df_hourly) / len(runs):.1f} h)")
+    save(runs, out_dir)
+    metrics.finish()
+
+
+def expand_file(out_dir="."):
+    """tafs_hourly_runs.csv -> tafs_hourly.csv, a chunk of runs at a time."""
+    from src import hourly
+
+    metrics.start("runs_expand", out_dir)
+    path = Path(out_dir) / hourly.OUTPUT
+    n = 0
+    with path.open("w", newline="", encoding="utf-8") as f:
+        for i, df in enumerate(iter_hourly(load(out_dir))):
+            df.to_csv(f, index=False, header=(i == 0))
+            n += len(df)
+    print(f"Saved {n} hourly rows to {path}")
+    metrics.finish()
+
+
+def summary(out_dir=".", alternate_csv=None):
+    """Alternate hours per station (TAF in force), worked out on the runs."""
+    req = suitability.Requirements(alternate_csv)
+    runs = load(out_dir)
+    df = hours_by_station(in_force_runs(alternate_runs(runs, req)))
+    print(df.to_string(index=False))
+    return df
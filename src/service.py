@@ -0,0 +1,389 @@
+"""Local HTTP/JSON query service over the processed hourly outputs.
+
+    python -m src.main serve --alt-minima AlternateMinimaReqts.csv \
+        --landing-minima LandingMinimaReqts.csv --port 8765
+
+tafs_hourly.csv and metars_parsed.csv are read once and reduced to
+station-hour arrays (src/suitability.py rules), sorted by (station, hour)
+key, so a query is a binary search and a slice instead of a CSV reload:
+
+    GET /availability?station=CYYQ&start=2024-01-05T00&end=2024-01-06T00
+        alternate and landing state per hour in [start, end)
+    GET /best_alternates?aerodrome=CYTH&time=2024-01-05T12&nm=300&top=5
+        stations within nm (stations.csv), suitable first, then nearest
+    GET /taf_at?station=CYYQ&time=202401051200
+        the hourly TAF row in force for that hour
+    GET /stats
+        requests, p50 / p99 latency, response cache hits / misses
+
+Times take the forms `taf` accepts ('2024-01-05 12:00', 2024-01-05T12,
+202401051200), UTC. Responses are kept in an LRU (--cache-size, keyed by
+path and sorted query); the data never changes while the service runs, so
+nothing is invalidated. Latency is measured per request, cache hits
+included, and the summary goes to run_reports/serve.json on shutdown.
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import signal
+import threading
+import time
+from argparse import ArgumentTypeError
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+
+from src import metrics
+from src import suitability
+from src.model import from_minutes
+from src.suitability import SUITABLE, UNSUITABLE, MISSING
+
+CACHE_SIZE = 4096
+LATENCY_WINDOW = 100_000    # most recent requests kept for the percentiles
+MAX_HOURS = 24 * 366        # longest availability range
+DEFAULT_NM = 300
+DEFAULT_TOP = 10
+
+STATE_NAMES = {SUITABLE: "suitable", UNSUITABLE: "unsuitable", MISSING: "missing"}
+TAF_COLUMNS = ["raw_taf", "issued", "status", "wind", "vis", "sigwx", "clouds", "ceiling",
+               "altmin_ceiling", "altmin_vis", "prob_ceiling"]
+
+
+class QueryError(Exception):
+    """Bad request (400) or nothing to answer with (404)."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def _hour_label(hour: int) -> str:
+    return f"{from_minutes(int(hour) * 60):%Y-%m-%dT%H}Z"
+
+
+def _plain(value):
+    #NumPy scalars / NaN -> JSON
+    if value is None:
+        return None
+    if hasattr(value, "item"):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+# ----------------------------
+# Indexed arrays
+# ----------------------------
+
+class HourTable:
+    """Station-hour rows sorted by (station, hour); columns are arrays."""
+
+    def __init__(self, station, hour, **columns):
+        import numpy as np
+
+        self.stations, code = np.unique(np.asarray(station, dtype=str), return_inverse=True)
+        self._code = {s: i for i, s in enumerate(self.stations.tolist())}
+        keys = (code.astype(np.int64) << 32) | np.asarray(hour, dtype=np.int64)
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.columns = {name: np.asarray(col)[order] for name, col in columns.items()}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, station: str) -> bool:
+        return station in self._code
+
+    def span(self, station: str, start_hour: int, end_hour: int) -> tuple:
+        """(hours, row slice) of station's rows with start_hour <= hour < end_hour."""
+        import numpy as np
+
+        code = self._code.get(station)
+        if code is None:
+            return np.empty(0, dtype=np.int64), slice(0, 0)
+        base = code << 32
+        lo = int(np.searchsorted(self.keys, base | start_hour, side="left"))
+        hi = int(np.searchsorted(self.keys, base | end_hour, side="left"))
+        return self.keys[lo:hi] & 0xFFFFFFFF, slice(lo, hi)
+
+    def row(self, station: str, hour: int) -> int | None:
+        _, rows = self.span(station, hour, hour + 1)
+        return rows.start if rows.stop > rows.start else None
+
+
+class Availability:
+    """Alternate (TAF in force) and landing (reports) states per station-hour."""
+
+    def __init__(self, df_hourly, df_metars, req: suitability.Requirements, index=None):
+        rows = suitability.alternate_rows(df_hourly, req)
+        pick = suitability.in_force(rows["station"], rows["hour"], rows["issued"])
+        taf = {c: df_hourly[c].to_numpy(object)[pick] for c in TAF_COLUMNS if c in df_hourly}
+        self.alternate = HourTable(
+            rows["station"][pick], rows["hour"][pick],
+            state=rows["state"][pick],
+            lead=(rows["hour"][pick] * 60 - rows["issued"][pick]) // 60,
+            **taf,
+        )
+        land = suitability.landing_hours(suitability.landing_rows(df_metars, req))
+        self.landing = HourTable(land["station"], land["hour"], state=land["state"], count=land["count"])
+        self.index = index
+
+    @classmethod
+    def load(cls, out_dir=".", alternate_csv=None, landing_csv=None) -> "Availability":
+        from src import hourly, metars, stations
+
+        req = suitability.Requirements(alternate_csv, landing_csv)
+        with metrics.timer("load_hourly"):
+            df_hourly = hourly.load(out_dir)
+        with metrics.timer("load_metars"):
+            df_metars = metars.load(out_dir)
+        index = None
+        if (Path(out_dir) / stations.OUTPUT).exists():
+            index = stations.StationIndex.load(out_dir)
+        with metrics.timer("index"):
+            return cls(df_hourly, df_metars, req, index)
+
+    # ---- queries ----
+
+    def availability(self, station: str, start: int, end: int) -> dict:
+        import numpy as np
+
+        start_hour, end_hour = start // 60, -(-end // 60)
+        if end_hour <= start_hour:
+            raise QueryError("end must be after start")
+        if end_hour - start_hour > MAX_HOURS:
+            raise QueryError(f"at most {MAX_HOURS} hours per query")
+        if station not in self.alternate and station not in self.landing:
+            raise QueryError(f"no data for {station}", 404)
+
+        n = end_hour - start_hour
+        alt = np.full(n, MISSING, dtype=np.int8)
+        lead = np.full(n, -1, dtype=np.int64)
+        hours, rows = self.alternate.span(station, start_hour, end_hour)
+        alt[hours - start_hour] = self.alternate.columns["state"][rows]
+        lead[hours - start_hour] = self.alternate.columns["lead"][rows]
+
+        land = np.full(n, MISSING, dtype=np.int8)
+        count = np.zeros(n, dtype=np.int64)
+        hours, rows = self.landing.span(station, start_hour, end_hour)
+        land[hours - start_hour] = self.landing.columns["state"][rows]
+        count[hours - start_hour] = self.landing.columns["count"][rows]
+
+        return {
+            "station": station,
+            "start": _hour_label(start_hour),
+            "end": _hour_label(end_hour),
+            "hours": [
+                {
+                    "time": _hour_label(start_hour + i),
+                    "alternate": STATE_NAMES[a],
+                    "lead_h": None if ld < 0 else ld,
+                    "landing": STATE_NAMES[l],
+                    "reports": c,
+                }
+                for i, (a, ld, l, c) in enumerate(zip(alt.tolist(), lead.tolist(), land.tolist(), count.tolist()))
+            ],
+            "summary": {
+                "hours": n,
+                "alternate_suitable": int((alt == SUITABLE).sum()),
+                "alternate_missing": int((alt == MISSING).sum()),
+                "landing_suitable": int((land == SUITABLE).sum()),
+                "landing_missing": int((land == MISSING).sum()),
+            },
+        }
+
+    def taf_at(self, station: str, time: int) -> dict:
+        hour = time // 60
+        i = self.alternate.row(station, hour)
+        if i is None:
+            raise QueryError(f"no {station} TAF in force at {_hour_label(hour)}", 404)
+        cols = self.alternate.columns
+        out = {"station": station, "time": _hour_label(hour)}
+        out.update({c: _plain(cols[c][i]) for c in TAF_COLUMNS if c in cols})
+        out["lead_h"] = _plain(cols["lead"][i])
+        out["alternate"] = STATE_NAMES[int(cols["state"][i])]
+        return out
+
+    def best_alternates(self, aerodrome: str, time: int, nm: float = DEFAULT_NM, top: int = DEFAULT_TOP) -> dict:
+        if self.index is None:
+            raise QueryError("no stations.csv next to the outputs; run `stations build` first", 404)
+        try:
+            near = self.index.within(aerodrome, nm)
+        except KeyError as e:
+            raise QueryError(e.args[0], 404)
+
+        hour = time // 60
+        found = []
+        for icao, distance in near:
+            i = self.alternate.row(icao, hour)
+            state = MISSING if i is None else int(self.alternate.columns["state"][i])
+            found.append({
+                "station": icao,
+                "distance_nm": distance,
+                "alternate": STATE_NAMES[state],
+                "lead_h": None if i is None else _plain(self.alternate.columns["lead"][i]),
+                "taf_issued": None if i is None else _plain(self.alternate.columns["issued"][i]),
+            })
+        #suitable, then unsuitable, then no TAF; nearest first within each (within() order)
+        rank = {"suitable": 0, "unsuitable": 1, "missing": 2}
+        found.sort(key=lambda r: rank[r["alternate"]])
+        return {"aerodrome": aerodrome, "time": _hour_label(hour), "nm": nm, "alternates": found[:top]}
+
+
+# ----------------------------
+# Service
+# ----------------------------
+
+class Latency:
+    """Per-request latencies (ms) over a sliding window."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._ms = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    def add(self, ms: float):
+        with self._lock:
+            self._ms.append(ms)
+            self.requests += 1
+
+    def summary(self) -> dict:
+        import numpy as np
+
+        with self._lock:
+            ms = np.array(self._ms, dtype=float)
+        if not len(ms):
+            return {"requests": self.requests, "p50_ms": None, "p99_ms": None, "max_ms": None}
+        p50, p99 = np.percentile(ms, [50, 99])
+        return {"requests": self.requests, "p50_ms": round(float(p50), 3),
+                "p99_ms": round(float(p99), 3), "max_ms": round(float(ms.max()), 3)}
+
+
+def _arg(query: dict, name: str, parse=str, default=None):
+    value = query.get(name)
+    if value is None:
+        if default is None:
+            raise QueryError(f"missing parameter: {name}")
+        return default
+    try:
+        return parse(value)
+    except (TypeError, ValueError, ArgumentTypeError):
+        raise QueryError(f"bad {name}: {value!r}")
+
+
+class Service:
+    """Routes queries to an Availability; JSON responses cached in an LRU."""
+
+    def __init__(self, data: Availability, cache_size: int = CACHE_SIZE):
+        self.data = data
+        self.latency = Latency()
+        self.answer = functools.lru_cache(maxsize=cache_size)(self._answer)
+
+    def _answer(self, path: str, query: tuple) -> tuple[int, bytes]:
+        from src.main import parse_time
+
+        q = dict(query)
+        try:
+            if path == "/availability":
+                body = self.data.availability(_arg(q, "station").upper(),
+                                              _arg(q, "start", parse_time), _arg(q, "end", parse_time))
+            elif path == "/taf_at":
+                body = self.data.taf_at(_arg(q, "station").upper(), _arg(q, "time", parse_time))
+            elif path == "/best_alternates":
+                body = self.data.best_alternates(_arg(q, "aerodrome").upper(), _arg(q, "time", parse_time),
+                                                 _arg(q, "nm", float, DEFAULT_NM), _arg(q, "top", int, DEFAULT_TOP))
+            else:
+                raise QueryError(f"unknown endpoint {path}", 404)
+            status = 200
+        except QueryError as e:
+            status, body = e.status, {"error": str(e)}
+        return status, json.dumps(body).encode("utf-8")
+
+    def stats(self) -> dict:
+        info = self.answer.cache_info()
+        lookups = info.hits + info.misses
+        return {
+            **self.latency.summary(),
+            "cache": {
+                "hits": info.hits,
+                "misses": info.misses,
+                "hit_rate": round(info.hits / lookups, 4) if lookups else None,
+                "size": info.currsize,
+                "maxsize": info.maxsize,
+            },
+            "alternate_hours": len(self.data.alternate),
+            "landing_hours": len(self.data.landing),
+        }
+
+    def handle(self, target: str) -> tuple[int, bytes]:
+        """(status, JSON body) for a GET target such as /taf_at?station=...;
+        timed into the latency window."""
+        t0 = time.perf_counter()
+        url = urlsplit(target)
+        if url.path == "/stats":
+            result = 200, json.dumps(self.stats()).encode("utf-8")
+        else:
+            result = self.answer(url.path, tuple(sorted(parse_qsl(url.query))))
+        self.latency.add((time.perf_counter() - t0) * 1000)
+        return result
+
+    def record(self):
+        """Request / latency / cache summary into the current run report."""
+        stats = self.stats()
+        metrics.count("requests", stats["requests"])
+        metrics.count("cache_hits", stats["cache"]["hits"])
+        metrics.count("cache_misses", stats["cache"]["misses"])
+        for key in ("p50_ms", "p99_ms", "max_ms"):
+            if stats[key] is not None:
+                metrics.count(f"latency_{key[:-3]}_us", int(stats[key] * 1000))
+        return stats
+
+
+def make_handler(service: Service):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            status, body = service.handle(self.path)
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            #one line per request would swamp the console (and the latency)
+            pass
+
+    return Handler
+
+
+def _stop(signum, frame):
+    #SIGTERM (service managers, kill) shuts down like Ctrl-C, report included
+    raise KeyboardInterrupt
+
+
+def main(out_dir=".", alternate_csv=None, landing_csv=None, host="127.0.0.1", port=8765,
+         cache_size: int = CACHE_SIZE):
+    metrics.start("serve", out_dir)
+    with metrics.timer("load"):
+        data = Availability.load(out_dir, alternate_csv, landing_csv)
+    service = Service(data, cache_size)
+    print(f"Loaded {len(data.alternate)} alternate and {len(data.landing)} landing station-hours"
+          + ("" if data.index else " (no stations.csv: best_alternates disabled)"))
+
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    signal.signal(signal.SIGTERM, _stop)
+    print(f"Serving on http://{host}:{server.server_address[1]}/ (Ctrl-C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        stats = service.record()
+        print(f"{stats['requests']} requests, p50 {stats['p50_ms']} ms, p99 {stats['p99_ms']} ms, "
+              f"cache hit rate {stats['cache']['hit_rate']}")
+        metrics.finish()
@@ -0,0 +1,221 @@
+"""Station registry and spatial index from the Ogimet file headers.
+
+Every archive file starts with
+
+    # CYTH, Thompson (Canada)
+    # Latitude 58-44-23N. Longitude 094-03-54W. Altitude 29 m.
+
+which extract_meta (src/parser.py) already reads. build() collects that
+into stations.csv (icao, lat, lon, elevation_m; the latest month wins when
+a station's header changes) and StationIndex answers distance questions
+with vectorized haversine:
+
+    index = StationIndex.load(".")
+    index.within("CYTH", 200)            # [(icao, nm), ...] nearest first
+    index.distances(max_nm=300, top=5)   # tidy station / other / distance_nm / rank
+
+Stations are kept sorted by latitude, so a radius query only runs the
+haversine over the latitude band that can be inside the radius; the full
+table is one N x N matrix. Together they replace the hand-typed distances
+in 2AltPolicy.csv when choosing alternate candidates.
+"""
+
+from __future__ import annotations
+
+import csv
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+from src import metrics
+
+OUTPUT = "stations.csv"
+DISTANCES = "station_distances.csv"
+
+EARTH_RADIUS_NM = 3440.065
+NM_PER_DEGREE_LAT = 60.0
+
+# 58-44-23N, 094-03-54W, 58-44N; plain decimal degrees also accepted
+_DMS_RE = re.compile(r"^(\d+)-(\d+)(?:-(\d+(?:\.\d+)?))?([NSEW])$")
+_ELEVATION_RE = re.compile(r"(-?\d+(?:\.\d+)?)\s*m\b")
+
+
+@dataclass(slots=True)
+class Station:
+    icao: str
+    lat: float
+    lon: float
+    elevation_m: float | None = None
+
+
+def parse_coord(text: str | None) -> float | None:
+    """'58-44-23N' -> 58.7397; S / W negative. None if unreadable."""
+    if not text:
+        return None
+    text = text.strip().upper()
+    if m := _DMS_RE.match(text):
+        deg, minutes, seconds, hemi = m.groups()
+        value = int(deg) + int(minutes) / 60 + float(seconds or 0) / 3600
+        return -value if hemi in "SW" else value
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def parse_elevation(text: str | None) -> float | None:
+    if text and (m := _ELEVATION_RE.search(text)):
+        return float(m.group(1))
+    return None
+
+
+# ----------------------------
+# Registry
+# ----------------------------
+
+def station_from_meta(meta: dict) -> Station | None:
+    icao = meta.get("station")
+    lat, lon = parse_coord(meta.get("latitude")), parse_coord(meta.get("longitude"))
+    if not icao or lat is None or lon is None:
+        return None
+    return Station(icao, lat, lon, parse_elevation(meta.get("elevation")))
+
+
+def read_header(path) -> dict:
+    """extract_meta on the first few KB of an archive file."""
+    from src import archive, parser
+
+    with archive.open_archive(path) as f:
+        head = f.read(4096).decode("utf-8", errors="ignore")
+    return parser.extract_meta(head)
+
+
+def build(data_dir="data") -> dict[str, Station]:
+    """{icao: Station} from the archive headers (files in name order, so
+    the latest month of a station wins)."""
+    from src import archive
+
+    registry = {}
+    for path in archive.find(data_dir):
+        station = station_from_meta(read_header(path))
+        if station is None:
+            metrics.drop("no_coordinates")
+            continue
+        registry[station.icao] = station
+    metrics.count("stations", len(registry))
+    return registry
+
+
+def save(registry: dict, out_dir="."):
+    path = Path(out_dir) / OUTPUT
+    with path.open("w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["icao", "lat", "lon", "elevation_m"])
+        for s in sorted(registry.values(), key=lambda s: s.icao):
+            w.writerow([s.icao, round(s.lat, 6), round(s.lon, 6), "" if s.elevation_m is None else s.elevation_m])
+    print(f"Saved {len(registry)} stations to {path}")
+
+
+def load(out_dir=".") -> dict[str, Station]:
+    registry = {}
+    with (Path(out_dir) / OUTPUT).open(newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            elevation = float(row["elevation_m"]) if row["elevation_m"] else None
+            registry[row["icao"]] = Station(row["icao"], float(row["lat"]), float(row["lon"]), elevation)
+    return registry
+
+
+# ----------------------------
+# Spatial index
+# ----------------------------
+
+def haversine_nm(lat1, lon1, lat2, lon2):
+    """Great-circle distance in nm; degrees in, NumPy broadcasting."""
+    import numpy as np
+
+    lat1, lon1, lat2, lon2 = (np.radians(x) for x in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_NM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class StationIndex:
+    """Stations sorted by latitude, with their coordinates as arrays."""
+
+    def __init__(self, registry: dict[str, Station]):
+        import numpy as np
+
+        stations = sorted(registry.values(), key=lambda s: (s.lat, s.icao))
+        self.icao = np.array([s.icao for s in stations], dtype=str)
+        self.lat = np.array([s.lat for s in stations], dtype=float)
+        self.lon = np.array([s.lon for s in stations], dtype=float)
+        self._row = {icao: i for i, icao in enumerate(self.icao)}
+
+    @classmethod
+    def load(cls, out_dir=".") -> "StationIndex":
+        return cls(load(out_dir))
+
+    def __len__(self) -> int:
+        return len(self.icao)
+
+    def position(self, where) -> tuple[float, float]:
+        """ICAO or (lat, lon) -> (lat, lon)."""
+        if isinstance(where, str):
+            i = self._row.get(where.upper())
+            if i is None:
+                raise KeyError(f"{where} is not in the station registry")
+            return float(self.lat[i]), float(self.lon[i])
+        return where
+
+    def within(self, where, nm: float) -> list[tuple[str, float]]:
+        """Stations within nm of a station / point, nearest first (a
+        station is not its own neighbour)."""
+        import numpy as np
+
+        lat, lon = self.position(where)
+        band = nm / NM_PER_DEGREE_LAT
+        lo = int(np.searchsorted(self.lat, lat - band, side="left"))
+        hi = int(np.searchsorted(self.lat, lat + band, side="right"))
+        d = haversine_nm(lat, lon, self.lat[lo:hi], self.lon[lo:hi])
+        inside = np.flatnonzero(d <= nm)
+        order = inside[np.argsort(d[inside], kind="stable")]
+        own = where.upper() if isinstance(where, str) else None
+        return [(str(self.icao[lo + i]), round(float(d[i]), 1)) for i in order if self.icao[lo + i] != own]
+
+    def matrix(self):
+        """(icao, N x N distance matrix in nm)."""
+        return self.icao, haversine_nm(self.lat[:, None], self.lon[:, None], self.lat[None, :], self.lon[None, :])
+
+    def distances(self, stations=None, max_nm: float | None = None, top: int | None = None):
+        """Tidy station / other / distance_nm / rank table, nearest first
+        per station; stations limits the left side."""
+        import numpy as np
+        import pandas as pd
+
+        icao, d = self.matrix()
+        np.fill_diagonal(d, np.inf)
+        rows = np.arange(len(icao)) if stations is None else \
+            np.array([self._row[s.upper()] for s in stations if s.upper() in self._row], dtype=np.int64)
+
+        d = d[rows]
+        order = np.argsort(d, axis=1, kind="stable")
+        dist = np.take_along_axis(d, order, axis=1)
+        rank = np.broadcast_to(np.arange(1, d.shape[1] + 1), d.shape)
+        keep = np.isfinite(dist)
+        if max_nm is not None:
+            keep &= dist <= max_nm
+        if top is not None:
+            keep &= rank <= top
+
+        r, c = np.nonzero(keep)
+        return pd.DataFrame({
+            "station": icao[rows[r]],
+            "other": icao[order[r, c]],
+            "distance_nm": dist[r, c].round(1),
+            "rank": rank[r, c],
+        }).sort_values(["station", "rank"], ignore_index=True)
+
+
+def main(data_dir="data", out_dir="."):
+    metrics.start("stations", out_dir)
+    save(build(data_dir), out_dir)
+    metrics.finish()
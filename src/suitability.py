@@ -0,0 +1,306 @@
+"""Hourly alternate / landing suitability, as the R scripts compute it.
+
+    alternate (analyze_hourly_tafs.R)
+        per hourly TAF row: altmin ceiling / vis meet one of the alternate
+        options for the runways the forecast wind leaves usable, and any
+        PROB ceiling is at least the rounded lowest HAA. NIL / CNL TAFs and
+        rows with no usable runway are unsuitable.
+        per station-hour: the row of the TAF in force -- the latest one
+        issued at least 3 h before the hour.
+
+    landing (analyze_hourly_metars.R, merged_data.R)
+        per METAR/SPECI: ceiling >= HAA and vis >= approach ban vis of the
+        lowest-HAA usable runway (unknown when no runway is usable, false
+        when vis is missing). Reports sharing a (station, issue time) are
+        dropped, as the R side does.
+        per station-hour: any false -> false, all true -> true, else missing.
+
+A station with no rows in the minima CSV (or no CSV at all) is MISSING on
+that side: the R joins leave its limits NA, and nothing is made up.
+
+States are int8 SUITABLE / UNSUITABLE / MISSING. Requirements are worked out
+once per distinct (station, wind) -- the slow mapply in the R scripts -- and
+the comparisons run on whole arrays.
+"""
+
+from __future__ import annotations
+
+from src import metrics
+from src import minima
+
+SUITABLE = 1
+UNSUITABLE = 0
+MISSING = -1
+
+# a TAF counts from this long after issue (R: issued_time <= time - hours(3))
+TAF_LAG_MINUTES = 180
+# alternate options per row, padded with (inf, inf)
+MAX_OPTIONS = 3
+
+
+class Requirements:
+    """Per-(station, wind) minima, cached; None for stations with none."""
+
+    def __init__(self, alternate_csv=None, landing_csv=None, policy: minima.Policy = minima.DEFAULT_POLICY):
+        self.policy = policy
+        self.alt_runways = minima.load_runways(alternate_csv) if alternate_csv else {}
+        self.landing_runways = minima.load_runways(landing_csv) if landing_csv else {}
+        self._alt = {}
+        self._landing = {}
+
+    def alternate(self, station: str, wind) -> tuple | None:
+        """(options, prob ceiling limit or None); None without minima."""
+        key = (station, wind)
+        if key not in self._alt:
+            runways = self.alt_runways.get(station)
+            if runways is None:
+                self._alt[key] = None
+            else:
+                usable = minima.usable_runways(runways, wind, self.policy)
+                self._alt[key] = (minima.alternate_options(usable, self.policy),
+                                  minima.prob_ceiling_limit(usable, self.policy))
+        return self._alt[key]
+
+    def landing(self, station: str, wind) -> tuple | None:
+        """(ceiling, vis), or None with no usable runway (see has_landing)."""
+        key = (station, wind)
+        if key not in self._landing:
+            runways = self.landing_runways.get(station)
+            if runways is None:
+                self._landing[key] = None
+            else:
+                usable = minima.usable_runways(runways, wind, self.policy, unknown_usable=True)
+                self._landing[key] = minima.landing_limits(usable)
+        return self._landing[key]
+
+    def with_policy(self, policy: minima.Policy) -> "Requirements":
+        """Same runways, another policy (fresh caches)."""
+        other = Requirements(policy=policy)
+        other.alt_runways = self.alt_runways
+        other.landing_runways = self.landing_runways
+        return other
+
+    def has_landing(self, station: str) -> bool:
+        return station in self.landing_runways
+
+    def without_minima(self, stations) -> tuple[list, list]:
+        """Stations with no alternate / landing minima on file (MISSING)."""
+        stations = sorted(set(stations))
+        return ([s for s in stations if s not in self.alt_runways],
+                [s for s in stations if s not in self.landing_runways])
+
+
+# ----------------------------
+# Row level
+# ----------------------------
+
+def _stamp_minutes(values):
+    import pandas as pd
+    ts = pd.to_datetime(pd.Series(values).astype(str), format="%Y%m%d%H%M")
+    return ts.to_numpy("datetime64[m]").astype("int64")
+
+
+def _codes(values):
+    #(distinct values, index of each row into them)
+    import numpy as np
+    uniq, inverse = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+    return uniq, inverse
+
+
+def _station_wind(station, wind):
+    #(code per row, distinct (station, wind) pairs); missing wind -> None
+    import pandas as pd
+    codes, uniq = pd.MultiIndex.from_arrays([station, wind.fillna("")]).factorize()
+    return codes, [(st, w or None) for st, w in uniq]
+
+
+def alternate_table(uniq: list, req: Requirements) -> tuple:
+    """(option ceilings, option vis, PROB ceiling limit, has minima) per
+    (station, wind)."""
+    import numpy as np
+
+    opt_ceil = np.full((len(uniq), MAX_OPTIONS), np.inf)
+    opt_vis = np.full((len(uniq), MAX_OPTIONS), np.inf)
+    prob_limit = np.full(len(uniq), -np.inf)
+    known = np.ones(len(uniq), dtype=bool)
+    for i, (st, w) in enumerate(uniq):
+        found = req.alternate(st, w)
+        if found is None:
+            known[i] = False
+            continue
+        options, limit = found
+        for j, (c, v) in enumerate(options[:MAX_OPTIONS]):
+            opt_ceil[i, j], opt_vis[i, j] = c, v
+        if limit is not None:
+            prob_limit[i] = limit
+    return opt_ceil, opt_vis, prob_limit, known
+
+
+def alternate_state(code, ceiling, vis, prob, normal, table: tuple):
+    """SUITABLE / UNSUITABLE per row, MISSING for stations without minima;
+    code indexes the alternate_table rows, ceiling is inf when there is
+    none and prob NaN without a PROB group."""
+    import numpy as np
+
+    opt_ceil, opt_vis, prob_limit, known = table
+    meets = ((ceiling[:, None] >= opt_ceil[code]) & (vis[:, None] >= opt_vis[code])).any(axis=1)
+    prob_ok = np.isnan(prob) | (prob >= prob_limit[code])
+    state = np.where(meets & prob_ok & normal, SUITABLE, UNSUITABLE)
+    return np.where(known[code], state, MISSING).astype(np.int8)
+
+
+@metrics.timed()
+def alternate_rows(df_hourly, req: Requirements) -> dict:
+    """Suitability of every hourly TAF row as an alternate."""
+    import numpy as np
+    import pandas as pd
+
+    station = df_hourly["station"].to_numpy(str)
+    code, uniq = _station_wind(station, df_hourly["wind"])
+    table = alternate_table(uniq, req)
+    metrics.count("alternate_requirements", len(uniq))
+
+    ceiling = pd.to_numeric(df_hourly["altmin_ceiling"]).fillna(np.inf).to_numpy(float)
+    vis = pd.to_numeric(df_hourly["altmin_vis"]).to_numpy(float)
+    prob = pd.to_numeric(df_hourly["prob_ceiling"]).to_numpy(float)
+    normal = (df_hourly["status"] == "NORMAL").to_numpy()
+
+    minute = pd.to_datetime(df_hourly["time"]).to_numpy("datetime64[m]").astype("int64")
+    return {
+        "station": station,
+        "hour": minute // 60,
+        "issued": _stamp_minutes(df_hourly["issued"]),
+        "state": alternate_state(code, ceiling, vis, prob, normal, table),
+    }
+
+
+def reconstruct_wind(df_metars):
+    """wind_reconstructed from analyze_hourly_metars.R: dddssGggKT or None."""
+    import pandas as pd
+
+    direction = df_metars["wind_dir"].astype("string").str.zfill(3)
+    speed = pd.to_numeric(df_metars["wind_speed"]).round().astype("Int64").astype("string").str.zfill(2)
+    gust = pd.to_numeric(df_metars["wind_gust"]).astype("Int64").astype("string").str.zfill(2)
+    wind = direction + speed + ("G" + gust).fillna("") + "KT"
+    return wind.astype(object).where(wind.notna(), None)
+
+
+@metrics.timed()
+def landing_rows(df_metars, req: Requirements) -> dict:
+    """Landing suitability of every METAR/SPECI (duplicates dropped)."""
+    import numpy as np
+    import pandas as pd
+
+    issued = _stamp_minutes(df_metars["issued"])
+    dup = pd.DataFrame({"station": df_metars["station"].to_numpy(), "issued": issued}).duplicated(keep=False).to_numpy()
+    metrics.drop("duplicate_metar", int(dup.sum()))
+
+    df = df_metars[~dup]
+    issued = issued[~dup]
+    station = df["station"].to_numpy(str)
+    code, uniq = _station_wind(station, reconstruct_wind(df))
+    table = landing_table(uniq, req)
+    metrics.count("landing_requirements", len(uniq))
+
+    ceiling = pd.to_numeric(df["ceiling"]).fillna(np.inf).to_numpy(float)
+    vis = pd.to_numeric(df["visibility"]).to_numpy(float)
+    return {
+        "station": station,
+        "hour": issued // 60,
+        "issued": issued,
+        "ceiling": ceiling,
+        "vis": vis,
+        "state": landing_state(code, ceiling, vis, table),
+    }
+
+
+def landing_table(uniq: list, req: Requirements) -> tuple:
+    """(HAA, approach ban vis, has minima) per (station, wind); NaN limits
+    with no usable runway."""
+    import numpy as np
+
+    lim_ceil = np.full(len(uniq), np.nan)
+    lim_vis = np.full(len(uniq), np.nan)
+    known = np.array([req.has_landing(st) for st, _ in uniq], dtype=bool)
+    for i, (st, w) in enumerate(uniq):
+        limits = req.landing(st, w)
+        if limits is not None:
+            lim_ceil[i], lim_vis[i] = limits
+    return lim_ceil, lim_vis, known
+
+
+def landing_state(code, ceiling, vis, table: tuple):
+    """SUITABLE / UNSUITABLE / MISSING per report; code indexes landing_table.
+    Stations without minima are MISSING."""
+    import numpy as np
+
+    haa, ban, known = table[0][code], table[1][code], table[2][code]
+    #R's three-valued &: any known FALSE -> FALSE, all TRUE -> TRUE, else NA
+    with np.errstate(invalid="ignore"):
+        any_false = np.isnan(vis) | (ceiling < haa) | (vis < ban)
+        all_true = (ceiling >= haa) & (vis >= ban)
+    state = np.where(any_false, UNSUITABLE, np.where(all_true, SUITABLE, MISSING))
+    return np.where(known, state, MISSING).astype(np.int8)
+
+
+# ----------------------------
+# Station-hour level
+# ----------------------------
+
+def _group_last(keys, order_by):
+    #index of the row with the largest order_by in each key group
+    import numpy as np
+    order = np.lexsort((order_by, keys))
+    k = keys[order]
+    last = np.flatnonzero(np.append(k[1:] != k[:-1], True))
+    return order[last]
+
+
+def in_force(station, hour, issued):
+    """Index of the row in force for each station-hour: the latest TAF
+    issued at least TAF_LAG_MINUTES before the hour."""
+    import numpy as np
+
+    eligible = np.flatnonzero(issued <= hour * 60 - TAF_LAG_MINUTES)
+    if not len(eligible):
+        return eligible
+    stations, st = _codes(station[eligible])
+    keys = (st.astype(np.int64) << 32) | hour[eligible]
+    return eligible[_group_last(keys, issued[eligible])]
+
+
+@metrics.timed()
+def alternate_hours(rows: dict) -> dict:
+    """Station-hours with the TAF in force: station, hour, state, lead (hours)."""
+    pick = in_force(rows["station"], rows["hour"], rows["issued"])
+    return {
+        "station": rows["station"][pick],
+        "hour": rows["hour"][pick],
+        "state": rows["state"][pick],
+        "lead": (rows["hour"][pick] * 60 - rows["issued"][pick]) // 60,
+    }
+
+
+@metrics.timed()
+def landing_hours(rows: dict) -> dict:
+    """Station-hours with at least one report: station, hour, state, count."""
+    import numpy as np
+
+    stations, st = _codes(rows["station"])
+    keys = (st.astype(np.int64) << 32) | rows["hour"]
+    order = np.argsort(keys, kind="stable")
+    keys, state = keys[order], rows["state"][order]
+    uniq, first = np.unique(keys, return_index=True)
+    if not len(uniq):
+        return {"station": stations[:0], "hour": uniq, "state": state, "count": uniq}
+
+    any_false = np.add.reduceat((state == UNSUITABLE).astype(np.int64), first) > 0
+    all_true = np.minimum.reduceat(state, first) == SUITABLE
+    hour_state = np.where(any_false, UNSUITABLE, np.where(all_true, SUITABLE, MISSING)).astype(np.int8)
+
+    return {
+        "station": stations[uniq >> 32],
+        "hour": uniq & 0xFFFFFFFF,
+        "state": hour_state,
+        "count": np.diff(np.append(first, len(keys))),
+    }
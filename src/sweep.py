@@ -0,0 +1,327 @@
+"""Minima policy sweeps: availability per station for a grid of policies.
+
+    python -m src.main sweep --alt-minima AlternateMinimaReqts.csv \
+        --landing-minima LandingMinimaReqts.csv \
+        --grid max_tailwind=5,10,15 --grid prob_rule=haa,none --jobs 4
+
+tafs_hourly.csv and metars_parsed.csv are read and decoded once. Nothing
+that decides *which* row counts depends on the policy -- the TAF in force
+per station-hour, the duplicate METARs, the station-hour groups -- so
+that is worked out once too, and a policy only redoes the per-(station,
+wind) requirements and the array comparisons (src/suitability.py).
+
+With --jobs > 1 the arrays go into shared memory blocks that the worker
+processes map read-only, so each worker gets them without a pickle copy;
+the policies are spread over the workers. Results go to sweep.csv, one
+row per parameter set, station and measure:
+
+    suitable / unsuitable   station-hours judged either way
+    missing                 hours in the station's span with no TAF in
+                            force / no usable METAR verdict
+    availability            suitable / all hours in the span
+    frac_suitable           suitable / (suitable + unsuitable)
+
+Parameters (any not given keep the minima.Policy default):
+
+    max_tailwind        kt, runway usable below this
+    haa_add             HAA add for 0 / 1 precision approaches (+300)
+    haa_add_precision   HAA add for 2+ precision approaches (+200)
+    tierN_ceiling       minimum alternate ceiling for N = 0 / 1 / 2 approaches
+    standard_extra      on / off: the +100 / 1.5 and +200 / 1 standard options
+    prob_rule           haa / alternate / none (minima.Policy)
+"""
+
+from __future__ import annotations
+
+import itertools
+import re
+from dataclasses import replace
+from pathlib import Path
+
+from src import metrics
+from src import minima
+from src import suitability
+from src.suitability import SUITABLE, UNSUITABLE
+
+OUTPUT = "sweep.csv"
+
+
+def _on_off(value: str) -> bool:
+    if value.lower() in ("on", "yes", "true", "1"):
+        return True
+    if value.lower() in ("off", "no", "false", "0"):
+        return False
+    raise ValueError(f"expected on / off, got {value!r}")
+
+
+PARAMS = {
+    "max_tailwind": float,
+    "haa_add": int,
+    "haa_add_precision": int,
+    "tier0_ceiling": int,
+    "tier1_ceiling": int,
+    "tier2_ceiling": int,
+    "standard_extra": _on_off,
+    "prob_rule": str,
+}
+
+
+# ----------------------------
+# Parameter grid
+# ----------------------------
+
+def parse_grid(specs) -> dict:
+    """['max_tailwind=5,10', 'prob_rule=haa,none'] -> {name: [values]}."""
+    grid = {}
+    for spec in specs or []:
+        name, _, values = spec.partition("=")
+        if name not in PARAMS or not values:
+            raise ValueError(f"bad grid entry {spec!r}; parameters: {', '.join(PARAMS)}")
+        grid[name] = [PARAMS[name](v) for v in values.split(",")]
+    return grid
+
+
+def combinations(grid: dict) -> list[dict]:
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+
+
+def make_policy(params: dict, base: minima.Policy = minima.DEFAULT_POLICY) -> minima.Policy:
+    tiers = dict(base.tiers)
+    changes = {}
+    for name, value in params.items():
+        if name == "haa_add":
+            for n in (0, 1):
+                tiers[n] = (tiers[n][0], value) + tiers[n][2:]
+        elif name == "haa_add_precision":
+            tiers[2] = (tiers[2][0], value) + tiers[2][2:]
+        elif m := re.fullmatch(r"tier(\d)_ceiling", name):
+            n = int(m.group(1))
+            tiers[n] = (value,) + tiers[n][1:]
+        elif name == "standard_extra":
+            changes["standard_extra"] = base.standard_extra if value else ()
+        else:
+            changes[name] = value
+    return replace(base, tiers=tiers, **changes)
+
+
+# ----------------------------
+# Decode once
+# ----------------------------
+
+@metrics.timed()
+def prepare(df_hourly, df_metars) -> tuple[dict, dict]:
+    """(arrays, context): the policy-independent inputs.
+
+    arrays are flat NumPy arrays (shared with the workers); context holds
+    the small Python objects -- station names and (station, wind) pairs.
+    """
+    import numpy as np
+    import pandas as pd
+
+    # ---- alternate: rows of the TAF in force per station-hour ----
+    station = df_hourly["station"].to_numpy(str)
+    minute = pd.to_datetime(df_hourly["time"]).to_numpy("datetime64[m]").astype("int64")
+    hour = minute // 60
+    pick = suitability.in_force(station, hour, suitability._stamp_minutes(df_hourly["issued"]))
+    code, alt_pairs = suitability._station_wind(station[pick], df_hourly["wind"].iloc[pick])
+
+    # ---- landing: deduplicated reports grouped by station-hour ----
+    issued = suitability._stamp_minutes(df_metars["issued"])
+    dup = pd.DataFrame({"station": df_metars["station"].to_numpy(), "issued": issued}).duplicated(keep=False).to_numpy()
+    df = df_metars[~dup]
+    m_station = df["station"].to_numpy(str)
+    m_hour = issued[~dup] // 60
+    m_code, land_pairs = suitability._station_wind(m_station, suitability.reconstruct_wind(df))
+
+    stations = np.union1d(np.unique(station), np.unique(m_station))
+    m_st = np.searchsorted(stations, m_station)
+    keys = (m_st.astype(np.int64) << 32) | m_hour
+    order = np.argsort(keys, kind="stable")
+    group_keys, group = np.unique(keys[order], return_inverse=True)
+
+    def span(st_idx, hours):
+        #hours from each station's first to last row
+        first = np.full(len(stations), np.iinfo(np.int64).max)
+        last = np.full(len(stations), np.iinfo(np.int64).min)
+        np.minimum.at(first, st_idx, hours)
+        np.maximum.at(last, st_idx, hours)
+        return np.maximum(last - first + 1, 0)
+
+    alt_st = np.searchsorted(stations, station)
+    arrays = {
+        "alt_code": code.astype(np.int64),
+        "alt_station": alt_st[pick],
+        "alt_hour": hour[pick],
+        "alt_ceiling": pd.to_numeric(df_hourly["altmin_ceiling"]).fillna(np.inf).to_numpy(float)[pick],
+        "alt_vis": pd.to_numeric(df_hourly["altmin_vis"]).to_numpy(float)[pick],
+        "alt_prob": pd.to_numeric(df_hourly["prob_ceiling"]).to_numpy(float)[pick],
+        "alt_normal": (df_hourly["status"] == "NORMAL").to_numpy()[pick],
+        "alt_span": span(alt_st, hour) if len(hour) else np.zeros(len(stations), np.int64),
+        "land_code": m_code.astype(np.int64)[order],
+        "land_ceiling": pd.to_numeric(df["ceiling"]).fillna(np.inf).to_numpy(float)[order],
+        "land_vis": pd.to_numeric(df["visibility"]).to_numpy(float)[order],
+        "land_group": group.astype(np.int64),
+        "land_group_station": (group_keys >> 32).astype(np.int64),
+        "land_group_hour": group_keys & 0xFFFFFFFF,
+        "land_span": span(m_st, m_hour) if len(m_hour) else np.zeros(len(stations), np.int64),
+    }
+    context = {"stations": list(stations), "alt_pairs": alt_pairs, "land_pairs": land_pairs}
+    metrics.count("alternate_hours", len(pick))
+    metrics.count("landing_reports", len(order))
+    return arrays, context
+
+
+# ----------------------------
+# One policy
+# ----------------------------
+
+def _tally(st_idx, state, n_stations: int):
+    import numpy as np
+    suitable = np.bincount(st_idx[state == SUITABLE], minlength=n_stations)
+    unsuitable = np.bincount(st_idx[state == UNSUITABLE], minlength=n_stations)
+    return suitable, unsuitable
+
+
+def hour_states(arrays: dict, context: dict, req: suitability.Requirements) -> dict:
+    """{measure: state} for one policy: alternate per in-force station-hour
+    (alt_station / alt_hour), landing per report group (land_group_*)."""
+    import numpy as np
+
+    table = suitability.alternate_table(context["alt_pairs"], req)
+    alternate = suitability.alternate_state(arrays["alt_code"], arrays["alt_ceiling"], arrays["alt_vis"],
+                                            arrays["alt_prob"], arrays["alt_normal"], table)
+
+    table = suitability.landing_table(context["land_pairs"], req)
+    state = suitability.landing_state(arrays["land_code"], arrays["land_ceiling"], arrays["land_vis"], table)
+    group = arrays["land_group"]
+    n_groups = len(arrays["land_group_station"])
+    any_false = np.bincount(group, weights=state == UNSUITABLE, minlength=n_groups) > 0
+    n_true = np.bincount(group, weights=state == SUITABLE, minlength=n_groups)
+    all_true = n_true == np.bincount(group, minlength=n_groups)
+    landing = np.where(any_false, UNSUITABLE, np.where(all_true, SUITABLE, suitability.MISSING))
+
+    return {"alternate": alternate, "landing": landing}
+
+
+def evaluate(arrays: dict, context: dict, req: suitability.Requirements) -> dict:
+    """{measure: (suitable, unsuitable, hours)} per station for one policy."""
+    n = len(context["stations"])
+    states = hour_states(arrays, context, req)
+    return {
+        "alternate": _tally(arrays["alt_station"], states["alternate"], n) + (arrays["alt_span"],),
+        "landing": _tally(arrays["land_group_station"], states["landing"], n) + (arrays["land_span"],),
+    }
+
+
+# ----------------------------
+# Workers
+# ----------------------------
+
+_worker = {}
+
+
+def _share(arrays: dict) -> tuple[list, dict]:
+    """Copy arrays into shared memory; (blocks to keep / unlink, spec)."""
+    import numpy as np
+    from multiprocessing import shared_memory
+
+    blocks, spec = [], {}
+    for name, arr in arrays.items():
+        shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        np.ndarray(arr.shape, arr.dtype, buffer=shm.buf)[...] = arr
+        blocks.append(shm)
+        spec[name] = (shm.name, arr.dtype.str, arr.shape)
+    return blocks, spec
+
+
+def _attach(spec: dict, context: dict, req: suitability.Requirements):
+    import numpy as np
+    from multiprocessing import shared_memory
+
+    arrays = {}
+    for name, (shm_name, dtype, shape) in spec.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _worker.setdefault("blocks", []).append(shm)     #keep the mapping alive
+        arr = np.ndarray(shape, dtype, buffer=shm.buf)
+        arr.flags.writeable = False
+        arrays[name] = arr
+    _worker.update(arrays=arrays, context=context, req=req)
+
+
+def _evaluate_in_worker(params: dict) -> dict:
+    req = _worker["req"].with_policy(make_policy(params, _worker["req"].policy))
+    return evaluate(_worker["arrays"], _worker["context"], req)
+
+
+def sweep(arrays: dict, context: dict, req: suitability.Requirements, sets: list[dict], jobs: int = 1) -> list:
+    """evaluate() for every parameter set, in order."""
+    if jobs <= 1 or len(sets) <= 1:
+        return [evaluate(arrays, context, req.with_policy(make_policy(p, req.policy))) for p in sets]
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    blocks, spec = _share(arrays)
+    try:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_attach, initargs=(spec, context, req)) as pool:
+            return list(pool.map(_evaluate_in_worker, sets, chunksize=max(1, len(sets) // (jobs * 4))))
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+
+def results_frame(sets: list[dict], results: list, stations: list):
+    import numpy as np
+    import pandas as pd
+
+    frames = []
+    for i, (params, result) in enumerate(zip(sets, results)):
+        for measure, (suitable, unsuitable, hours) in result.items():
+            df = pd.DataFrame({
+                "station": stations,
+                "measure": measure,
+                "suitable": suitable.astype(np.int64),
+                "unsuitable": unsuitable.astype(np.int64),
+                "missing": hours - suitable - unsuitable,
+                "hours": hours,
+            })
+            for name, value in reversed(params.items()):
+                df.insert(0, name, value)
+            df.insert(0, "set", i)
+            frames.append(df[df["hours"] > 0])
+
+    df = pd.concat(frames, ignore_index=True)
+    judged = df["suitable"] + df["unsuitable"]
+    df["availability"] = (df["suitable"] / df["hours"]).round(4)
+    df["frac_suitable"] = (df["suitable"] / judged.where(judged > 0)).round(4)
+    return df.sort_values(["set", "measure", "station"], ignore_index=True)
+
+
+def main(out_dir=".", alternate_csv=None, landing_csv=None, grid_specs=None, jobs: int = 1, stations=None):
+    from src import hourly, metars
+
+    metrics.start("sweep", out_dir)
+    grid = parse_grid(grid_specs)
+    sets = combinations(grid)
+    req = suitability.Requirements(alternate_csv, landing_csv)
+
+    with metrics.timer("load"):
+        df_hourly = hourly.load(out_dir)
+        df_metars = metars.load(out_dir)
+    if stations:
+        df_hourly = df_hourly[df_hourly["station"].isin(stations)]
+        df_metars = df_metars[df_metars["station"].isin(stations)]
+
+    arrays, context = prepare(df_hourly, df_metars)
+    print(f"Sweeping {len(sets)} parameter sets over {len(context['stations'])} stations ({jobs} jobs)")
+    with metrics.timer("sweep"):
+        results = sweep(arrays, context, req, sets, jobs)
+    metrics.count("parameter_sets", len(sets))
+
+    df = results_frame(sets, results, context["stations"])
+    path = Path(out_dir) / OUTPUT
+    df.to_csv(path, index=False)
+    print(f"Saved {len(df)} rows to {path}")
+    metrics.finish()
+    return df
@@ -0,0 +1,360 @@
+"""Binary nested-TAF file with a per-TAF offset index.
+
+Replaces nested_tafs.json as the hand-off between build_taf.py,
+catch_errors_2.py and process_hourly.py. Records use the codec in
+src/model.py (typed epoch-minute timestamps, no string re-parsing); the
+index at the end of the file lets readers pick TAFs by station / time range
+and decode only those, straight out of a memory map.
+
+file layout:
+
+    MAGIC
+    record 0 .. record n-1          (encode_taf)
+    index entry 0 .. n-1            (_INDEX)
+    footer                          (index offset, count, MAGIC)
+
+Amendment chains are worked out once, when the file is written, and kept in
+the index: per TAF the one it supersedes (the station's previous TAF, if
+that was still valid when this one was issued) and effective_until (the
+next TAF's issue time, or valid_to if nothing replaced it first). With
+delta=True a TAF that supersedes another is stored against it: segments it
+repeats unchanged are references (model.encode_taf), with a full record
+every KEYFRAME_EVERY links so a read never decodes a long chain.
+
+Version 1 files (no chain fields) are still read; their chains are worked
+out when the file is opened.
+
+The chain fields describe amendments (the taf command prints them); they do
+not answer "which TAF is in force at t". That rule (suitability.in_force:
+the latest TAF issued lag minutes before t that covers t) looks past a
+successor that does not cover t yet -- an amendment valid from the next
+hour, a NIL -- so the predecessor stays in force after its effective_until,
+and the lag shifts which successors count at all. TafStore.in_force does a
+bisect on issue time and steps back to the first TAF that covers t.
+"""
+
+import bisect
+import json
+import mmap
+import struct
+from collections import OrderedDict, namedtuple
+from pathlib import Path
+
+from src.model import Taf, TafStatus, decode_taf, encode_taf
+
+MAGIC = b"TAFS\x02"
+MAGIC_V1 = b"TAFS\x01"
+
+# at most this many delta records between full ones
+KEYFRAME_EVERY = 16
+# decoded TAFs kept for delta bases
+BASE_CACHE = 64
+
+_NO_TIME = -(2 ** 63)
+_NONE = -1
+_INDEX_V1 = struct.Struct("<QI4sqqqB")
+_INDEX = struct.Struct("<QI4sqqqBiqi")     # + supersedes, effective_until, base
+_FOOTER = struct.Struct("<QI5s")
+
+IndexEntry = namedtuple(
+    "IndexEntry",
+    ["offset", "length", "station", "issued", "valid_from", "valid_to", "status",
+     "supersedes", "effective_until", "base"],
+    defaults=(None, None, None),
+)
+
+
+def _opt(value):
+    return _NO_TIME if value is None else value
+
+
+def _from_opt(value):
+    return None if value == _NO_TIME else value
+
+
+# ----------------------------
+# Amendment chains
+# ----------------------------
+
+def coverage(e) -> tuple[int, int] | None:
+    """[start, end) minutes a TAF (or index entry) covers, as the hourly
+    expansion sees it: NIL / CNL without a valid period run 24 h from the
+    hour after issue; other TAFs without one cover just their issue time."""
+    lo = e.valid_from
+    if lo is None and e.status in {TafStatus.CANCELLED, TafStatus.NIL} and e.issued is not None:
+        lo = -(-e.issued // 60) * 60
+        return lo, e.valid_to if e.valid_to is not None else lo + 24 * 60
+    if lo is None:
+        lo = e.issued
+    if lo is None:
+        return None
+    return lo, max(e.valid_to if e.valid_to is not None else lo, lo + 1)
+
+
+def link_chains(entries) -> tuple[list, list]:
+    """(supersedes, effective_until) per position for TAFs or index entries.
+
+    Per station in issue order, a TAF supersedes the previous one when that
+    is still valid at its issue time (valid_to later, or unknown); the
+    superseded TAF is effective until then, any other until its valid_to.
+    Exact (station, issued) duplicates chain like any other pair.
+    """
+    supersedes = [None] * len(entries)
+    until = [e.valid_to for e in entries]
+
+    by_station = {}
+    for i, e in enumerate(entries):
+        if e.issued is not None:
+            by_station.setdefault(e.station, []).append(i)
+    for positions in by_station.values():
+        positions.sort(key=lambda i: entries[i].issued)
+        for prev, i in zip(positions, positions[1:]):
+            issued = entries[i].issued
+            if entries[prev].valid_to is None or entries[prev].valid_to > issued:
+                supersedes[i] = prev
+                until[prev] = issued
+    return supersedes, until
+
+
+def write_tafs(path, tafs, delta: bool = False) -> int:
+    """Write TAFs to a binary store; returns number written. delta stores
+    each TAF that supersedes another as a delta against it."""
+    path = Path(path)
+    tafs = tafs if isinstance(tafs, list) else list(tafs)
+    supersedes, until = link_chains(tafs)
+    depth = [0] * len(tafs)
+
+    index = []
+    with path.open("wb") as f:
+        f.write(MAGIC)
+        offset = len(MAGIC)
+        for i, taf in enumerate(tafs):
+            rec, base = encode_taf(taf), supersedes[i]
+            #a base must already be written, and chains stay short
+            if delta and base is not None and base < i and depth[base] + 1 < KEYFRAME_EVERY:
+                smaller = encode_taf(taf, tafs[base])
+                if len(smaller) < len(rec):
+                    rec, depth[i] = smaller, depth[base] + 1
+                else:
+                    base = None
+            else:
+                base = None
+            f.write(rec)
+            index.append(_INDEX.pack(
+                offset,
+                len(rec),
+                (taf.station or "").encode("ascii")[:4],
+                _opt(taf.issued),
+                _opt(taf.valid_from),
+                _opt(taf.valid_to),
+                int(taf.status),
+                _NONE if supersedes[i] is None else supersedes[i],
+                _opt(until[i]),
+                _NONE if base is None else base,
+            ))
+            offset += len(rec)
+
+        f.write(b"".join(index))
+        f.write(_FOOTER.pack(offset, len(index), MAGIC))
+    return len(index)
+
+
+def export_json(tafs, path):
+    """Legacy nested_tafs.json shape, kept for inspection / the R side."""
+    with open(path, "w") as f:
+        json.dump([taf.to_dict() for taf in tafs], f)
+
+
+class TafStore:
+    """Read-only view over a binary TAF file.
+
+    The index is read up front; records are decoded only when asked for.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = self.path.open("rb")
+        try:
+            #mmap refuses an empty file; anything shorter has no footer
+            if self.path.stat().st_size < len(MAGIC) + _FOOTER.size:
+                raise ValueError(f"{self.path} is not a TAF store")
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.index = self._read_index()
+        except (ValueError, struct.error) as e:
+            self.close()
+            if str(self.path) in str(e):
+                raise
+            #truncated / garbled index: unpack_from past the end, bad status byte
+            raise ValueError(f"{self.path} has a damaged index") from e
+
+        self._bases = OrderedDict()
+        self._by_station = None
+
+    def _read_index(self) -> list:
+        self.version = {MAGIC: 2, MAGIC_V1: 1}.get(bytes(self._mm[:len(MAGIC)]))
+        if self.version is None:
+            raise ValueError(f"{self.path} is not a TAF store")
+
+        index_offset, count, magic = _FOOTER.unpack_from(self._mm, len(self._mm) - _FOOTER.size)
+        if magic != self._mm[:len(MAGIC)]:
+            raise ValueError(f"{self.path} has a damaged footer")
+
+        index = []
+        if self.version == 1:
+            for i in range(count):
+                offset, length, station, issued, vf, vt, status = _INDEX_V1.unpack_from(
+                    self._mm, index_offset + i * _INDEX_V1.size
+                )
+                index.append(IndexEntry(
+                    offset, length, station.decode("ascii"),
+                    _from_opt(issued), _from_opt(vf), _from_opt(vt), TafStatus(status)
+                ))
+            supersedes, until = link_chains(index)
+            return [e._replace(supersedes=s, effective_until=u) for e, s, u in zip(index, supersedes, until)]
+
+        for i in range(count):
+            offset, length, station, issued, vf, vt, status, sup, until, base = _INDEX.unpack_from(
+                self._mm, index_offset + i * _INDEX.size
+            )
+            index.append(IndexEntry(
+                offset, length, station.decode("ascii"),
+                _from_opt(issued), _from_opt(vf), _from_opt(vt), TafStatus(status),
+                None if sup == _NONE else sup, _from_opt(until), None if base == _NONE else base,
+            ))
+        return index
+
+    def __len__(self):
+        return len(self.index)
+
+    def __iter__(self):
+        for i in range(len(self.index)):
+            yield self.load(i)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if getattr(self, "_mm", None) is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+    def load(self, i: int, segments: bool = True) -> Taf:
+        """Decode TAF i; segments=False skips the segment block."""
+        entry = self.index[i]
+        base = self._base(entry.base) if segments and entry.base is not None else None
+        taf, _ = decode_taf(self._mm, entry.offset, segments=segments, base=base)
+        return taf
+
+    def _base(self, i: int) -> Taf:
+        #decoded delta bases, kept since consecutive amendments share them
+        taf = self._bases.get(i)
+        if taf is None:
+            taf = self._bases[i] = self.load(i)
+            if len(self._bases) > BASE_CACHE:
+                self._bases.popitem(last=False)
+        else:
+            self._bases.move_to_end(i)
+        return taf
+
+    def find(self, stations=None, start: int | None = None, end: int | None = None) -> list[int]:
+        """Index positions of TAFs for the given stations overlapping [start, end).
+
+        Times are epoch minutes; TAFs without a valid period fall back to
+        their issue time.
+        """
+        if stations is not None:
+            stations = set(stations)
+
+        hits = []
+        for i, e in enumerate(self.index):
+            if stations is not None and e.station not in stations:
+                continue
+            lo = e.valid_from if e.valid_from is not None else e.issued
+            if lo is None:
+                continue
+            hi = e.valid_to if e.valid_to is not None else lo
+            hi = max(hi, lo + 1)
+            if start is not None and hi <= start:
+                continue
+            if end is not None and lo >= end:
+                continue
+            hits.append(i)
+        return hits
+
+    def select(self, stations=None, start: int | None = None, end: int | None = None, segments: bool = True):
+        """Yield decoded TAFs matching find()."""
+        for i in self.find(stations, start, end):
+            yield self.load(i, segments=segments)
+
+    def _station_order(self, station: str) -> tuple[list, list, list]:
+        #(issued, position, running max of valid_to) for station, in issue order
+        if self._by_station is None:
+            groups = {}
+            for i, e in enumerate(self.index):
+                if e.issued is not None:
+                    groups.setdefault(e.station, []).append(i)
+            self._by_station = {}
+            for st, positions in groups.items():
+                positions.sort(key=lambda i: self.index[i].issued)
+                reach, top = [], None
+                for i in positions:
+                    hi = coverage(self.index[i])[1]
+                    top = hi if top is None else max(top, hi)
+                    reach.append(top)
+                self._by_station[st] = ([self.index[i].issued for i in positions], positions, reach)
+        return self._by_station.get(station, ([], [], []))
+
+    def valid_at(self, station: str, minute: int, lag: int = 0) -> list[int]:
+        """Positions of station's TAFs covering minute (coverage()) and
+        issued at least lag minutes before it, latest issued first.
+
+        One bisect on issue time, then back only while an earlier TAF can
+        still reach minute.
+        """
+        issued, positions, reach = self._station_order(station)
+        hits = []
+        k = bisect.bisect_right(issued, minute - lag) - 1
+        while k >= 0 and reach[k] > minute:
+            lo, hi = coverage(self.index[positions[k]])
+            if lo <= minute < hi:
+                hits.append(positions[k])
+            k -= 1
+        return hits
+
+    def in_force(self, station: str, minute: int, lag: int = 0) -> int | None:
+        """Position of the TAF in force: the latest issued at least lag
+        minutes before minute that covers it (suitability's rule with
+        lag=TAF_LAG_MINUTES). Stops at the first covering TAF; usually the
+        one the bisect lands on."""
+        issued, positions, reach = self._station_order(station)
+        k = bisect.bisect_right(issued, minute - lag) - 1
+        while k >= 0 and reach[k] > minute:
+            lo, hi = coverage(self.index[positions[k]])
+            if lo <= minute < hi:
+                return positions[k]
+            k -= 1
+        return None
+
+    def chain(self, i: int) -> list[int]:
+        """i and the TAFs it supersedes, newest first."""
+        out = [i]
+        while self.index[out[-1]].supersedes is not None:
+            out.append(self.index[out[-1]].supersedes)
+        return out
+
+    def at(self, station: str, minute: int) -> list[Taf]:
+        """TAFs for station valid at minute and issued by then, oldest first.
+
+        The last one is the TAF in force. A NIL / CNL TAF without a valid
+        period counts for the 24 h the hourly table gives it.
+        """
+        return [self.load(i) for i in reversed(self.valid_at(station, minute))]
+
+
+def read_tafs(path, stations=None, start: int | None = None, end: int | None = None) -> list[Taf]:
+    with TafStore(path) as store:
+        return list(store.select(stations, start, end))
@@ -0,0 +1,338 @@
+"""TAF-vs-METAR verification: contingency tables per threshold.
+
+Every NORMAL row of tafs_hourly.csv is a forecast for one station-hour at
+some lead time (valid hour - issue time). It is matched against the worst
+METAR/SPECI ceiling and vis observed in that hour, and both sides are
+judged against a threshold: a list of (ceiling, vis) options, any one of
+which is good enough (the standard alternate minima give three).
+
+    event     = conditions below every option of the threshold
+    hit       = forecast event, observed event
+    miss      = no forecast event, observed event
+    false     = forecast event, no observed event
+
+Forecast conditions are read at three levels from the hourly markup:
+
+    prevailing   the base value only
+    tempo        worst of base, TEMPO and BECMG (altmin_ceiling / altmin_vis,
+                 what the alternate rules use)
+    prob         worst of everything including PROB groups
+
+Counts are kept per kind (alternate / landing), level, station, month,
+hour of day and lead-time bucket. Matching is done once on sorted integer
+(station, hour) keys; Verifier.table() only redoes the comparisons and a
+bincount, so trying another threshold is cheap.
+
+Thresholds per station come from the minima CSVs (src/minima.py) with every
+runway usable, so forecast and observation are judged against the same
+line. A station with no threshold (not in the CSV, no runway with complete
+minima) is left out, as the R joins give NA; --threshold names one for every
+station.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from src import metrics
+
+OUTPUT = "verification.csv"
+
+LEVELS = ("prevailing", "tempo", "prob")
+
+_NUM = r"(\d+(?:\.\d+)?)"
+_PROB_TAG = r"\d{2}%: "
+_MINUTES_PER_HOUR = 60
+
+
+# ----------------------------
+# Inputs -> arrays
+# ----------------------------
+
+def _stamp_minutes(values):
+    #YYYYMMDDHHMM ints/strings -> epoch minutes
+    import pandas as pd
+    ts = pd.to_datetime(pd.Series(values).astype(str), format="%Y%m%d%H%M")
+    return ts.to_numpy("datetime64[m]").astype("int64")
+
+
+def _leading_number(text):
+    import pandas as pd
+    return pd.to_numeric(text.str.extract("^" + _NUM, expand=False))
+
+
+def _worst_number(text):
+    #min of every number in the cell, PROB values included ("30%: " dropped)
+    nums = text.str.replace(_PROB_TAG, "", regex=True).str.extractall(_NUM)[0].astype(float)
+    return nums.groupby(level=0).min().reindex(text.index)
+
+
+def forecast_arrays(df_hourly) -> dict:
+    """NORMAL hourly TAF rows -> station / hour / lead / ceiling / vis arrays."""
+    import numpy as np
+    import pandas as pd
+
+    df = df_hourly[df_hourly["status"] == "NORMAL"].reset_index(drop=True)
+    ceiling_text = df["ceiling"].fillna("").astype(str)
+    vis_text = df["vis"].fillna("").astype(str)
+
+    minute = pd.to_datetime(df["time"]).to_numpy("datetime64[m]").astype("int64")
+    issued = _stamp_minutes(df["issued"])
+
+    ceilings = {
+        "prevailing": _leading_number(ceiling_text),
+        "tempo": pd.to_numeric(df["altmin_ceiling"]),
+        "prob": _worst_number(ceiling_text),
+    }
+    vis = {
+        "prevailing": _leading_number(vis_text),
+        "tempo": pd.to_numeric(df["altmin_vis"]),
+        "prob": _worst_number(vis_text),
+    }
+
+    return {
+        "station": df["station"].to_numpy(str),
+        "hour": minute // _MINUTES_PER_HOUR,
+        "lead": np.maximum(minute - issued, 0) // _MINUTES_PER_HOUR,
+        #no ceiling group = unlimited, as the R side's replace_na(Inf)
+        "ceiling": {k: v.fillna(np.inf).to_numpy(float) for k, v in ceilings.items()},
+        "vis": {k: v.to_numpy(float) for k, v in vis.items()},
+    }
+
+
+def observation_arrays(df_metars) -> dict:
+    """METAR/SPECI rows -> station / hour / ceiling / vis arrays."""
+    import numpy as np
+    import pandas as pd
+
+    issued = _stamp_minutes(df_metars["issued"])
+    return {
+        "station": df_metars["station"].to_numpy(str),
+        "hour": issued // _MINUTES_PER_HOUR,
+        "ceiling": pd.to_numeric(df_metars["ceiling"]).fillna(np.inf).to_numpy(float),
+        "vis": pd.to_numeric(df_metars["visibility"]).to_numpy(float),
+    }
+
+
+def worst_per_hour(keys, ceiling, vis):
+    """Reduce observations sharing a key: (keys, min ceiling, min vis, count).
+
+    keys come back sorted and unique; vis is NaN where no report in the
+    hour had one.
+    """
+    import numpy as np
+
+    order = np.argsort(keys, kind="stable")
+    keys, ceiling, vis = keys[order], ceiling[order], vis[order]
+    uniq, first = np.unique(keys, return_index=True)
+
+    worst_ceiling = np.minimum.reduceat(ceiling, first)
+    worst_vis = np.minimum.reduceat(np.where(np.isnan(vis), np.inf, vis), first)
+    worst_vis[np.isinf(worst_vis)] = np.nan
+    count = np.diff(np.append(first, len(keys)))
+    return uniq, worst_ceiling, worst_vis, count
+
+
+# ----------------------------
+# Engine
+# ----------------------------
+
+class Verifier:
+    """Forecasts matched to observed hours, ready for any threshold."""
+
+    def __init__(self, forecast: dict, observed: dict, lead_step: int = 6):
+        import numpy as np
+
+        self.lead_step = lead_step
+        self.stations = np.unique(np.concatenate([forecast["station"], observed["station"]]))
+        n_st = len(self.stations)
+
+        f_st = np.searchsorted(self.stations, forecast["station"])
+        o_st = np.searchsorted(self.stations, observed["station"])
+
+        #one int64 key per station-hour; hours since 1970 fit easily in 32 bits
+        f_key = (f_st.astype(np.int64) << 32) | forecast["hour"]
+        o_key = (o_st.astype(np.int64) << 32) | observed["hour"]
+
+        with metrics.timer("reduce_obs"):
+            keys, o_ceiling, o_vis, self.obs_count = worst_per_hour(o_key, observed["ceiling"], observed["vis"])
+
+        with metrics.timer("match"):
+            if len(keys):
+                pos = np.minimum(np.searchsorted(keys, f_key), len(keys) - 1)
+                #an hour without any vis can't be judged
+                matched = (keys[pos] == f_key) & ~np.isnan(o_vis[pos])
+            else:
+                pos = np.zeros(len(f_key), np.int64)
+                matched = np.zeros(len(f_key), bool)
+
+        metrics.count("forecast_hours", len(f_key))
+        metrics.count("observed_hours", len(keys))
+        metrics.count("matched", int(matched.sum()))
+        self.unmatched = int((~matched).sum())
+
+        idx = np.flatnonzero(matched)
+        self.station = f_st[idx]
+        self.obs_ceiling = o_ceiling[pos[idx]]
+        self.obs_vis = o_vis[pos[idx]]
+        self.fc_ceiling = {k: v[idx] for k, v in forecast["ceiling"].items()}
+        self.fc_vis = {k: v[idx] for k, v in forecast["vis"].items()}
+
+        hour = forecast["hour"][idx]
+        month = (hour.astype("datetime64[h]").astype("datetime64[M]").astype(np.int64) % 12)
+        hod = hour % 24
+        self.n_leads = int(forecast["lead"].max() // lead_step + 1) if len(forecast["lead"]) else 1
+        lead = np.minimum(forecast["lead"][idx] // lead_step, self.n_leads - 1)
+
+        #dense group id: station x month x hour x lead bucket
+        self.shape = (n_st, 12, 24, self.n_leads)
+        self.group = np.ravel_multi_index((self.station, month, hod, lead), self.shape)
+
+    def threshold_arrays(self, spec: dict):
+        """{station or None: [(ceiling, vis), ...]} -> per-station option
+        arrays, and which stations have any option at all."""
+        import numpy as np
+
+        width = max((len(v) for v in spec.values()), default=1) or 1
+        ceil = np.full((len(self.stations), width), np.inf)
+        vis = np.full((len(self.stations), width), np.inf)
+        has = np.zeros(len(self.stations), dtype=bool)
+        for i, st in enumerate(self.stations):
+            options = spec.get(st, spec.get(None, []))
+            has[i] = bool(options)
+            for j, (c, v) in enumerate(options):
+                ceil[i, j], vis[i, j] = c, v
+        return ceil, vis, has
+
+    def below(self, ceiling, vis, thr_ceil, thr_vis):
+        """True where conditions meet none of the station's options."""
+        import numpy as np
+        ok = (ceiling[:, None] >= thr_ceil[self.station]) & (vis[:, None] >= thr_vis[self.station])
+        return ~ok.any(axis=1)
+
+    def counts(self, spec: dict, level: str) -> dict:
+        """hits / misses / false_alarms / correct_negatives per group."""
+        import numpy as np
+
+        thr_ceil, thr_vis, has = self.threshold_arrays(spec)
+        #no threshold for the station: nothing to judge against (NA in R)
+        known = ~np.isnan(self.fc_vis[level]) & has[self.station]
+        fc = self.below(self.fc_ceiling[level], self.fc_vis[level], thr_ceil, thr_vis)
+        ob = self.below(self.obs_ceiling, self.obs_vis, thr_ceil, thr_vis)
+
+        size = int(np.prod(self.shape))
+        cells = {
+            "hits": fc & ob,
+            "misses": ~fc & ob,
+            "false_alarms": fc & ~ob,
+            "correct_negatives": ~fc & ~ob,
+        }
+        return {k: np.bincount(self.group[m & known], minlength=size) for k, m in cells.items()}
+
+    def table(self, thresholds: dict, levels=LEVELS):
+        """Tidy contingency table for {kind: spec} thresholds."""
+        import numpy as np
+        import pandas as pd
+
+        frames = []
+        for kind, spec in thresholds.items():
+            for level in levels:
+                with metrics.timer("contingency"):
+                    c = self.counts(spec, level)
+                n = sum(c.values())
+                nz = np.flatnonzero(n)
+                st, month, hod, lead = np.unravel_index(nz, self.shape)
+                frames.append(pd.DataFrame({
+                    "kind": kind,
+                    "level": level,
+                    "station": self.stations[st],
+                    "month": month + 1,
+                    "hour": hod,
+                    "lead": lead * self.lead_step,
+                    **{k: v[nz] for k, v in c.items()},
+                }))
+
+        if not frames:
+            return pd.DataFrame()
+        return add_scores(pd.concat(frames, ignore_index=True))
+
+
+def add_scores(df):
+    """POD, FAR, CSI and frequency bias from the count columns."""
+    import numpy as np
+
+    h, m, f = (df[k].astype(float) for k in ("hits", "misses", "false_alarms"))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        df["n"] = df["hits"] + df["misses"] + df["false_alarms"] + df["correct_negatives"]
+        df["pod"] = (h / (h + m)).round(4)
+        df["far"] = (f / (h + f)).round(4)
+        df["csi"] = (h / (h + m + f)).round(4)
+        df["bias"] = ((h + f) / (h + m)).round(4)
+    return df
+
+
+def summarize(table, by=("kind", "level")):
+    """Roll the table up to coarser groups, recomputing the scores."""
+    counts = ["hits", "misses", "false_alarms", "correct_negatives"]
+    return add_scores(table.groupby(list(by), as_index=False)[counts].sum())
+
+
+# ----------------------------
+# Thresholds
+# ----------------------------
+
+def thresholds_from_minima(alternate_csv=None, landing_csv=None) -> dict:
+    """Per-station thresholds with every runway usable; stations with no
+    complete minima get none."""
+    from src import minima
+
+    thresholds = {}
+    if alternate_csv:
+        thresholds["alternate"] = {station: minima.alternate_options(runways)
+                                   for station, runways in minima.load_runways(alternate_csv).items()}
+    if landing_csv:
+        thresholds["landing"] = {}
+        for station, runways in minima.load_runways(landing_csv).items():
+            limits = minima.landing_limits(runways)
+            thresholds["landing"][station] = [limits] if limits else []
+    return thresholds
+
+
+# ----------------------------
+# Stage
+# ----------------------------
+
+def run(df_hourly, df_metars, thresholds: dict | None = None, lead_step: int = 6):
+    with metrics.timer("arrays"):
+        forecast = forecast_arrays(df_hourly)
+        observed = observation_arrays(df_metars)
+    verifier = Verifier(forecast, observed, lead_step=lead_step)
+    print(f"{len(verifier.group)} forecast hours matched, {verifier.unmatched} without an observation")
+    return verifier.table(thresholds or {})
+
+
+def save(table, out_dir="."):
+    path = Path(out_dir) / OUTPUT
+    table.to_csv(path, index=False)
+    print(f"Saved {len(table)} contingency rows to {path}")
+
+
+def main(out_dir=".", alternate_csv=None, landing_csv=None, lead_step=6, extra=None):
+    from src import hourly, metars
+
+    metrics.start("verify", out_dir)
+    thresholds = thresholds_from_minima(alternate_csv, landing_csv)
+    thresholds.update(extra or {})
+    if not thresholds:
+        print("No thresholds: pass --alt-minima / --landing-minima or --threshold")
+        metrics.finish()
+        return None
+    with metrics.timer("load"):
+        df_hourly = hourly.load(out_dir)
+        df_metars = metars.load(out_dir)
+    table = run(df_hourly, df_metars, thresholds, lead_step)
+    save(table, out_dir)
+    if len(table):
+        print(summarize(table).to_string(index=False))
+    metrics.finish()
+    return table
@@ -0,0 +1,114 @@
+"""Decode cache for TAF weather groups.
+
+The same groups come up over and over ("TEMPO 1713/1715 3SM -SN BKN015",
+"FM171500 27010KT P6SM SKC"), differing only in their times. Each text is
+keyed with its time groups zeroed digit for digit
+
+    202404191800 -> 000000000000     db time stamp
+    171317Z      -> 000000Z          issue time
+    1713/1724    -> 0000/0000        validity / change period
+    FM171500     -> FM000000
+
+and decoded once into an immutable Weather record (also the record type
+src/metars.py decodes into; METARs skip the cache, as temperature,
+altimeter and remarks make nearly every report unique). Zeroing keeps every
+character class in place and none of the decoders read a value out of a
+time group, so the record decoded from the key is the one the original
+text gives.
+
+    wx = wxcache.CACHE.get("taf", seg_raw, decode_segment)
+
+The cache is a bounded LRU (ALTWX_DECODE_CACHE entries, default 50000);
+stats(kind) gives hits / misses / hit rate to size it, and the builders put
+them in their run reports.
+"""
+
+import os
+import re
+from collections import Counter, OrderedDict
+from typing import NamedTuple
+
+from src import metrics
+
+DEFAULT_SIZE = 50_000
+
+_TIME_RE = re.compile(r'\b\d{12}\b|\b\d{6}Z\b|\b\d{4}/\d{4}\b|(?<=FM)\d{6}\b')
+_ZERO = str.maketrans("123456789", "000000000")
+
+
+class Weather(NamedTuple):
+    wind_dir: str | None = None
+    wind_speed: int | None = None
+    wind_gust: int | None = None
+    vis: float | None = None
+    sigwx: str | None = None
+    clouds: str | None = None
+    ceilings: str | None = None
+    ceiling: int | None = None
+    # METAR only
+    temp_c: int | None = None
+    dewpoint_c: int | None = None
+    altimeter_inhg: float | None = None
+
+
+def strip_times(text: str) -> str:
+    return _TIME_RE.sub(lambda m: m.group(0).translate(_ZERO), text)
+
+
+class DecodeCache:
+    """LRU of (kind, time-stripped text) -> Weather."""
+
+    def __init__(self, maxsize: int = DEFAULT_SIZE):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self.hits = Counter()
+        self.misses = Counter()
+        self.evictions = 0
+
+    def get(self, kind: str, text: str, decode) -> Weather:
+        key = (kind, strip_times(text))
+        wx = self._data.get(key)
+        if wx is not None:
+            self._data.move_to_end(key)
+            self.hits[kind] += 1
+            return wx
+
+        self.misses[kind] += 1
+        wx = self._data[key] = decode(key[1])
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+        return wx
+
+    def stats(self, kind: str | None = None) -> dict:
+        hits = self.hits[kind] if kind else sum(self.hits.values())
+        misses = self.misses[kind] if kind else sum(self.misses.values())
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "evictions": self.evictions,
+        }
+
+    def clear(self):
+        self._data.clear()
+        self.hits.clear()
+        self.misses.clear()
+        self.evictions = 0
+
+
+CACHE = DecodeCache(int(os.environ.get("ALTWX_DECODE_CACHE", DEFAULT_SIZE)))
+
+
+def record_stats(kind: str):
+    """Put the cache stats for kind in the current run report."""
+    stats = CACHE.stats(kind)
+    metrics.count("decode_cache_hits", stats["hits"])
+    metrics.count("decode_cache_misses", stats["misses"])
+    metrics.count("decode_cache_size", stats["size"])
+    metrics.count("decode_cache_evictions", stats["evictions"])
+    if stats["hit_rate"] is not None:
+        print(f"Decode cache ({kind}): {stats['hit_rate']:.1%} hits, {stats['size']} entries")